@@ -1,69 +1,38 @@
 # -*- coding: utf-8 -*-
 
-import certifi
-import json
-import paho.mqtt.client as mqtt
-import time
 from datetime import datetime
+from publisher import create_publisher
+from payloads import queue_messages
+from upload_queue import open_queue
+from latest_table import read_latest
+from rollup import window_fields
+from stations import get_protocol, load_stations, make_fields
 
-def read_database():
+# time of the last reading queued per station, so unchanged readings are not sent twice
+last_uploaded = {}
 
-    temp_dict = {}
-    with open('LoRa_Weather.json', 'r') as payload:
-        print ("Radio 3: Gathering Weather Data from LoRa Stations")
-        weather_data = payload.readlines()
-        weather_data_reversed = weather_data[::-1]
-        frequencies = [433, 915]
-        for frequency in frequencies:
-            for lines in weather_data_reversed:
-                lines_to_dict = json.loads(lines)
-                if frequency == int(lines_to_dict['Frequency'].split()[0]):
-                    temp_dict[frequency] = lines_to_dict
-                    print(frequency)
-                    break
+def read_database():
 
-    return (temp_dict)
+    print ("Radio 3: Gathering Weather Data from LoRa Stations")
+    # shared-memory table of the running decoders (see latest_table.py),
+    # or the newest stored lines if there is none
+    return read_latest('lora')
 
 def make_msg(ID, data):
     out_msg = {}
     out_msg['type'] = "data"
-    out_msg['source'] = f"LoRa_{ID}"
+    out_msg['source'] = load_stations('lora')[ID]['source']
     
     out_msg['local_time'] = data['TimeStamp']
-    
-    if (out_msg['source']=='LoRa_433'):
-        out_msg['DHT22_TMP_433'] = float(data['Temperature'])
-        out_msg['DHT22_RH_433'] = float(data['Relative Humidity'])
-        out_msg['MQ135_433'] = float(data['Air Quality'])
-    elif (out_msg['source']=='LoRa_915'):
-        out_msg['DHT22_TMP_915'] = float(data['Temperature'])
-        out_msg['DHT22_RH_915'] = float(data['Relative Humidity'])
-        out_msg['MQ2_915'] = float(data['Smoke and Flammable Gas'])
+    out_msg.update(make_fields('lora', ID, data))
+    # min/max/mean of the last 15-minute window, once it has closed
+    out_msg.update(window_fields('lora', ID))
 
-    return json.dumps(out_msg) #converts the dictionary into a json structure
+    return out_msg
 
-def on_connect(client, userdata, flag, rc):
-    print("MQTT Server connection successfully established")
-
-def upload_data():
+def upload_data(publisher):
     del_key = []
-    date_format_LoRa = '%Y-%m-%dT%H:%M:%S.%f'
-
-    client = mqtt.Client()
-    client.on_connect = on_connect
-
-    MQTT_HOST = 'ed7632329e6e4fbcbe77b1fa917585a1.s1.eu.hivemq.cloud'
-    MQTT_PORT = 8883
-    MQTT_USER = 'jbcaminsi'
-    MQTT_PW = 'UPcareteam2e'
-
-    client.tls_set(certifi.where())
-    client.username_pw_set(MQTT_USER, MQTT_PW)
-
-    client.connect(MQTT_HOST, MQTT_PORT)
-
-    client.loop_start()
-    time.sleep(3)
+    date_format_LoRa = get_protocol('lora')['time_format']
 
     data = read_database()
     
@@ -74,6 +43,8 @@ def upload_data():
         duration = datetime.now() - latest_datetime
         if duration.seconds > 900 or duration.days > 0:
             del_key.append(key)
+        elif latest == last_uploaded.get(key):
+            del_key.append(key) # already uploaded
 
     for key in del_key:
         del data[key]
@@ -83,22 +54,36 @@ def upload_data():
             print(f'No publication made. The most recent data was obtained {duration.seconds} seconds ago.')
     
         else:
+            messages = []
+            reading_times = []
+            queued = {}
             for key in data.keys():
-                pmsg = make_msg(key, data[key])    
-                client.publish("UPCARE/UNDERGRAD/COE199_SDR", pmsg) #upload data
-                print(f"LoRa Weather Stations payload: {pmsg}")
-                time.sleep(2)
-            print("Finished sending all data from LoRa Weather Stations")
+                messages.append(make_msg(key, data[key]))
+                reading_times.append(datetime.strptime(data[key]['TimeStamp'], date_format_LoRa).timestamp())
+                queued[key] = data[key]['TimeStamp']
+                print(f"LoRa Weather Stations payload: {messages[-1]}")
+
+            # kept on disk until the broker acknowledges it; batched and
+            # encoded as set in the 'payload' section of config.json
+            queue_messages(open_queue(), 'lora', messages, reading_times)
+            # only now that they are on disk, so a failure leaves them to the next cycle
+            last_uploaded.update(queued)
+            print("Finished queueing all data from LoRa Weather Stations")
     
     except Exception as e:
         print(f"An error occurred: {e}")
 
     finally:
-        client.disconnect()
-        client.loop_stop()
+        # send this cycle's messages and any backlog left by an outage
+        sent = open_queue().drain(publisher)
+        print(f"{sent} queued messages sent")
     
 if __name__ == "__main__":
     try:
-        upload_data()
+        publisher = create_publisher()
+        try:
+            upload_data(publisher)
+        finally:
+            publisher.stop()
     except Exception as e:
         print("Error:", e)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+
+import argparse
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from config import load_config
+from stations import record_time, station_id
+
+# Fixed columns of every archive: file name and type
+TIME_COLUMN = ('time.f8', 'float64')
+STATION_COLUMN = ('station.i4', 'int32')
+
+
+def column_file(field):
+    """File name of a field's column, e.g. 'Air Quality' -> 'Air_Quality.f4'."""
+    return re.sub(r'\W+', '_', field) + '.f4'
+
+
+def source_fields(source):
+    """The uploaded fields of all stations of a source in config.json, in order."""
+    fields = []
+    for station in load_config()['stations']:
+        if station['protocol'] == source:
+            fields.extend(field for field in station['fields'] if field not in fields)
+    return fields
+
+
+class ColumnArchive:
+    """
+    Long-term history of one source as fixed-width NumPy columns.
+
+    The archive is a directory <root>/<source>/ with one raw file per
+    column: the reading time (epoch, float64), the station ID (int32)
+    and one float32 per field (NaN where a record lacks the field), plus
+    columns.json naming the field of every column file. Row i of the
+    archive is element i of every column, so a column is read with
+    numpy.memmap without parsing or copying anything.
+
+    Rows are appended in the order they are stored. They are buffered and
+    written to the column files in batches of `batch_rows`, or when the
+    oldest buffered row is `max_delay` seconds old; a crash may lose the
+    buffered rows and leave the columns of different lengths, in which
+    case readers use the shortest and the writer truncates the others
+    when it reopens the archive. Only one process may write to a source.
+
+    """
+
+    def __init__(self, source, root='archive', fields=None, batch_rows=256, max_delay=5.0):
+        if np is None:
+            raise RuntimeError(f'numpy is not installed, cannot archive {source}')
+        self.source = source
+        self.directory = os.path.join(root, source)
+        self.header_file = os.path.join(self.directory, 'columns.json')
+        self.batch_rows = batch_rows
+        self.max_delay = max_delay
+
+        self._rows = []
+        self._first_pending = None
+        self._files = None
+        self._lock = threading.Lock()  # the program closes it while decoders may append
+
+        os.makedirs(self.directory, exist_ok=True)
+        header = load_header(self.directory)
+        self.fields = header['fields'] if header else []
+        for field in fields if fields is not None else source_fields(source):
+            if field not in self.fields:
+                self.fields.append(field)
+
+    def _open(self):
+        # rows written so far, from the columns the archive already has: a
+        # field added to config.json since has no column yet
+        header = load_header(self.directory)
+        count = row_count(self.directory, header['fields'] if header else [])
+        columns = [TIME_COLUMN, STATION_COLUMN] + [(column_file(field), 'float32') for field in self.fields]
+        self._files = []
+        for name, dtype in columns:
+            path = os.path.join(self.directory, name)
+            f = open(path, 'ab')
+            size = count * np.dtype(dtype).itemsize
+            if f.tell() > size:
+                f.truncate(size)  # rows of other columns lost in a crash
+            elif f.tell() < size:
+                # the new field's column: no value in the earlier rows
+                np.full((size - f.tell()) // np.dtype(dtype).itemsize, np.nan, dtype).tofile(f)
+            self._files.append((f, dtype))
+
+        # the header goes last, so readers never see a field without its column
+        tmp_file = self.header_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'source': self.source,
+                       'fields': {field: column_file(field) for field in self.fields}}, f, indent=1)
+        os.replace(tmp_file, self.header_file)
+
+    def append(self, record):
+        """
+        Add one stored record.
+
+        Returns
+        -------
+        bool
+            False if the record has no station ID or reading time.
+
+        """
+        try:
+            row = [record_time(self.source, record).timestamp(), station_id(self.source, record)]
+        except (KeyError, ValueError):
+            return False
+        for field in self.fields:
+            try:
+                row.append(float(record[field]))
+            except (KeyError, TypeError, ValueError):
+                row.append(np.nan)
+
+        with self._lock:
+            self._rows.append(row)
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+            if len(self._rows) >= self.batch_rows or time.monotonic() - self._first_pending >= self.max_delay:
+                self._write()
+        return True
+
+    def flush(self):
+        """
+        Write the buffered rows to the column files.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        rows, self._rows = self._rows, []
+        self._first_pending = None
+        if not rows:
+            return
+        if self._files is None:
+            self._open()
+
+        table = np.array(rows, dtype=np.float64)
+        for i, (f, dtype) in enumerate(self._files):
+            table[:, i].astype(dtype).tofile(f)
+            f.flush()
+
+    def close(self):
+        with self._lock:
+            self._write()
+            if self._files is not None:
+                for f, dtype in self._files:
+                    f.close()
+                self._files = None
+
+
+def load_header(directory):
+    try:
+        with open(os.path.join(directory, 'columns.json'), 'r') as f:
+            header = json.load(f)
+    except FileNotFoundError:
+        return None
+    header['fields'] = list(header['fields'])
+    return header
+
+
+def row_count(directory, fields):
+    """Number of complete rows: the length of the shortest column."""
+    columns = [TIME_COLUMN, STATION_COLUMN] + [(column_file(field), 'float32') for field in fields]
+    count = None
+    for name, dtype in columns:
+        path = os.path.join(directory, name)
+        rows = os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+        count = rows if count is None else min(count, rows)
+    return count
+
+
+def load_archive(source, root=None):
+    """
+    Map the columns of a source's archive into memory.
+
+    Parameters
+    ----------
+    source : str
+        'davis', 'rtl_433' or 'lora'.
+    root : str, optional
+        Archive directory. The default is the 'root' of the 'archive'
+        section of config.json.
+
+    Returns
+    -------
+    dict
+        'time', 'station' and every field -> read-only numpy.memmap, all
+        of the same length; empty if there is no archive.
+
+    """
+    if np is None:
+        raise RuntimeError('numpy is not installed, cannot load archives')
+    directory = os.path.join(root or load_config()['archive']['root'], source)
+    header = load_header(directory)
+    if header is None:
+        return {}
+    count = row_count(directory, header['fields'])
+
+    columns = {}
+    for key, (name, dtype) in [('time', TIME_COLUMN), ('station', STATION_COLUMN)] + \
+                              [(field, (column_file(field), 'float32')) for field in header['fields']]:
+        if count == 0:
+            columns[key] = np.empty(0, dtype)
+        else:
+            columns[key] = np.memmap(os.path.join(directory, name), dtype=dtype, mode='r', shape=(count,))
+    return columns
+
+
+def time_slice(columns, start, end):
+    """
+    The rows of loaded columns within [start, end] (epoch times), as views.
+
+    Rows are stored in arrival order, so the time column is sorted but
+    for late records, which may fall just outside the slice.
+
+    Returns
+    -------
+    dict
+        Column name -> array view.
+
+    """
+    if not columns:
+        return columns
+    lower = np.searchsorted(columns['time'], start, side='left')
+    upper = np.searchsorted(columns['time'], end, side='right')
+    return {key: column[lower:upper] for key, column in columns.items()}
+
+
+_archives = {}
+
+
+def shared_archive(source):
+    """
+    The archive writer of a source in this process, see the 'archive'
+    section of config.json. It is closed at exit.
+
+    Returns
+    -------
+    ColumnArchive or None
+        The writer, or None if archiving is disabled or numpy is not
+        installed.
+
+    """
+    settings = load_config()['archive']
+    if not settings['enabled']:
+        return None
+    if np is None:
+        if source not in _archives:
+            print(f'numpy is not installed, {source} readings are not archived')
+            _archives[source] = None
+        return None
+    if source not in _archives:
+        _archives[source] = ColumnArchive(source, settings['root'],
+                                          batch_rows=settings['batch_rows'],
+                                          max_delay=settings['max_delay'])
+        atexit.register(_archives[source].close)
+    return _archives[source]
+
+
+def archive_record(source, record):
+    """
+    Add a newly stored record to the archive of its source, if enabled.
+
+    Returns
+    -------
+    None.
+
+    """
+    archive = shared_archive(source)
+    if archive is not None:
+        archive.append(record)
+
+
+def close_archives():
+    for archive in _archives.values():
+        if archive is not None:
+            archive.close()
+
+
+def export_files(source, filenames, root):
+    """
+    Append JSONL logs (e.g. Sample Data/General_data.json) to an archive.
+
+    Returns
+    -------
+    int
+        Number of rows added.
+
+    """
+    archive = ColumnArchive(source, root, batch_rows=65536, max_delay=float('inf'))
+    rows = 0
+    for filename in filenames:
+        with open(filename, 'r') as f:
+            for line in f:
+                if line.strip():
+                    rows += archive.append(json.loads(line))
+    archive.close()
+    return rows
+
+
+if __name__ == '__main__':
+    # Convert the sample data, then load it:
+    #   python3 columnar_archive.py export rtl_433 "Sample Data/General_data.json"
+    #   python3 columnar_archive.py export lora "Sample Data/LoRa_data.json"
+    #   python3 columnar_archive.py show rtl_433
+    parser = argparse.ArgumentParser(description='Export JSONL logs to the columnar archive, or show an archive.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='append JSONL logs to the archive of a source')
+    export.add_argument('source', choices=['davis', 'rtl_433', 'lora'])
+    export.add_argument('files', nargs='+')
+    show = commands.add_parser('show', help='load an archive and summarise it per station')
+    show.add_argument('source', choices=['davis', 'rtl_433', 'lora'])
+    parser.add_argument('--root', help='archive directory (default: from config.json)')
+    args = parser.parse_args()
+    root = args.root or load_config()['archive']['root']
+
+    started = time.perf_counter()
+    if args.command == 'export':
+        rows = export_files(args.source, args.files, root)
+        size = sum(os.path.getsize(filename) for filename in args.files)
+        archived = sum(entry.stat().st_size for entry in os.scandir(os.path.join(root, args.source)))
+        print(f'{rows} rows in {time.perf_counter() - started:.1f} s, '
+              f'{archived} bytes of columns for {size} bytes of JSON')
+    else:
+        columns = load_archive(args.source, root)
+        elapsed = time.perf_counter() - started
+        if not columns:
+            print(f'No archive of {args.source} in {root}')
+        else:
+            print(f"{len(columns['time'])} rows loaded in {elapsed * 1e3:.2f} ms")
+            for ID in np.unique(columns['station']):
+                rows = columns['station'] == ID
+                times = columns['time'][rows]
+                print(f'{args.source} {ID}: {rows.sum()} rows, '
+                      f'{time.strftime("%Y-%m-%d %H:%M", time.localtime(times.min()))} to '
+                      f'{time.strftime("%Y-%m-%d %H:%M", time.localtime(times.max()))}')
+                for field, column in columns.items():
+                    if field not in ('time', 'station'):
+                        values = column[rows]
+                        if not np.isnan(values).all():
+                            print(f'  {field}: mean {np.nanmean(values):.2f}, '
+                                  f'min {np.nanmin(values):.2f}, max {np.nanmax(values):.2f}')
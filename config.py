@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+import json
+
+CONFIG_FILE = 'config.json'
+
+_cache = {}
+
+
+def load_config(filename=CONFIG_FILE):
+    """
+    Load the shared configuration file (stations, protocols, ...).
+
+    The parsed file is cached per filename, so every module can call this
+    freely.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Path of the configuration file. The default is 'config.json'.
+
+    Returns
+    -------
+    dict
+        The parsed configuration.
+
+    """
+    if filename not in _cache:
+        with open(filename, 'r') as f:
+            _cache[filename] = json.load(f)
+    return _cache[filename]
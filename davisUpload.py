@@ -1,128 +1,98 @@
-import time
-import json
-import paho.mqtt.client as mqtt
-import certifi
 from datetime import datetime
+from publisher import create_publisher
+from payloads import queue_messages
+from upload_queue import open_queue
+from latest_table import read_latest
+from rollup import window_fields
+from stations import get_protocol, load_stations, make_fields
 
-def read_database():
-    temp_dict = {}
-    with open('davis_data.json', 'r') as payload:
-        print("Davis Weather Stations: Gathering Weather data")
-        weather_data = payload.readlines()
-        weather_data_reversed = weather_data[::-1]
-        
-        sensors = [1, 2]
-        
-        for ID in sensors:
-            parameters = {'temperature': 0, 'humidity': 0, 'rain_rate': 0, 'wind_gust': 0}
-            param_count = 0
-            first_line = 0
-            for line in weather_data_reversed:
-                data_dict = json.loads(line)
-                
-                if param_count >= 4:
-                    break
-                else:
-                    pass
-                
-                if data_dict['ID'] == ID:
-                    if first_line == 0:
-                        temp_dict[ID] = dict()
-                        first_line = 1
-                        for parameter in data_dict:
-                            temp_dict[ID][parameter] = data_dict[parameter]
-                            if parameter in parameters:
-                                parameters[parameter] = 1
-                                param_count += 1
-                    else:
-                        for parameter in data_dict:
-                            if parameter in parameters:
-                                if parameters[parameter] == 0:
-                                    temp_dict[ID][parameter] = data_dict[parameter]
-                                    parameters[parameter] = 1
-                                    param_count += 1
-                                
-                else:
-                    pass
+# time of the last reading queued per station, so unchanged readings are not sent twice
+last_uploaded = {}
 
-    return temp_dict
+def read_database():
+    print("Davis Weather Stations: Gathering Weather data")
 
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
-        print("Davis Weather Stations: MQTT Server connection successfully established")
-    else:
-        print(f"Failed to connect to MQTT Server with return code {rc}")
+    # shared-memory table of the running decoders (see latest_table.py),
+    # or the newest stored lines if there is none
+    return read_latest('davis')
 
 def make_msg(station_ID, data):
     out_msg = {}
     out_msg['type'] = "data"
-    out_msg['source'] = f"Davis_{station_ID}"
+    out_msg['source'] = load_stations('davis')[station_ID]['source']
     out_msg['local_time'] = datetime.now().isoformat()
-    out_msg['DAVIS_RR'] = float(data['rain_rate'])
-    out_msg['DAVIS_WG'] = float(data['wind_speed'])
-    out_msg['DAVIS_TMP'] = float(data['temperature'])
-    out_msg['DAVIS_OH'] = float(data['humidity'])  
+    out_msg.update(make_fields('davis', station_ID, data))
+    # min/max/mean of the last 15-minute window, once it has closed
+    out_msg.update(window_fields('davis', station_ID))
     
-    return json.dumps(out_msg)
+    return out_msg
 
-if __name__ == '__main__':
-    date_format = '%Y-%m-%d %H:%M:%S.%f'
+def upload_data(publisher):
+    date_format = get_protocol('davis')['time_format']
 
     try:
-        print("Connecting to MQTT Server....")
-
-        client = mqtt.Client()
-        client.on_connect = on_connect
-
-        MQTT_HOST = "ed7632329e6e4fbcbe77b1fa917585a1.s1.eu.hivemq.cloud"
-        MQTT_PORT = 8883
-        MQTT_USER = "jbcaminsi"
-        MQTT_PW = "UPcareteam2e"
-
-        client.tls_set(certifi.where())
-        client.username_pw_set(MQTT_USER, MQTT_PW)
-
-        client.connect(MQTT_HOST, MQTT_PORT)
-        client.loop_start()
-        time.sleep(3)
+        weather_data = read_database()
+        print(f"Successfully fetched: {weather_data}")
+        print("Uploading data...")
+        
+        del_key = []
 
-        try:
-            weather_data = read_database()
-            print(f"Successfully fetched: {weather_data}")
-            print("Uploading data...")
+        # for davis and general
+        # separate/filter out those not within 15 minutes
+        for key in weather_data:
+            latest = weather_data[key]['time'] # for Davis and general
+            latest_datetime = datetime.strptime(latest, date_format) # for davis and general
             
-            del_key = []
-
-            # for davis and general
-            # separate/filter out those not within 15 minutes
-            for key in weather_data:
-                latest = weather_data[key]['time'] # for Davis and general
-                latest_datetime = datetime.strptime(latest, date_format) # for davis and general
-                
-                duration = datetime.now() - latest_datetime
-                if duration.seconds > 900 or duration.days > 0:
+            duration = datetime.now() - latest_datetime
+            if duration.seconds > 900 or duration.days > 0:
+                del_key.append(key)
+            elif latest == last_uploaded.get(key):
+                del_key.append(key) # already uploaded
+            else:
+                # fields older than max_age are left out of the record
+                missing = load_stations('davis')[key]['fields'].keys() - weather_data[key].keys()
+                if missing:
+                    print(f"Davis station {key} has no recent {', '.join(sorted(missing))}; not uploaded")
                     del_key.append(key)
 
-            for key in del_key:
-                del weather_data[key]                
-        
-            if len(weather_data) == 0:
-                print(f'No publication made. The most recent data was obtained {duration.seconds} seconds ago.')
-            else:                
-                for ID in weather_data.keys():
-                    pmsg = make_msg(ID, weather_data[ID])
-                    client.publish("UPCARE/UNDERGRAD/COE199_SDR", pmsg)
-                    print(f"Davis stations payload: {pmsg}")
-                    time.sleep(2)
+        for key in del_key:
+            del weather_data[key]                
+    
+        if len(weather_data) == 0:
+            print(f'No publication made. The most recent data was obtained {duration.seconds} seconds ago.')
+        else:                
+            messages = []
+            reading_times = []
+            queued = {}
+            for ID in weather_data.keys():
+                messages.append(make_msg(ID, weather_data[ID]))
+                reading_times.append(datetime.strptime(weather_data[ID]['time'], date_format).timestamp())
+                queued[ID] = weather_data[ID]['time']
+                print(f"Davis stations payload: {messages[-1]}")
+
+            # kept on disk until the broker acknowledges it; batched and
+            # encoded as set in the 'payload' section of config.json
+            queue_messages(open_queue(), 'davis', messages, reading_times)
+            # only now that they are on disk, so a failure leaves them to the next cycle
+            last_uploaded.update(queued)
+
+            print("Finished queueing all data from Davis stations")
 
-                print("Finished sending all data from Davis stations")
+    except Exception as e:
+        print(f"An error occurred: {e}")
 
-        except Exception as e:
-            print(f"An error occurred: {e}")
+    finally:
+        # send this cycle's messages and any backlog left by an outage
+        sent = open_queue().drain(publisher)
+        print(f"{sent} queued messages sent")
 
+if __name__ == '__main__':
+    try:
+        publisher = create_publisher()
+        try:
+            upload_data(publisher)
         finally:
-            client.disconnect()
-            client.loop_stop()
+            publisher.stop()
 
     except Exception as e:
         print("Error:", e)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import time
+
+from stations import get_protocol, record_time
+
+
+class DavisAssembler:
+    """
+    Merges the rotating Davis ISS messages into complete readings as they arrive.
+
+    Every ISS packet carries wind plus one other value (5: rain rate,
+    8: temperature, 9: gust, 10: humidity, ...). The assembler keeps the
+    latest value of every field per transmitter and turns each packet
+    into a consolidated record holding all fields, with an 'age' entry
+    giving the seconds since each field was last received. Fields older
+    than `max_age` seconds are left out.
+
+    Stored consolidated records make the newest line of a station a
+    complete reading, so latest_readings() stops after one line per
+    station instead of scanning back for the missing fields.
+
+    """
+
+    def __init__(self, fields, max_age=900):
+        self.fields = fields
+        self.max_age = max_age
+        self.state = {}   # ID -> {field: (value, epoch time)}
+        self.latest = {}  # ID -> latest consolidated record
+
+    def seed(self, records):
+        """
+        Restore the field values from previously stored records, e.g.
+        the newest stored record of each transmitter after a restart.
+
+        Parameters
+        ----------
+        records : iterable of dict
+            Consolidated (or plain) Davis records as stored. Each field is
+            dated by the record's time minus its 'age' entry, so records
+            with values merged in from older ones must not be passed.
+
+        Returns
+        -------
+        None.
+
+        """
+        for record in records:
+            try:
+                received = record_time('davis', record).timestamp()
+            except (KeyError, ValueError):
+                continue
+            ages = record.get('age', {})
+            state = self.state.setdefault(record['ID'], {})
+            for key, value in record.items():
+                if key not in ('time', 'ID', 'age'):
+                    state[key] = (value, received - ages.get(key, 0))
+
+    def add(self, fragment):
+        """
+        Merge one decoded packet into its transmitter's state.
+
+        Parameters
+        ----------
+        fragment : dict
+            Record of a single packet ('time', 'ID' and its values).
+
+        Returns
+        -------
+        dict
+            The consolidated record of the transmitter.
+
+        """
+        try:
+            received = record_time('davis', fragment).timestamp()
+        except (KeyError, ValueError):
+            received = time.time()
+
+        state = self.state.setdefault(fragment['ID'], {})
+        for key, value in fragment.items():
+            if key not in ('time', 'ID', 'age'):
+                state[key] = (value, received)
+
+        record = {'time': fragment['time'], 'ID': fragment['ID']}
+        ages = {}
+        for key, (value, updated) in state.items():
+            age = max(0.0, received - updated)
+            if age <= self.max_age:
+                record[key] = value
+                ages[key] = round(age, 1)
+        record['age'] = ages
+
+        self.latest[fragment['ID']] = record
+        return record
+
+    def complete(self, ID):
+        """
+        Whether the latest record of a transmitter has all merged fields.
+
+        Returns
+        -------
+        bool
+            True if complete.
+
+        """
+        record = self.latest.get(ID)
+        return record is not None and all(field in record for field in self.fields)
+
+
+def create_assembler():
+    """
+    An assembler for the 'merge' fields of the davis protocol in config.json.
+
+    Returns
+    -------
+    DavisAssembler
+        The assembler.
+
+    """
+    settings = get_protocol('davis')
+    return DavisAssembler(settings['merge'], settings.get('max_age', 900))
+
+
+def assemble_file(filename, output):
+    """
+    Turn a log of single-packet Davis records into consolidated records.
+
+    Returns
+    -------
+    tuple
+        (records, complete records).
+
+    """
+    assembler = create_assembler()
+    count = complete = 0
+    with open(filename, 'r') as f, open(output, 'w') as out:
+        for line in f:
+            if not line.strip():
+                continue
+            record = assembler.add(json.loads(line))
+            out.write(json.dumps(record) + '\n')
+            count += 1
+            complete += assembler.complete(record['ID'])
+    return count, complete
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Consolidate a log of single-packet Davis records.')
+    parser.add_argument('log')
+    parser.add_argument('output')
+    args = parser.parse_args()
+
+    count, complete = assemble_file(args.log, args.output)
+    print(f'{count} records, {complete} complete')
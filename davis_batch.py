@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+from datetime import date
+
+import numpy as np
+
+from davis_decoder import THERMISTOR_TEMP, WIND_SPEED_EC
+
+# Column lookups built from the per-packet tables in davis_decoder.py
+_WIND_SPEED_EC = np.array(WIND_SPEED_EC, dtype=np.float64)
+_THERMISTOR_TEMP = np.array([np.nan if temp is None else temp for temp in THERMISTOR_TEMP],
+                            dtype=np.float64)
+
+FIELDS = ['wind_speed', 'wind_dir', 'rain_rate', 'temperature', 'wind_gust', 'humidity']
+
+
+def packets_to_bytes(packets):
+    """
+    Convert rtldavis packets to an (N, 8) array of bytes.
+
+    Parameters
+    ----------
+    packets : sequence of str
+        16-character hexadecimal packets, as printed by rtldavis.
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 array of shape (N, 8).
+
+    """
+    return np.frombuffer(bytes.fromhex(''.join(packets)), dtype=np.uint8).reshape(-1, 8)
+
+
+def decode_batch(packets, rain_bucket=0.2, wind_dir_formula='pro'):
+    """
+    Decode many rtldavis packets at once, column by column.
+
+    Gives the same values as davis_decoder.parse_packet() for every message
+    type (wind in every packet, 5 = rain rate, 8 = temperature, 9 = gust,
+    10 = humidity), with NaN wherever parse_packet() would not set the
+    field. Calibration that parse_packet() hardcodes can be changed here.
+
+    Parameters
+    ----------
+    packets : sequence of str or numpy.ndarray
+        Hexadecimal packets, or the (N, 8) output of packets_to_bytes().
+    rain_bucket : float, optional
+        Rain per bucket tip in mm. The default is 0.2 (0.254 for the
+        0.01 inch bucket).
+    wind_dir_formula : str, optional
+        'pro' (Vantage Pro/Pro2 potentiometer, the default) or 'vue'
+        (Vantage Vue hall effect sensor).
+
+    Returns
+    -------
+    dict
+        'msg_type' (uint8) and one float64 column per entry of FIELDS.
+
+    """
+    if not isinstance(packets, np.ndarray):
+        packets = packets_to_bytes(packets)
+    pkt = packets.astype(np.int64)
+    n = len(pkt)
+
+    msg_type = (packets[:, 0] >> 4) & 0xF
+    columns = {'msg_type': msg_type}
+    for field in FIELDS:
+        columns[field] = np.full(n, np.nan)
+
+    # wind, valid in every packet except the dead band (raw 0 and 255)
+    wind_speed_raw = pkt[:, 1]
+    wind_dir_raw = pkt[:, 2]
+    wind = (wind_dir_raw != 0) & (wind_dir_raw != 255)
+    if wind_dir_formula == 'vue':
+        wind_dir = wind_dir_raw * 1.40625 + 0.3
+    else:
+        wind_dir = 9.0 + (wind_dir_raw - 1) * 342.0 / 253.0
+    columns['wind_dir'][wind] = wind_dir[wind]
+    columns['wind_speed'][wind] = np.round(_WIND_SPEED_EC[wind_speed_raw[wind], wind_dir_raw[wind]])
+
+    # 5: rain rate
+    rain = msg_type == 5
+    time_between_tips_raw = ((pkt[:, 4] & 0x30) << 4) + pkt[:, 3]
+    no_rain = rain & (time_between_tips_raw == 0x3ff)
+    raining = rain & (time_between_tips_raw != 0x3ff) & (time_between_tips_raw != 0)
+    columns['rain_rate'][no_rain] = 0
+    columns['rain_rate'][raining] = 3600.0 / time_between_tips_raw[raining] * rain_bucket
+
+    # 8: outside temperature, digital sensor or thermistor
+    temp = msg_type == 8
+    temp_raw = (pkt[:, 3] << 4) + (pkt[:, 4] >> 4)
+    temp = temp & (temp_raw != 0xFFC)
+    digital = (pkt[:, 4] & 0x8) != 0
+    temp_digital = temp & digital
+    temp_analog = temp & ~digital
+    columns['temperature'][temp_digital] = (temp_raw[temp_digital] / 10.0 - 32) * 5 / 9
+    columns['temperature'][temp_analog] = _THERMISTOR_TEMP[temp_raw[temp_analog]]
+
+    # 9: 10-min average wind gust
+    gust = msg_type == 9
+    columns['wind_gust'][gust] = pkt[gust, 3]
+
+    # 10: outside humidity, digital or analog sensor
+    humidity = msg_type == 0xA
+    humidity_raw = ((pkt[:, 4] >> 4) << 8) + pkt[:, 3]
+    humidity = humidity & (humidity_raw != 0)
+    digital = (pkt[:, 4] & 0x08) == 0x8
+    humidity_digital = humidity & digital
+    humidity_analog = humidity & ~digital
+    columns['humidity'][humidity_digital] = humidity_raw[humidity_digital] / 10.0
+    columns['humidity'][humidity_analog] = humidity_raw[humidity_analog] * -0.301 + 710.23
+
+    return columns
+
+
+def read_rtldavis_log(filename, keywords=('msg.ID=',)):
+    """
+    Extract packets from captured rtldavis output.
+
+    Parameters
+    ----------
+    filename : str
+        Text file of rtldavis output lines.
+    keywords : tuple of str, optional
+        Lines containing any of these are packet lines.
+
+    Returns
+    -------
+    tuple
+        (times, packets, ids): lists of time strings and hexadecimal
+        packets, and a numpy array of transmitter IDs.
+
+    """
+    times = []
+    packets = []
+    ids = []
+    with open(filename, 'r') as f:
+        for line in f:
+            if not any(keyword in line for keyword in keywords):
+                continue
+            data = line.split()
+            if len(data[1]) != 16:
+                continue
+            times.append(data[0])
+            packets.append(data[1])
+            ids.append(int(data[-1][-1]))
+    return times, packets, np.array(ids, dtype=np.int64)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-decode captured rtldavis output.')
+    parser.add_argument('capture', help='captured rtldavis output')
+    parser.add_argument('output', help='JSONL file for the decoded records')
+    parser.add_argument('--date', default=date.today().strftime("%Y-%m-%d"),
+                        help='date of the capture (rtldavis only prints the time)')
+    parser.add_argument('--rain-bucket', type=float, default=0.2)
+    parser.add_argument('--wind-dir', choices=['pro', 'vue'], default='pro')
+    args = parser.parse_args()
+
+    times, packets, ids = read_rtldavis_log(args.capture)
+    columns = decode_batch(packets, args.rain_bucket, args.wind_dir)
+
+    with open(args.output, 'w') as f:
+        for i in range(len(packets)):
+            stored_data = {'time': args.date + " " + times[i], 'ID': int(ids[i])}
+            for field in FIELDS:
+                if not np.isnan(columns[field][i]):
+                    stored_data[field] = columns[field][i].item()
+            f.write(json.dumps(stored_data) + '\n')
+
+    print(f'{len(packets)} packets decoded into {args.output}')
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+
+import contextlib
+import hashlib
+import inspect
+import io
+import math
+import pickle
+
+# Interpolate(), calc_wind_speed_ec(), calculate_thermistor_temp(),
+# and parse_packet() copied from weewx-rtldavis
+# https://github.com/lheijst/weewx-rtldavis/blob/master/bin/user/rtldavis.py
+
+def interpolate(rx0, rx1,
+                ry0, ry1,
+                x0, x1,
+                y0, y1,
+                x, y):
+
+    print("rx0=%s, rx1=%s, ry0=%s, ry1=%s, x0=%s, x1=%s, y0=%s, y1=%s, x=%s, y=%s" %
+              (rx0, rx1, ry0, ry1, x0, x1, y0, y1, x, y))
+
+    if rx0 == rx1:
+        return y + x0 + (y - ry0) / float(ry1 - ry0) * (y1 - y0)
+
+    if ry0 == ry1:
+        return y + y0 + (x - rx0) / float(rx1 - rx0) * (x1 - x0)
+
+    dy0 = x0 + (y - ry0) / float(ry1 - ry0) * (y0 - x0)
+    dy1 = x1 + (y - ry0) / float(ry1 - ry0) * (y1 - x1)
+
+    return y + dy0 + (x - rx0) / float(rx1 - rx0) * (dy1 - dy0)
+
+# Error correction values for
+#  [ 1..29 by 1, 30..150 by 5 raw mph ]
+#   x
+#  [ 1, 4, 8..124 by 4, 127, 128 raw degrees ]
+#
+# Extracted from a Davis Weather Envoy using a DIY transmitter to
+# transmit raw values and logging LOOP packets.
+# first row: raw angles;
+# first column: raw speed;
+# cells: values provided in response to raw data by the Envoy;
+# [0][0] is filler
+WINDTAB = [
+    [0, 1, 4, 8, 12, 16, 20, 24, 28, 32, 36, 40, 44, 48, 52, 56, 60, 64, 68, 72, 76, 80, 84, 88, 92, 96, 100, 104, 108, 112, 116, 120, 124, 127, 128],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [3, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0],
+    [4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0],
+    [5, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 0, 0],
+    [6, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 1, 1, 1, 1, 1, 0, 0],
+    [7, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 0, 0],
+    [8, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 0, 0],
+    [9, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 0, 0],
+    [10, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 0, 0],
+    [11, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 0, 0],
+    [12, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 0, 0],
+    [13, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
+    [14, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
+    [15, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
+    [16, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
+    [17, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
+    [18, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
+    [19, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 1, 0, 0],
+    [20, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
+    [21, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
+    [22, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
+    [23, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
+    [24, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 2, 3, 4, 4, 2, 0, 0],
+    [25, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 4, 4, 2, 0, 0],
+    [26, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 5, 4, 2, 0, 0],
+    [27, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
+    [28, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
+    [29, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
+    [30, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
+    [35, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 4, 6, 5, 2, 0, -1],
+    [40, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 4, 6, 6, 2, 0, -1],
+    [45, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 4, 7, 6, 2, -1, -1],
+    [50, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 7, 7, 2, -1, -2],
+    [55, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 8, 7, 2, -1, -2],
+    [60, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 8, 8, 2, -1, -2],
+    [65, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 9, 8, 2, -2, -3],
+    [70, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 0, 2, 5, 9, 9, 2, -2, -3],
+    [75, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 0, 2, 6, 10, 9, 2, -2, -3],
+    [80, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 0, 2, 6, 10, 10, 2, -2, -3],
+    [85, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 0, 2, 7, 11, 11, 2, -3, -4],
+    [90, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 7, 12, 11, 2, -3, -4],
+    [95, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 3, 2, 2, 2, 1, 1, 1, 1, 2, 7, 12, 12, 3, -3, -4],
+    [100, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 3, 3, 2, 2, 2, 1, 1, 1, 1, 2, 8, 13, 12, 3, -3, -4],
+    [105, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 2, 8, 13, 13, 3, -3, -4],
+    [110, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 2, 8, 14, 14, 3, -3, -5],
+    [115, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 2, 9, 15, 14, 3, -3, -5],
+    [120, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 3, 9, 15, 15, 3, -4, -5],
+    [125, 1, 1, 2, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 3, 3, 3, 2, 2, 1, 1, 1, 3, 10, 16, 16, 3, -4, -5],
+    [130, 1, 1, 2, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 3, 10, 17, 16, 3, -4, -6],
+    [135, 1, 2, 2, 1, 1, 0, 0, 0, -1, 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 4, 3, 3, 2, 2, 2, 1, 1, 3, 10, 17, 17, 4, -4, -6],
+    [140, 1, 2, 2, 1, 1, 0, 0, 0, -1, 0, 0, 1, 1, 2, 2, 3, 3, 3, 4, 4, 3, 3, 2, 2, 2, 1, 1, 3, 11, 18, 17, 4, -4, -6],
+    [145, 2, 2, 2, 1, 1, 0, 0, 0, -1, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4, 3, 3, 3, 2, 2, 1, 1, 3, 11, 19, 18, 4, -4, -6],
+    [150, 2, 2, 2, 1, 1, 0, 0, -1, -1, 0, 0, 1, 1, 2, 3, 3, 4, 4, 4, 4, 4, 3, 3, 2, 2, 1, 1, 3, 12, 19, 19, 4, -4, -6]
+]
+
+def calc_wind_speed_ec(raw_mph, raw_angle):
+
+    # some sanitization: no corrections needed under 3 and no values exist
+    # above 150 mph
+    if raw_mph < 3 or raw_mph > 150:
+        return raw_mph
+
+    # EC is symmetric between W/E (90/270°) - probably a wrong assumption,
+    # table needs to be redone for 0-360°
+    if raw_angle > 128:
+        raw_angle = 256 - raw_angle
+
+    s0 = a0 = 1
+
+    while WINDTAB[s0][0] < raw_mph:
+        s0 += 1
+    while WINDTAB[0][a0] < raw_angle:
+        a0 += 1
+
+    if WINDTAB[s0][0] == raw_mph:
+        s1 = s0
+    else:
+        if s0 > 1:
+            s0 -= 1
+        s1 = len(WINDTAB) - 1 if s0 == len(WINDTAB) - 1 else s0 + 1
+
+    if WINDTAB[0][a0] == raw_angle:
+        a1 = a0
+    else:
+        if a0 > 1:
+            a0 -= 1
+        a1 = len(WINDTAB[0]) - 2 if a0 == len(WINDTAB) - 1 else a0 + 1
+
+    if s0 == s1 and a0 == a1:
+        return raw_mph + WINDTAB[s0][a0]
+    else:
+        return interpolate(WINDTAB[0][a0], WINDTAB[0][a1],
+                                      WINDTAB[s0][0], WINDTAB[s1][0],
+                                      WINDTAB[s0][a0], WINDTAB[s0][a1],
+                                      WINDTAB[s1][a0], WINDTAB[s1][a1],
+                                      raw_angle, raw_mph)
+
+# Simple bilinear interpolation
+#
+#  a0         a1 <-- fixed raw angles
+#  x0---------x1 s0
+#  |          |
+#  |          |
+#  |      * <-|-- raw input angle, raw speed value (x, y)
+#  |          |
+#  y0---------y1 s1
+#                ^
+#                \__ speed: measured raw / correction values
+
+def calculate_thermistor_temp(temp_raw):
+    """ Decode the raw thermistor temperature, then calculate the actual
+    thermistor temperature and the leaf_soil potential, using Davis' formulas.
+    see: https://github.com/cmatteri/CC1101-Weather-Receiver/wiki/Soil-Moisture-Station-Protocol
+    :param temp_raw: raw value from sensor for leaf wetness and soil moisture
+    """
+
+    # Convert temp_raw to a resistance (R) in kiloOhms
+    a = 18.81099
+    b = 0.0009988027
+    r = a / (1.0 / temp_raw - b) / 1000 # k ohms
+
+    # Steinhart-Hart parameters
+    s1 = 0.002783573
+    s2 = 0.0002509406
+    try:
+        thermistor_temp = 1 / (s1 + s2 * math.log(r)) - 273
+        print('r (k ohm) %s temp_raw %s thermistor_temp %s' %
+                  (r, temp_raw, thermistor_temp))
+        return thermistor_temp
+    except ValueError as e:
+        print('thermistor_temp failed for temp_raw %s r (k ohm) %s'
+               'error: %s' % (temp_raw, r, e))
+    return 24
+
+# Lookup tables for parse_packet()
+#
+# The raw wind speed and direction are single bytes and the analog
+# temperature is a 12-bit value, so every possible input is run through the
+# functions above once, instead of once per packet. The tables are cached
+# in TABLE_CACHE and rebuilt whenever WINDTAB, the source of the functions
+# or TABLE_VERSION changes.
+
+TABLE_CACHE = 'davis_tables.pickle'
+TABLE_VERSION = 2
+
+def table_key():
+    """
+    Checksum of everything the lookup tables are computed from.
+
+    Returns
+    -------
+    str
+        SHA-1 of TABLE_VERSION, WINDTAB and the source of the decoding
+        functions (including the thermistor constants).
+
+    """
+    sources = [TABLE_VERSION, WINDTAB] + [inspect.getsource(function) for function in
+                                          (interpolate, calc_wind_speed_ec, calculate_thermistor_temp, build_tables)]
+    return hashlib.sha1(repr(sources).encode()).hexdigest()
+
+def build_tables():
+    """
+    Decode every possible raw wind and thermistor input.
+
+    Returns
+    -------
+    tuple
+        WIND_SPEED_EC[raw_mph][raw_angle] = calc_wind_speed_ec(raw_mph, raw_angle),
+        THERMISTOR_TEMP[temp_raw] = calculate_thermistor_temp(temp_raw / 4)
+        for the 12-bit temp_raw, or None where that raises.
+
+    """
+    # both functions print every intermediate value
+    with contextlib.redirect_stdout(io.StringIO()):
+        wind_speed_ec = [[calc_wind_speed_ec(raw_mph, raw_angle) for raw_angle in range(256)]
+                         for raw_mph in range(256)]
+
+        thermistor_temp = []
+        for temp_raw in range(4096):
+            try:
+                thermistor_temp.append(calculate_thermistor_temp(temp_raw / 4))
+            except ZeroDivisionError:
+                thermistor_temp.append(None)
+
+    return wind_speed_ec, thermistor_temp
+
+def load_tables(filename=TABLE_CACHE):
+    """
+    Load the lookup tables from the cache file, building (and caching)
+    them if the file is missing or was made from different inputs
+    (see table_key()).
+
+    Returns
+    -------
+    tuple
+        (WIND_SPEED_EC, THERMISTOR_TEMP), see build_tables().
+
+    """
+    checksum = table_key()
+    try:
+        with open(filename, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['key'] == checksum:
+            return cached['wind_speed_ec'], cached['thermistor_temp']
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+        pass
+
+    wind_speed_ec, thermistor_temp = build_tables()
+    try:
+        with open(filename, 'wb') as f:
+            pickle.dump({'key': checksum,
+                         'wind_speed_ec': wind_speed_ec,
+                         'thermistor_temp': thermistor_temp}, f)
+    except OSError as e:
+        print(f'Could not cache Davis lookup tables in {filename}: {e}')
+    return wind_speed_ec, thermistor_temp
+
+WIND_SPEED_EC, THERMISTOR_TEMP = load_tables()
+
+def parse_packet(msg_type, pkt):
+    data = {}
+    
+    # Each data packet of iss or anemometer contains wind info,
+    # but it is only valid when received from the channel with
+    # the anemometer connected
+    # message examples:
+    # 51 06 B2 FF 73 00 76 61
+    # E0 00 00 4E 05 00 72 61 (no sensor)
+    
+    # received pkt is in hexadecimal, type str
+    # hence the int(pkt[n], 16) syntax, which converts hexadecimal into integer
+    wind_speed_raw = int(pkt[1], 16)
+    wind_dir_raw = int(pkt[2], 16)
+    if not(wind_speed_raw == 0 and wind_dir_raw == 0):
+        """ The elder Vantage Pro and Pro2 stations measured
+        the wind direction with a potentiometer. This type has
+        a fairly big dead band around the North. The Vantage
+        Vue station uses a hall effect device to measure the
+        wind direction. This type has a much smaller dead band,
+        so there are two different formulas for calculating
+        the wind direction. To be able to select the right
+        formula the Vantage type must be known.
+        For now we use the traditional 'pro' formula for all
+        wind directions.
+        """
+        print("wind_speed_raw=%03x wind_dir_raw=0x%03x" %
+                  (wind_speed_raw, wind_dir_raw))
+
+        # Vantage Pro and Pro2
+        if wind_dir_raw == 0:
+            wind_dir_pro = 5.0
+        elif wind_dir_raw == 255:
+            wind_dir_pro = 355.0
+        else:
+            wind_dir_pro = 9.0 + (wind_dir_raw - 1) * 342.0 / 253.0
+
+            # Vantage Vue
+            wind_dir_vue = wind_dir_raw * 1.40625 + 0.3
+
+            # wind error correction is by raw byte values
+            wind_speed_ec = round(WIND_SPEED_EC[wind_speed_raw][wind_dir_raw])
+
+            data['wind_dir'] = wind_dir_pro
+            data['wind_speed'] = wind_speed_ec
+            print("WS=%s WD=%s WS_raw=%s WS_ec=%s WD_raw=%s WD_pro=%s WD_vue=%s" %
+                      (data['wind_speed'], data['wind_dir'],
+                       wind_speed_raw, wind_speed_ec,
+                       wind_dir_raw if wind_dir_raw <= 180 else 360 - wind_dir_raw,
+                       wind_dir_pro, wind_dir_vue))
+
+    # data from both iss sensors and extra sensors on
+    # Anemometer Transport Kit
+    
+    if msg_type == 3:
+        pass
+        
+    elif msg_type == 5:
+        time_between_tips_raw = ((int(pkt[4], 16) & 0x30) << 4) + int(pkt[3], 16)
+        print("time_between_tips_raw=%03x (%s)" %
+              (time_between_tips_raw, time_between_tips_raw))
+        rain_rate = None
+        
+        if time_between_tips_raw == 0x3ff:
+            # no rain
+            rain_rate = 0
+            print("No rain=%s mm/h" % rain_rate)
+            
+        elif int(pkt[4], 16) & 0x40 == 0:
+            # heavy rain
+            
+            time_between_tips = time_between_tips_raw / 16.0
+            rain_rate = 3600.0 / time_between_tips_raw * 0.2 # default is 0.2, can be 0.254
+            print("Heavy rain=%s mm/h, time_between_tips= %s s" % (rain_rate, time_between_tips))
+            
+        else:
+            # light rain
+            
+            time_between_tips = time_between_tips_raw
+            rain_rate = 3600.0 / time_between_tips_raw * 0.2 # default is 0.2, can be 0.254
+            print("Light rain=%s mm/h, Time between tips=%s s" % (rain_rate, time_between_tips))
+            
+        data['rain_rate'] = rain_rate
+            
+    elif msg_type == 8:
+        # outside temperature
+        # message examples:
+        # 80 00 00 33 8D 00 25 11 (digital temp)
+    
+        # 81 00 00 59 45 00 A3 E6 (analog temp)
+        # 81 00 DB FF C3 00 AB F8 (no sensor)
+        
+        temp_raw = (int(pkt[3], 16) << 4) + (int(pkt[4], 16) >> 4)  # 12-bits temp value
+        if temp_raw != 0xFFC:
+            if int(pkt[4], 16) & 0x8:
+                # digital temp sensor
+                temp_f = temp_raw / 10.0
+                temp_c = (temp_f - 32) * 5 / 9 # C
+                print("Digital temp_raw=0x%03x temp_f=%s temp_c=%s"
+                          % (temp_raw, temp_f, temp_c))
+            else:
+                # analog sensor (thermistor)
+                temp_c = THERMISTOR_TEMP[temp_raw]
+                temp_raw /= 4  # 10-bits temp value
+                if temp_c is None:
+                    temp_c = calculate_thermistor_temp(temp_raw)
+                print("thermistor temp_raw=%s temp_c=%s"
+                          % (temp_raw, temp_c))
+        data['temperature'] = temp_c
+                
+    elif msg_type == 9:
+        # 10-min average wind gust
+        # message examples:
+        # 91 00 DB 00 03 0E 89 85
+        # 90 00 00 00 05 00 31 51 (no sensor)
+        gust_raw = int(pkt[3], 16)  # mph
+        gust_index_raw = int(pkt[5], 16) >> 4
+        print("W10=%s gust_index_raw=%s" %
+                  (gust_raw, gust_index_raw))
+        
+        data['wind_gust'] = gust_raw
+            
+    elif msg_type == 0xA:
+        # outside humidity
+        # message examples:
+        # A0 00 00 C9 3D 00 2A 87 (digital sensor, variant a)
+        # A0 01 3A 80 3B 00 ED 0E (digital sensor, variant b)
+        # A0 01 41 7F 39 00 18 65 (digital sensor, variant c)
+        # A0 00 00 22 85 00 ED E3 (analog sensor)
+        # A1 00 DB 00 03 00 47 C7 (no sensor)
+        humidity_raw = ((int(pkt[4], 16) >> 4) << 8) + int(pkt[3], 16)
+        if humidity_raw != 0:
+            if int(pkt[4], 16) & 0x08 == 0x8:
+                # digital sensor
+                humidity = humidity_raw / 10.0
+            else:
+                # analog sensor (pkt[4] & 0x0f == 0x5)
+                humidity = humidity_raw * -0.301 + 710.23       
+            print("humidity_raw=0x%03x value=%s" %
+                              (humidity_raw, humidity))
+            
+        data['humidity'] = humidity
+    else:
+        pass
+    return data
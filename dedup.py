@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import time
+from collections import OrderedDict
+
+
+class RepeatFilter:
+    """
+    Drops repeated copies of the same frame within a short time window.
+
+    Transmitters send each frame more than once and decoders may report a
+    frame twice. The first copy of a key passes; further copies within
+    `window` seconds of it are repeats. The window is anchored at the
+    first copy, so a sensor reporting the same value in every (slower)
+    transmission is not suppressed.
+
+    """
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self.unique = 0
+        self.repeats = 0
+        self._seen = OrderedDict()  # key -> time of first copy, oldest first
+
+    def is_repeat(self, key, now=None):
+        """
+        Check a frame against the window and remember it.
+
+        Parameters
+        ----------
+        key : hashable
+            What identifies a frame, e.g. its payload.
+        now : float, optional
+            Reception time in seconds. The default is time.monotonic().
+
+        Returns
+        -------
+        bool
+            True if the frame repeats one seen within the window.
+
+        """
+        if now is None:
+            now = time.monotonic()
+        while self._seen:
+            oldest, seen = next(iter(self._seen.items()))
+            if now - seen <= self.window:
+                break
+            self._seen.popitem(last=False)
+
+        if key in self._seen:
+            self.repeats += 1
+            return True
+        self._seen[key] = now
+        self.unique += 1
+        return False
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from config import load_config
+from stations import load_stations, record_time, station_id
+from storage import open_store
+
+# Learned transmit schedule of one station: packets at phase + n * period
+Schedule = namedtuple('Schedule', ['period', 'phase', 'jitter', 'packets'])
+
+# Planned time on one job; `start` includes the job's switching cost
+Dwell = namedtuple('Dwell', ['job', 'start', 'end'])
+
+
+def distinct_times(timestamps, repeat=2.0):
+    """
+    Collapse repeated transmissions of one packet into its first timestamp.
+
+    Parameters
+    ----------
+    timestamps : iterable of float
+        Epoch times of the received records, in any order.
+    repeat : float, optional
+        Records closer than this many seconds are one packet.
+
+    Returns
+    -------
+    list of float
+        Sorted packet times.
+
+    """
+    packets = []
+    for timestamp in sorted(timestamps):
+        if not packets or timestamp - packets[-1] >= repeat:
+            packets.append(timestamp)
+    return packets
+
+
+def estimate_schedule(packets, nominal_period=None):
+    """
+    Fit the transmit period and phase of a station to its packet times.
+
+    Gaps of several periods (packets sent while the radio was elsewhere)
+    are counted as whole missed periods, so a station heard only once per
+    switching cycle still yields its true period. Without a nominal period
+    the typical gap between consecutive packets is used as a first guess,
+    which only works if some consecutive packets were received.
+
+    Parameters
+    ----------
+    packets : list of float
+        Sorted packet times, see distinct_times().
+    nominal_period : float, optional
+        Period from the datasheet, e.g. 49 s for the WH40.
+
+    Returns
+    -------
+    Schedule or None
+        The fitted schedule, or None with fewer than three packets.
+
+    """
+    if len(packets) < 3:
+        return None
+
+    gaps = sorted(b - a for a, b in zip(packets, packets[1:]))
+    if nominal_period:
+        period = nominal_period
+    else:
+        shortest = gaps[len(gaps) // 10]
+        similar = [gap for gap in gaps if gap <= 1.5 * shortest]
+        period = similar[len(similar) // 2]
+
+    # number of periods since the first packet
+    counts = [0]
+    for a, b in zip(packets, packets[1:]):
+        counts.append(counts[-1] + max(1, round((b - a) / period)))
+
+    # least squares fit of packets[i] = phase + counts[i] * period
+    n = len(packets)
+    mean_count = sum(counts) / n
+    mean_time = sum(packets) / n
+    variance = sum((count - mean_count) ** 2 for count in counts)
+    if variance:
+        period = sum((count - mean_count) * (t - mean_time)
+                     for count, t in zip(counts, packets)) / variance
+    phase = mean_time - period * mean_count
+
+    residuals = [t - phase - count * period for count, t in zip(counts, packets)]
+    jitter = (sum(r * r for r in residuals) / n) ** 0.5
+    return Schedule(period, phase, jitter, n)
+
+
+def predict(schedule, start, end):
+    """
+    Predicted packet times of a station within [start, end].
+
+    Returns
+    -------
+    list of float
+        The predicted times.
+
+    """
+    count = -(-(start - schedule.phase) // schedule.period)  # ceil
+    times = []
+    t = schedule.phase + count * schedule.period
+    while t <= end:
+        times.append(t)
+        t += schedule.period
+    return times
+
+
+def capture_rate(packets, schedule, start, end):
+    """
+    Fraction of a station's transmissions within [start, end] that were received.
+
+    Returns
+    -------
+    float
+        Received packets divided by the packets the schedule predicts.
+
+    """
+    expected = (end - start) / schedule.period
+    received = sum(1 for t in packets if start <= t <= end)
+    return min(1.0, received / expected) if expected > 0 else 0.0
+
+
+def station_times(protocol, stations, since, until=None):
+    """
+    Reception times of the given stations within [since, until], from storage.
+
+    Parameters
+    ----------
+    protocol : str
+        'davis', 'rtl_433' or 'lora'.
+    stations : list of int
+        Station IDs.
+    since : float
+        Epoch time; older records are not read.
+    until : float, optional
+        Epoch time; newer records are skipped.
+
+    Returns
+    -------
+    dict
+        Station ID -> list of epoch times.
+
+    """
+    times = {ID: [] for ID in stations}
+    for line in open_store(protocol).iter_newest():
+        try:
+            record = json.loads(line)
+            timestamp = record_time(protocol, record).timestamp()
+            ID = station_id(protocol, record)
+        except (KeyError, ValueError):
+            continue
+        if timestamp < since:
+            break
+        if ID in times and (until is None or timestamp <= until):
+            times[ID].append(timestamp)
+    return times
+
+
+class DwellScheduler:
+    """
+    Plans the dwell windows of a single time-shared radio.
+
+    Each job (e.g. rtl_433 at 915 MHz, LoRa at 433 MHz, see the 'jobs'
+    section of config.json) listens for a set of stations. The transmit
+    period and phase of every station are learned from its recent
+    timestamps in storage; from these the next packets are predicted and
+    the radio is switched to a job only when one of its stations is about
+    to transmit, paying the job's switching cost (tuning, decoder
+    start-up) ahead of the packet.
+
+    Choosing which predicted packets to catch is a weighted interval
+    scheduling problem: packets of one job can be caught back to back,
+    packets of different jobs need the switching cost in between. It is
+    solved exactly by dynamic programming over the predicted packets,
+    weighting every packet by 1 / (packets of its station in the horizon)
+    so that the sum of per-station capture rates is maximised.
+
+    Jobs with stations whose schedule is not known yet, or that have not
+    been heard for `stale` seconds, get a plain learning dwell (learn_time
+    seconds) instead, at most every `relearn` seconds.
+
+    """
+
+    def __init__(self, settings, jobs):
+        self.settings = settings
+        self.jobs = jobs
+        self.schedules = {}  # (protocol, ID) -> Schedule
+        self.packets = {}    # (protocol, ID) -> packet times
+        self.last_learn = {}
+
+    def stations(self, job):
+        protocol = self.jobs[job]['protocol']
+        return [(protocol, ID) for ID in self.jobs[job]['stations']]
+
+    def learn(self, now):
+        """
+        Re-fit the schedules of all stations to the stored data.
+
+        Returns
+        -------
+        None.
+
+        """
+        since = now - self.settings['history']
+        by_protocol = {}
+        for job in self.jobs:
+            for protocol, ID in self.stations(job):
+                by_protocol.setdefault(protocol, []).append(ID)
+
+        for protocol, IDs in by_protocol.items():
+            registry = load_stations(protocol)
+            for ID, times in station_times(protocol, IDs, since, now).items():
+                packets = distinct_times(times, self.settings['repeat'])
+                self.packets[(protocol, ID)] = packets
+                schedule = None
+                # a station not heard for a while has drifted off its schedule
+                if (len(packets) >= self.settings['min_packets']
+                        and now - packets[-1] <= self.settings['stale']):
+                    schedule = estimate_schedule(packets, registry.get(ID, {}).get('period'))
+                self.schedules[(protocol, ID)] = schedule
+
+    def plan(self, now, current=None):
+        """
+        Plan the dwells of the next `horizon` seconds.
+
+        Parameters
+        ----------
+        now : float
+            Epoch time the plan starts at.
+        current : str, optional
+            Job the radio is tuned to now (no switching cost).
+
+        Returns
+        -------
+        list of Dwell
+            Dwells in time order; may be empty if nothing is predicted.
+
+        """
+        # the job that waited longest learns first
+        for job in sorted(self.jobs, key=lambda job: self.last_learn.get(job, float('-inf'))):
+            unknown = any(self.schedules.get(station) is None for station in self.stations(job))
+            if unknown and now - self.last_learn.get(job, float('-inf')) >= self.settings['relearn']:
+                self.last_learn[job] = now
+                return [Dwell(job, now, now + self.settings['learn_time'])]
+
+        end = now + self.settings['horizon']
+        events = []
+        for job in self.jobs:
+            for station in self.stations(job):
+                schedule = self.schedules.get(station)
+                if schedule is None:
+                    continue
+                guard = min(max(self.settings['guard'], 3 * schedule.jitter), schedule.period / 2)
+                times = predict(schedule, now - guard, end)
+                for t in times:
+                    events.append((t - guard, t + guard, job, 1 / len(times)))
+        events.sort()
+
+        def switch_cost(job):
+            return self.jobs[job]['switch_cost']
+
+        # best[i]: largest total weight of a feasible chain ending with event i
+        best = []
+        previous = []
+        for i, (start, stop, job, weight) in enumerate(events):
+            if (job == current and stop > now) or start >= now + switch_cost(job):
+                score, link = weight, None
+            else:
+                score, link = float('-inf'), None
+            for j in range(i):
+                if best[j] + weight <= score:
+                    continue
+                other = events[j]
+                if other[2] == job or other[1] + switch_cost(job) <= start:
+                    score, link = best[j] + weight, j
+            best.append(score)
+            previous.append(link)
+
+        chain = []
+        if best and max(best) > 0:
+            i = max(range(len(best)), key=best.__getitem__)
+            while i is not None:
+                chain.append(events[i])
+                i = previous[i]
+        chain.reverse()
+
+        dwells = []
+        for start, stop, job, weight in chain:
+            if dwells and dwells[-1].job == job:
+                dwells[-1] = dwells[-1]._replace(end=max(dwells[-1].end, stop))
+            elif not dwells and job == current:
+                dwells.append(Dwell(job, now, stop))
+            else:
+                dwells.append(Dwell(job, max(now, start - switch_cost(job)), stop))
+        return dwells
+
+    def capture_rates(self, now):
+        """
+        Capture rate of every station with a known schedule over `history`.
+
+        Returns
+        -------
+        dict
+            'protocol.ID' -> fraction of transmissions received.
+
+        """
+        rates = {}
+        for (protocol, ID), schedule in self.schedules.items():
+            if schedule is not None:
+                rates[f'{protocol}.{ID}'] = capture_rate(self.packets[(protocol, ID)], schedule,
+                                                         now - self.settings['history'], now)
+        return rates
+
+
+if __name__ == '__main__':
+    # Show the learned schedules and the next plan, e.g. on Sample Data
+    # imported into the store: python3 dwell_scheduler.py --now "2024-08-12 00:00:00"
+    parser = argparse.ArgumentParser(description='Show learned station schedules and dwell plan.')
+    parser.add_argument('--now', help='plan as of this local time (default: now)')
+    args = parser.parse_args()
+
+    now = datetime.strptime(args.now, "%Y-%m-%d %H:%M:%S").timestamp() if args.now else time.time()
+    config = load_config()
+    scheduler = DwellScheduler(config['dwell'], {name: job for name, job in config['jobs'].items()
+                                                 if job['runner'] != 'rtldavis'})
+    scheduler.learn(now)
+
+    for (protocol, ID), schedule in scheduler.schedules.items():
+        if schedule is None:
+            print(f'{protocol} {ID}: not enough packets')
+        else:
+            print(f'{protocol} {ID}: period {schedule.period:.2f} s, jitter {schedule.jitter:.2f} s, '
+                  f'{schedule.packets} packets')
+    for name, rate in scheduler.capture_rates(now).items():
+        print(f'capture rate {name}: {rate:.0%}')
+    for dwell in scheduler.plan(now):
+        print(f'{datetime.fromtimestamp(dwell.start):%H:%M:%S}-{datetime.fromtimestamp(dwell.end):%H:%M:%S} '
+              f'{dwell.job}')
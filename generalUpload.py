@@ -1,112 +1,96 @@
-import subprocess
-import time
-import json
-import paho.mqtt.client as mqtt
-import certifi
-from datetime import datetime, timezone
+from datetime import datetime
+from publisher import create_publisher
+from payloads import queue_messages
+from upload_queue import open_queue
+from latest_table import read_latest
+from rollup import window_fields
+from stations import get_protocol, load_stations, make_fields
+
+# time of the last reading queued per station, so unchanged readings are not sent twice
+last_uploaded = {}
 	 
 def read_database():
 
-    temp_dict = {}
-    with open('genws_data.json', 'r') as payload:
-        print ("General Weather Sensors: Gathering Weather data")
-        weather_data = payload.readlines()
-        weather_data_reversed = weather_data[::-1]
-        sensors = [21881, 102]
-        for id in sensors:
-            for lines in weather_data_reversed:
-                lines_to_dict = json.loads(lines)
-                if id == lines_to_dict['id']:
-                    temp_dict[id] = lines_to_dict
-                    print(id)
-                    break
-
-    return (temp_dict)
-
-def on_connect(client, userdata, flag, rc):
-    print("General Weather Stations: MQTT Server connection successfully established") 
+    print ("General Weather Sensors: Gathering Weather data")
+    # shared-memory table of the running decoders (see latest_table.py),
+    # or the newest stored lines if there is none
+    return read_latest('rtl_433')
 
 def make_message(station_ID, data):
     out_msg = {}
     out_msg['type'] = "data"
-    out_msg['source'] = data['model'] +"_" + str(station_ID)
+    out_msg['source'] = load_stations('rtl_433')[station_ID]['source']
     out_msg['local_time'] = datetime.now().isoformat()
-        
-    if (data['model'] == "EcoWitt-WH40"):
-        out_msg['WH40_RA'] = float(data['rain_mm'])
-    else: 
-        out_msg['WH31E_TMP'] = float(data['temperature_C'])
-        out_msg['WH31E_RH'] = float(data['humidity'])
-  
+    out_msg.update(make_fields('rtl_433', station_ID, data))
+    # min/max/mean of the last 15-minute window, once it has closed
+    out_msg.update(window_fields('rtl_433', station_ID))
     
-    return json.dumps(out_msg)
+    return out_msg
     
-def upload_data():
-    date_format = '%Y-%m-%d %H:%M:%S'
+def upload_data(publisher):
+    date_format = get_protocol('rtl_433')['time_format']
     
     try:
-        print ("General Weather Stations: Connecting to MQTT Server....")
-	    
-        client = mqtt.Client()
-        client.on_connect = on_connect
-
-        MQTT_HOST = "ed7632329e6e4fbcbe77b1fa917585a1.s1.eu.hivemq.cloud"
-        MQTT_PORT = 8883
-        MQTT_USER = "jbcaminsi"
-        MQTT_PW = "UPcareteam2e"
+        # retrieve data from local database
+        weather_data = read_database()
+        print(f"Successfully fetched: {weather_data}")
+        print("Uploading data...")
         
-        client.tls_set(certifi.where())
-        client.username_pw_set(MQTT_USER, MQTT_PW)
-
-        client.connect(MQTT_HOST, MQTT_PORT)
+        del_key = []
 
-        client.loop_start()
-        time.sleep(3)
+        # for general
         
-        try:
-            # retrieve data from local database
-            weather_data = read_database()
-            print(f"Successfully fetched: {weather_data}")
-            print("Uploading data...")
+        # separate/filter out those not within 15 minutes
+        for key in weather_data:
+            latest = weather_data[key]['time']
+            latest_datetime = datetime.strptime(latest, date_format)
             
-            del_key = []
+            duration = datetime.now() - latest_datetime
+            if duration.seconds > 900 or duration.days > 0:
+                del_key.append(key)
+            elif latest == last_uploaded.get(key):
+                del_key.append(key) # already uploaded
 
-            # for general
-            
-            # separate/filter out those not within 15 minutes
-            for key in weather_data:
-                latest = weather_data[key]['time']
-                latest_datetime = datetime.strptime(latest, date_format)
-                
-                duration = datetime.now() - latest_datetime
-                if duration.seconds > 900 or duration.days > 0:
-                    del_key.append(key)
+        for key in del_key:
+            del weather_data[key]            
+        
+        
+        # publish data into online database
+        if len(weather_data) == 0:
+            print(f'No publication made. The most recent data was obtained {duration.seconds} seconds ago.')
+        else:                
+            messages = []
+            reading_times = []
+            queued = {}
+            for keys in list(weather_data.keys()):
+                messages.append(make_message(keys, weather_data[keys]))
+                reading_times.append(datetime.strptime(weather_data[keys]['time'], date_format).timestamp())
+                queued[keys] = weather_data[keys]['time']
+                print(f"General Weather Sensors payload: {messages[-1]}")
 
-            for key in del_key:
-                del weather_data[key]            
-            
-            
-            # publish data into online database
-            if len(weather_data) == 0:
-                print(f'No publication made. The most recent data was obtained {duration.seconds} seconds ago.')
-            else:                
-                for keys in list(weather_data.keys()):
-                    pmsg = make_message(keys, weather_data[keys])
-                    client.publish("UPCARE/UNDERGRAD/COE199_SDR", pmsg)
-                    print(f"General Weather Sensors payload: {pmsg}")
-                    time.sleep(2)
-                print(len(weather_data))
-                print("Finished sending all data from General Weather Sensors")
-             
-        except Exception as e:
-            print(f"Error occurred: {e}")
-            
-        finally:
-            client.disconnect()
-            client.loop_stop()
-            
+            # kept on disk until the broker acknowledges it; batched and
+            # encoded as set in the 'payload' section of config.json
+            queue_messages(open_queue(), 'rtl_433', messages, reading_times)
+            # only now that they are on disk, so a failure leaves them to the next cycle
+            last_uploaded.update(queued)
+            print(len(weather_data))
+            print("Finished queueing all data from General Weather Sensors")
+         
     except Exception as e:
-        print("Error:", e)
+        print(f"Error occurred: {e}")
+
+    finally:
+        # send this cycle's messages and any backlog left by an outage
+        sent = open_queue().drain(publisher)
+        print(f"{sent} queued messages sent")
 
 if __name__=='__main__':
-    upload_data()
+    try:
+        publisher = create_publisher()
+        try:
+            upload_data(publisher)
+        finally:
+            publisher.stop()
+
+    except Exception as e:
+        print("Error:", e)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+
+import metrics
+from config import load_config
+
+# Flash page size assumed for the write amplification estimate
+PAGE_SIZE = 4096
+
+FSYNC_POLICIES = ('none', 'batch', 'periodic')
+
+
+class GroupWriter:
+    """
+    Buffered append-only writer of one file, committing records in groups.
+
+    Written data is kept in memory and appended to the file with a single
+    write() once `max_bytes` are pending, or by the background flusher once
+    the oldest pending data is `max_delay` seconds old. The `fsync` policy
+    decides when committed data is forced to the SD card:
+
+        none      never; the kernel writes it back (ext4: within ~30 s)
+        batch     after every commit
+        periodic  at most every `fsync_interval` seconds
+
+    Every commit of a few bytes rewrites a whole flash page, so for each
+    file the pages touched per commit are counted against the bytes
+    written; their ratio is recorded as write_amplification.<name> in
+    metrics_storage.json, next to the latency of every commit
+    (flush_seconds.<name>) and fsync (fsync_seconds.<name>).
+
+    Writers are flushed, and synced unless the policy is 'none', by
+    flush(), close() and at exit.
+
+    """
+
+    def __init__(self, path, settings, name=None):
+        self.path = path
+        self.settings = settings
+        self.name = name or os.path.basename(path)
+        if settings['fsync'] not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy {settings['fsync']!r}, expected one of {FSYNC_POLICIES}")
+
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._offset = os.fstat(self._fd).st_size
+        self._pending = []
+        self._pending_bytes = 0
+        self._first_pending = None
+        self._unsynced = False
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+        _register(self)
+
+    @property
+    def offset(self):
+        """Size of the file once the pending data is committed."""
+        return self._offset + self._pending_bytes
+
+    def write(self, data):
+        """
+        Queue data (str or bytes) for appending.
+
+        Returns
+        -------
+        None.
+
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with self._lock:
+            if self._fd is None:
+                raise ValueError(f'{self.path} is closed')
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+            if self._pending_bytes >= self.settings['max_bytes']:
+                self._commit()
+
+    def _commit(self):
+        if not self._pending:
+            return
+        data = b''.join(self._pending)
+        view = memoryview(data)
+        written = 0
+
+        started = time.perf_counter()
+        try:
+            while written < len(data):
+                # a write may be short (signal, nearly full disk)
+                written += os.write(self._fd, view[written:])
+        finally:
+            # whatever did not reach the file stays pending for the next
+            # commit, e.g. after ENOSPC
+            self._pending = [data[written:]] if written < len(data) else []
+            self._pending_bytes = len(data) - written
+            if not self._pending:
+                self._first_pending = None
+            if written:
+                # a commit rewrites every page from the one holding the old end of file
+                pages = (self._offset + written + PAGE_SIZE - 1) // PAGE_SIZE - self._offset // PAGE_SIZE
+                _count_bytes(self.name, written, pages * PAGE_SIZE)
+                self._offset += written
+                self._unsynced = True
+        metrics.observe(f'flush_seconds.{self.name}', time.perf_counter() - started)
+        metrics.observe(f'flush_bytes.{self.name}', len(data))
+
+        if self.settings['fsync'] == 'batch':
+            self._sync()
+
+    def _sync(self):
+        if not self._unsynced:
+            return
+        started = time.perf_counter()
+        os.fsync(self._fd)
+        metrics.observe(f'fsync_seconds.{self.name}', time.perf_counter() - started)
+        self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def tick(self, now=None):
+        """
+        Commit data that has waited `max_delay` seconds, and sync under
+        the 'periodic' policy. Called by the background flusher.
+
+        Returns
+        -------
+        None.
+
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._fd is None:
+                return
+            if self._first_pending is not None and now - self._first_pending >= self.settings['max_delay']:
+                self._commit()
+            if self.settings['fsync'] == 'periodic' and now - self._last_sync >= self.settings['fsync_interval']:
+                self._sync()
+
+    def commit(self):
+        """
+        Commit all pending data, without syncing.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if self._fd is not None:
+                self._commit()
+
+    def flush(self):
+        """
+        Commit all pending data, and sync it unless the policy is 'none'.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if self._fd is None:
+                return
+            self._commit()
+            if self.settings['fsync'] != 'none':
+                self._sync()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        _unregister(self)
+
+
+_writers = set()
+_writers_lock = threading.Lock()
+_flusher = None
+_logical_bytes = {}   # name -> bytes written
+_physical_bytes = {}  # name -> bytes of the pages they touched
+
+
+def _count_bytes(name, logical, physical):
+    with _writers_lock:
+        _logical_bytes[name] = _logical_bytes.get(name, 0) + logical
+        _physical_bytes[name] = _physical_bytes.get(name, 0) + physical
+        metrics.set_value(f'write_amplification.{name}', _physical_bytes[name] / _logical_bytes[name])
+
+
+def _register(writer):
+    global _flusher
+    with _writers_lock:
+        _writers.add(writer)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, daemon=True)
+            _flusher.start()
+            atexit.register(flush_all)
+
+
+def _unregister(writer):
+    with _writers_lock:
+        _writers.discard(writer)
+
+
+def _flush_loop():
+    last_dump = time.monotonic()
+    while True:
+        time.sleep(0.25)
+        with _writers_lock:
+            writers = list(_writers)
+        for writer in writers:
+            try:
+                writer.tick()
+            except OSError as e:
+                print(f'Writing {writer.path} failed: {e}')
+        if time.monotonic() - last_dump >= 60:
+            last_dump = time.monotonic()
+            metrics.dump('metrics_storage.json')
+
+
+def flush_all():
+    """
+    Commit (and sync, per policy) the pending data of every writer of
+    this process, e.g. on shutdown.
+
+    Returns
+    -------
+    None.
+
+    """
+    with _writers_lock:
+        writers = list(_writers)
+    for writer in writers:
+        writer.flush()
+    if _flusher is not None:
+        metrics.dump('metrics_storage.json')
+
+
+def open_writer(path, name=None):
+    """
+    A writer with the settings of the 'group_commit' section of config.json.
+
+    Returns
+    -------
+    GroupWriter
+        The writer.
+
+    """
+    return GroupWriter(path, load_config()['group_commit'], name)
+
+
+if __name__ == '__main__':
+    # Compare policies by appending fake readings, e.g.:
+    #   python3 group_writer.py /tmp/test.jsonl --fsync batch --max-bytes 0
+    parser = argparse.ArgumentParser(description='Append fake readings through a group-commit writer and report its metrics.')
+    parser.add_argument('file')
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=1000.0, help='records per second')
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES)
+    parser.add_argument('--max-bytes', type=int)
+    parser.add_argument('--max-delay', type=float)
+    args = parser.parse_args()
+
+    settings = dict(load_config()['group_commit'])
+    for key, value in [('fsync', args.fsync), ('max_bytes', args.max_bytes), ('max_delay', args.max_delay)]:
+        if value is not None:
+            settings[key] = value
+
+    writer = GroupWriter(args.file, settings, 'test')
+    started = time.perf_counter()
+    for i in range(args.records):
+        writer.write(json.dumps({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'ID': 1, 'temperature': 20 + i % 10}) + '\n')
+        time.sleep(max(0.0, started + (i + 1) / args.rate - time.perf_counter()))
+    writer.close()
+
+    for name, metric in sorted(metrics.snapshot().items()):
+        print(name, json.dumps(metric))
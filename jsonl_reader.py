@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import json
+import os
+
+
+def reverse_lines(filename, block_size=8192):
+    """
+    Yield the lines of a JSONL file from newest (last) to oldest (first).
+
+    The file is read backwards in fixed-size blocks starting from its end,
+    so only the block being scanned and one partial line are held in memory
+    at a time. Blank lines are skipped. Callers can simply stop iterating
+    once they have what they need; the rest of the file is never read.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the JSONL file.
+    block_size : int, optional
+        Number of bytes read per seek. The default is 8192.
+
+    Yields
+    ------
+    str
+        One line of the file, without its trailing newline.
+
+    """
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+
+            lines = block.split(b'\n')
+            # the first piece may be the tail end of a line that
+            # continues in the previous block
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line.decode('utf-8')
+
+        if remainder.strip():
+            yield remainder.decode('utf-8')
+
+
+def repair_tail(filename, block_size=8192):
+    """
+    Make a JSONL file safe to append to after an unclean shutdown.
+
+    Only the last line of the file is inspected. If it is not valid JSON
+    (a write torn by a crash or power loss) it is truncated away; if the
+    file does not end with a newline, one is added. The cost depends only
+    on the length of the last line, never on the size of the file.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the JSONL file. Nothing is done if it does not exist.
+    block_size : int, optional
+        Number of bytes read per seek. The default is 8192.
+
+    Returns
+    -------
+    None.
+
+    """
+    try:
+        f = open(filename, 'rb+')
+    except FileNotFoundError:
+        return
+
+    with f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end == 0:
+            return
+
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            return
+
+        # find the start of the unterminated last line
+        position = end
+        start = 0
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            newline = f.read(read_size).rfind(b'\n')
+            if newline != -1:
+                start = position + newline + 1
+                break
+
+        f.seek(start)
+        last_line = f.read(end - start)
+        try:
+            json.loads(last_line)
+        except ValueError:
+            print(f'Discarding torn line at the end of {filename}: {last_line!r}')
+            f.truncate(start)
+        else:
+            f.seek(0, os.SEEK_END)
+            f.write(b'\n')
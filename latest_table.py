@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import argparse
+import atexit
+import math
+import time
+from array import array
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+
+from config import load_config
+from stations import get_protocol, latest_readings, load_stations, record_time, station_id
+from storage import open_store
+
+
+class LatestTable:
+    """
+    Latest reading of every station in shared memory.
+
+    The table has one fixed-width slot per (source, station) of the
+    'stations' section of config.json, in that order, so every process
+    derives the same layout from the configuration. A slot is
+
+        sequence number, reading time (epoch), field values...
+
+    as 8-byte words, the fields being the station's uploaded 'fields'
+    (NaN when missing). Each slot is a seqlock: the writer makes the
+    sequence number odd while it updates the slot and even again when
+    done, and readers retry until they copied the slot between two equal,
+    even sequence numbers. Every slot has a single writer (the decoder of
+    its source), so neither side takes a lock.
+
+    """
+
+    def __init__(self, memory, owner=False):
+        self.memory = memory
+        self.owner = owner
+        self.slots = {}  # (source, ID) -> (slot offset, field keys)
+        self.width = 2 + max((len(station['fields']) for station in load_config()['stations']), default=0)
+        for i, station in enumerate(load_config()['stations']):
+            self.slots[(station['protocol'], station['id'])] = (i * self.width, list(station['fields']))
+
+        self.sequences = memory.buf.cast('Q')
+        self.words = memory.buf.cast('d')
+
+    @classmethod
+    def size(cls):
+        stations = load_config()['stations']
+        return 8 * len(stations) * (2 + max((len(station['fields']) for station in stations), default=0))
+
+    def write(self, source, record):
+        """
+        Store a record as the latest reading of its station.
+
+        Returns
+        -------
+        bool
+            False if the station is not registered.
+
+        """
+        try:
+            slot = self.slots.get((source, station_id(source, record)))
+            received = record_time(source, record).timestamp()
+        except (KeyError, ValueError):
+            return False
+        if slot is None:
+            return False
+
+        offset, keys = slot
+        values = array('d', [received] + [math.nan] * (self.width - 2))
+        for i, key in enumerate(keys):
+            try:
+                values[1 + i] = float(record[key])
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        # odd while writing (also after a writer died half-way)
+        sequence = self.sequences[offset] | 1
+        self.sequences[offset] = sequence
+        self.words[offset + 1:offset + self.width] = values
+        self.sequences[offset] = sequence + 1
+        return True
+
+    def read_slot(self, offset):
+        """
+        Consistent copy of one slot.
+
+        Returns
+        -------
+        list of float or None
+            Reading time and field values, or None if the slot stays
+            locked (its writer died while updating it).
+
+        """
+        for _ in range(1000):
+            sequence = self.sequences[offset]
+            if sequence % 2 == 0:
+                values = self.words[offset + 1:offset + self.width].tolist()
+                if self.sequences[offset] == sequence:
+                    return values
+            time.sleep(0)
+        return None
+
+    def read(self, source):
+        """
+        Latest reading of every station of a source.
+
+        Returns
+        -------
+        dict
+            Station ID -> record in the format of the source's storage
+            (time key, ID key and the uploaded fields), for the stations
+            that have a reading.
+
+        """
+        settings = get_protocol(source)
+        readings = {}
+        for (protocol, ID), (offset, keys) in self.slots.items():
+            if protocol != source:
+                continue
+            values = self.read_slot(offset)
+            if values is None or not values[0] > 0:
+                continue
+            record = {settings['time_key']: datetime.fromtimestamp(round(values[0], 6)).strftime(settings['time_format']),
+                      settings['id_key']: ID}
+            for key, value in zip(keys, values[1:]):
+                if not math.isnan(value):
+                    record[key] = value
+            readings[ID] = record
+        return readings
+
+    def close(self):
+        self.sequences.release()
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+_table = None
+_last_attach = float('-inf')
+_stored = {}  # source -> latest stored readings, looked up once per process
+
+
+def create_table(seed=True):
+    """
+    Create the table of this program (see the 'latest_table' section of
+    config.json), replacing a stale one left by a crash, and make it the
+    table of this process.
+
+    Parameters
+    ----------
+    seed : bool, optional
+        Fill in the latest stored reading of every station.
+
+    Returns
+    -------
+    LatestTable
+        The table; close() it at exit to remove it.
+
+    """
+    global _table
+    name = load_config()['latest_table']['name']
+    try:
+        stale = shared_memory.SharedMemory(name)
+        stale.close()
+        stale.unlink()
+    except FileNotFoundError:
+        pass
+
+    _table = LatestTable(shared_memory.SharedMemory(name, create=True, size=LatestTable.size()), owner=True)
+    if seed:
+        for protocol in {station['protocol'] for station in load_config()['stations']}:
+            for record in latest_readings(protocol, open_store(protocol).iter_newest()).values():
+                _table.write(protocol, record)
+    return _table
+
+
+def shared_table():
+    """
+    The table of this process: the one it created, or the one of the
+    running program attached by name (tried at most every 10 seconds).
+
+    Returns
+    -------
+    LatestTable or None
+        The table, or None if it is disabled or not there.
+
+    """
+    global _table, _last_attach
+    settings = load_config()['latest_table']
+    if _table is not None or not settings['enabled'] or time.monotonic() - _last_attach < 10:
+        return _table
+    _last_attach = time.monotonic()
+    try:
+        memory = shared_memory.SharedMemory(settings['name'])
+    except FileNotFoundError:
+        return None
+    # the creating process removes it; before Python 3.13 an attached
+    # process would remove it too when it exits
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    if memory.size < LatestTable.size():
+        memory.close()
+        return None
+    _table = LatestTable(memory)
+    atexit.register(_table.close)
+    return _table
+
+
+def update_latest(source, record):
+    """
+    Write a newly stored record to the table, if there is one.
+
+    Returns
+    -------
+    None.
+
+    """
+    table = shared_table()
+    if table is not None:
+        table.write(source, record)
+
+
+def read_latest(source):
+    """
+    Latest reading of every station of a source, from the table when the
+    program is running, otherwise from storage. Both leave out fields
+    older than the protocol's 'max_age' (see latest_readings()), so a
+    station has the same fields either way.
+
+    Stations missing from the table (e.g. ones that have not reported
+    since the program started) are looked up in storage, but only once
+    per process: every later reading goes to the table, which then takes
+    precedence. A station that never reported would otherwise make every
+    call scan the whole store.
+
+    Returns
+    -------
+    dict
+        Latest record of each station, keyed by station ID.
+
+    """
+    table = shared_table()
+    if table is None:
+        return latest_readings(source, open_store(source).iter_newest())
+    readings = table.read(source)
+    if source not in _stored and load_stations(source).keys() - readings.keys():
+        _stored[source] = latest_readings(source, open_store(source).iter_newest())
+    return {**_stored.get(source, {}), **readings}
+
+
+if __name__ == '__main__':
+    # Show the table of the running program, and how long a read takes
+    parser = argparse.ArgumentParser(description='Show the latest readings in shared memory.')
+    parser.add_argument('source', nargs='*', default=['davis', 'rtl_433', 'lora'])
+    args = parser.parse_args()
+
+    table = shared_table()
+    if table is None:
+        print('No latest-reading table; is main_program.py running?')
+    else:
+        for source in args.source:
+            started = time.perf_counter()
+            readings = table.read(source)
+            elapsed = time.perf_counter() - started
+            for ID, record in readings.items():
+                print(f'{source} {ID}: {record}')
+            print(f'{source}: read in {elapsed * 1e6:.0f} us')
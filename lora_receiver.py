@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import socket
+import time
+from datetime import datetime
+
+import metrics
+from config import load_config
+from dedup import RepeatFilter
+from stations import get_protocol
+from storage import open_store
+
+# Frame keys of the LoRa transmitters -> record keys (see LoRa transmitters/*.ino)
+FRAME_KEYS = {'Temp': 'Temperature',
+              'RH': 'Relative Humidity',
+              'AQ': 'Air Quality',
+              'Gas': 'Smoke and Flammable Gas'}
+
+
+def parse_frame(text, timestamp=None):
+    """
+    Decode one LoRa frame, e.g. "ID=433 Temp=31.20 RH=71.70 AQ=102.00".
+
+    Parameters
+    ----------
+    text : str
+        Frame payload as sent by the transmitter.
+    timestamp : datetime.datetime, optional
+        Reception time. The default is now.
+
+    Returns
+    -------
+    dict or None
+        Record in the format of the lora storage ('TimeStamp', 'Frequency'
+        and the measured values), or None if the frame has no ID or no
+        known values.
+
+    """
+    values = {}
+    for item in text.split():
+        key, _, value = item.partition('=')
+        values[key] = value
+
+    if 'ID' not in values:
+        return None
+    try:
+        record = {'TimeStamp': (timestamp or datetime.now()).strftime(get_protocol('lora')['time_format']),
+                  'Frequency': f"{int(values['ID'])} MHz"}
+        for key, name in FRAME_KEYS.items():
+            if key in values:
+                record[name] = float(values[key])
+    except ValueError:
+        return None
+    return record if len(record) > 2 else None
+
+
+class LoRaReceiver(asyncio.DatagramProtocol):
+    """
+    Receives the frames SDRangel's ChirpChat demodulator sends over UDP.
+
+    Frames are decoded, repeats within `repeat_window` seconds dropped
+    (see dedup.RepeatFilter) and the records appended to the lora store in
+    batches of `batch_size`, or after `max_delay` seconds. The receiver
+    runs for the lifetime of the program; SDRangel starting, stopping or
+    retuning does not affect it.
+
+    """
+
+    def __init__(self, store, repeat_window=2.0, batch_size=20, max_delay=2.0, on_record=None):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.on_record = on_record
+
+        self.repeats = RepeatFilter(repeat_window)
+        self.invalid = 0
+        self._pending = []
+        self._flush_handle = None
+
+    def datagram_received(self, data, addr):
+        text = data.rstrip(b'\x00').decode('ascii', errors='replace').strip()
+        if self.repeats.is_repeat(text):
+            return
+
+        record = parse_frame(text)
+        if record is None:
+            self.invalid += 1
+            print(f"Unrecognised LoRa frame: {text!r}")
+            return
+
+        print(record)
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+
+    def flush(self):
+        """
+        Append all pending records to the store.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        records, self._pending = self._pending, []
+        if not records:
+            return
+
+        self.store.append_many(records)
+        if self.on_record is not None:
+            for record in records:
+                self.on_record(record)
+
+        metrics.set_value('lora_frames.unique', self.repeats.unique)
+        metrics.set_value('lora_frames.repeats', self.repeats.repeats)
+        metrics.set_value('lora_frames.invalid', self.invalid)
+
+
+async def serve(settings=None, on_record=None, stop=None):
+    """
+    Run the receiver until `stop` is set (forever by default).
+
+    Parameters
+    ----------
+    settings : dict, optional
+        The 'lora_receiver' section of config.json.
+    on_record : callable, optional
+        Called with every stored record.
+    stop : asyncio.Event, optional
+        Set to shut the receiver down; pending records are stored.
+
+    Returns
+    -------
+    None.
+
+    """
+    if settings is None:
+        settings = load_config()['lora_receiver']
+    loop = asyncio.get_running_loop()
+    transport, receiver = await loop.create_datagram_endpoint(
+        lambda: LoRaReceiver(open_store('lora'), settings['repeat_window'],
+                             settings['batch_size'], settings['max_delay'], on_record),
+        local_addr=(settings['host'], settings['port']))
+    print(f"Listening for LoRa frames on {settings['host']}:{settings['port']}")
+    try:
+        await (stop or asyncio.Event()).wait()
+    finally:
+        transport.close()
+        receiver.flush()
+        open_store('lora').flush()
+
+
+def run(on_record=None):
+    """
+    Blocking entry point, e.g. for a thread of main_program.py.
+
+    Returns
+    -------
+    None.
+
+    """
+    asyncio.run(serve(on_record=on_record))
+
+
+def send_frames(frames, host='127.0.0.1', port=9999, copies=1, interval=0.0):
+    """
+    Send frames the way SDRangel does, as a stand-in for testing.
+
+    Parameters
+    ----------
+    frames : list of str
+        Frame payloads.
+    copies : int, optional
+        How often each frame is sent (repeats).
+    interval : float, optional
+        Seconds between datagrams.
+
+    Returns
+    -------
+    None.
+
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for frame in frames:
+            for _ in range(copies):
+                sock.sendto(frame.encode('ascii'), (host, port))
+                time.sleep(interval)
+
+
+if __name__ == '__main__':
+    # Without frames: run the receiver. With frames: stand in for SDRangel, e.g.
+    #   python3 lora_receiver.py &
+    #   python3 lora_receiver.py "ID=433 Temp=31.20 RH=71.70 AQ=102.00" --copies 2
+    settings = load_config()['lora_receiver']
+    parser = argparse.ArgumentParser(description='Receive (or send) ChirpChat LoRa frames over UDP.')
+    parser.add_argument('frames', nargs='*', help='frames to send instead of receiving')
+    parser.add_argument('--host', default=settings['host'])
+    parser.add_argument('--port', type=int, default=settings['port'])
+    parser.add_argument('--copies', type=int, default=1, help='send every frame this many times')
+    args = parser.parse_args()
+
+    if args.frames:
+        send_frames(args.frames, args.host, args.port, args.copies)
+    else:
+        settings = dict(settings, host=args.host, port=args.port)
+        try:
+            asyncio.run(serve(settings))
+        except KeyboardInterrupt:
+            pass
@@ -1,557 +1,361 @@
 #!/usr/bin/env python3
 
+import asyncio
 import subprocess
+import threading
 import time
-from multiprocessing import Process
-import math
-import json
+from multiprocessing import Process, Queue
 from datetime import date
 
+import davisUpload
+import generalUpload
+import LoRaUpload
+import lora_receiver
+import metrics
+import rtl433_ingest
+from config import load_config
+from columnar_archive import archive_record, close_archives
+from davis_assembler import create_assembler
+from davis_decoder import parse_packet
+from dwell_scheduler import Dwell, DwellScheduler
+from group_writer import flush_all
+from latest_table import create_table, update_latest
+from publisher import create_publisher
+from radio_scheduler import RadioScheduler, probe
+from rollup import shared_rollup
+from rtldavis_monitor import CaptureRatioError, RtldavisMonitor, timed_lines
+from sdrangel import LORA_BANDS, SDRangelError, SDRangelSession
+from stations import latest_readings, record_time
+from storage import open_store
+from supervisor import EventQueue, StallError, Supervisor, WriteThread, run_in_thread, run_process, wait_stop
+from upload_scheduler import UploadScheduler
+
 # START of rtldavis software automation
 
-# Interpolate(), calc_wind_speed_ec(), calculate_thermistor_temp(),
-# and parse_packet() copied from weewx-rtldavis
-# https://github.com/lheijst/weewx-rtldavis/blob/master/bin/user/rtldavis.py
-
-def interpolate(rx0, rx1,
-                ry0, ry1,
-                x0, x1,
-                y0, y1,
-                x, y):
-
-    print("rx0=%s, rx1=%s, ry0=%s, ry1=%s, x0=%s, x1=%s, y0=%s, y1=%s, x=%s, y=%s" %
-              (rx0, rx1, ry0, ry1, x0, x1, y0, y1, x, y))
-
-    if rx0 == rx1:
-        return y + x0 + (y - ry0) / float(ry1 - ry0) * (y1 - y0)
-
-    if ry0 == ry1:
-        return y + y0 + (x - rx0) / float(rx1 - rx0) * (x1 - x0)
-
-    dy0 = x0 + (y - ry0) / float(ry1 - ry0) * (y0 - x0)
-    dy1 = x1 + (y - ry0) / float(ry1 - ry0) * (y1 - x1)
-
-    return y + dy0 + (x - rx0) / float(rx1 - rx0) * (dy1 - dy0)
-
-def calc_wind_speed_ec(raw_mph, raw_angle):
-
-    # some sanitization: no corrections needed under 3 and no values exist
-    # above 150 mph
-    if raw_mph < 3 or raw_mph > 150:
-        return raw_mph
-
-    # Error correction values for
-    #  [ 1..29 by 1, 30..150 by 5 raw mph ]
-    #   x
-    #  [ 1, 4, 8..124 by 4, 127, 128 raw degrees ]
-    #
-    # Extracted from a Davis Weather Envoy using a DIY transmitter to
-    # transmit raw values and logging LOOP packets.
-    # first row: raw angles;
-    # first column: raw speed;
-    # cells: values provided in response to raw data by the Envoy;
-    # [0][0] is filler
-    windtab = [
-        [0, 1, 4, 8, 12, 16, 20, 24, 28, 32, 36, 40, 44, 48, 52, 56, 60, 64, 68, 72, 76, 80, 84, 88, 92, 96, 100, 104, 108, 112, 116, 120, 124, 127, 128],
-        [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        [3, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0],
-        [4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0],
-        [5, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 0, 0],
-        [6, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 1, 1, 1, 1, 1, 0, 0],
-        [7, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 0, 0],
-        [8, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 0, 0],
-        [9, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1, 0, 0],
-        [10, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 0, 0],
-        [11, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 0, 0],
-        [12, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 0, 0],
-        [13, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
-        [14, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
-        [15, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
-        [16, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
-        [17, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
-        [18, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3, 3, 1, 0, 0],
-        [19, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 1, 0, 0],
-        [20, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
-        [21, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
-        [22, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
-        [23, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 3, 4, 4, 2, 0, 0],
-        [24, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 2, 3, 4, 4, 2, 0, 0],
-        [25, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 4, 4, 2, 0, 0],
-        [26, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 5, 4, 2, 0, 0],
-        [27, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
-        [28, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
-        [29, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
-        [30, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 3, 5, 5, 2, 0, 0],
-        [35, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 4, 6, 5, 2, 0, -1],
-        [40, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 4, 6, 6, 2, 0, -1],
-        [45, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 4, 7, 6, 2, -1, -1],
-        [50, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 7, 7, 2, -1, -2],
-        [55, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 8, 7, 2, -1, -2],
-        [60, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 8, 8, 2, -1, -2],
-        [65, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 2, 5, 9, 8, 2, -2, -3],
-        [70, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 0, 2, 5, 9, 9, 2, -2, -3],
-        [75, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 0, 2, 6, 10, 9, 2, -2, -3],
-        [80, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 0, 2, 6, 10, 10, 2, -2, -3],
-        [85, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 0, 2, 7, 11, 11, 2, -3, -4],
-        [90, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 2, 7, 12, 11, 2, -3, -4],
-        [95, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 2, 3, 2, 2, 2, 1, 1, 1, 1, 2, 7, 12, 12, 3, -3, -4],
-        [100, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2, 3, 3, 2, 2, 2, 1, 1, 1, 1, 2, 8, 13, 12, 3, -3, -4],
-        [105, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 2, 8, 13, 13, 3, -3, -4],
-        [110, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 2, 8, 14, 14, 3, -3, -5],
-        [115, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 2, 9, 15, 14, 3, -3, -5],
-        [120, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 3, 9, 15, 15, 3, -4, -5],
-        [125, 1, 1, 2, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 3, 3, 3, 2, 2, 1, 1, 1, 3, 10, 16, 16, 3, -4, -5],
-        [130, 1, 1, 2, 1, 1, 0, 0, 0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 3, 10, 17, 16, 3, -4, -6],
-        [135, 1, 2, 2, 1, 1, 0, 0, 0, -1, 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 4, 3, 3, 2, 2, 2, 1, 1, 3, 10, 17, 17, 4, -4, -6],
-        [140, 1, 2, 2, 1, 1, 0, 0, 0, -1, 0, 0, 1, 1, 2, 2, 3, 3, 3, 4, 4, 3, 3, 2, 2, 2, 1, 1, 3, 11, 18, 17, 4, -4, -6],
-        [145, 2, 2, 2, 1, 1, 0, 0, 0, -1, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4, 3, 3, 3, 2, 2, 1, 1, 3, 11, 19, 18, 4, -4, -6],
-        [150, 2, 2, 2, 1, 1, 0, 0, -1, -1, 0, 0, 1, 1, 2, 3, 3, 4, 4, 4, 4, 4, 3, 3, 2, 2, 1, 1, 3, 12, 19, 19, 4, -4, -6]
-    ]
-
-    # EC is symmetric between W/E (90/270°) - probably a wrong assumption,
-    # table needs to be redone for 0-360°
-    if raw_angle > 128:
-        raw_angle = 256 - raw_angle
-
-    s0 = a0 = 1
-
-    while windtab[s0][0] < raw_mph:
-        s0 += 1
-    while windtab[0][a0] < raw_angle:
-        a0 += 1
-
-    if windtab[s0][0] == raw_mph:
-        s1 = s0
-    else:
-        if s0 > 1:
-            s0 -= 1
-        s1 = len(windtab) - 1 if s0 == len(windtab) - 1 else s0 + 1
+# Define keywords to filter lines by
+RTLDAVIS_KEYWORDS = ['msg.ID=1', 'msg.ID=2']
 
-    if windtab[0][a0] == raw_angle:
-        a1 = a0
-    else:
-        if a0 > 1:
-            a0 -= 1
-        a1 = len(windtab[0]) - 2 if a0 == len(windtab) - 1 else a0 + 1
-
-    if s0 == s1 and a0 == a1:
-        return raw_mph + windtab[s0][a0]
-    else:
-        return interpolate(windtab[0][a0], windtab[0][a1],
-                                      windtab[s0][0], windtab[s1][0],
-                                      windtab[s0][a0], windtab[s0][a1],
-                                      windtab[s1][a0], windtab[s1][a1],
-                                      raw_angle, raw_mph)
-
-# Simple bilinear interpolation
-#
-#  a0         a1 <-- fixed raw angles
-#  x0---------x1 s0
-#  |          |
-#  |          |
-#  |      * <-|-- raw input angle, raw speed value (x, y)
-#  |          |
-#  y0---------y1 s1
-#                ^
-#                \__ speed: measured raw / correction values
-
-def calculate_thermistor_temp(temp_raw):
-    """ Decode the raw thermistor temperature, then calculate the actual
-    thermistor temperature and the leaf_soil potential, using Davis' formulas.
-    see: https://github.com/cmatteri/CC1101-Weather-Receiver/wiki/Soil-Moisture-Station-Protocol
-    :param temp_raw: raw value from sensor for leaf wetness and soil moisture
-    """
-
-    # Convert temp_raw to a resistance (R) in kiloOhms
-    a = 18.81099
-    b = 0.0009988027
-    r = a / (1.0 / temp_raw - b) / 1000 # k ohms
-
-    # Steinhart-Hart parameters
-    s1 = 0.002783573
-    s2 = 0.0002509406
-    try:
-        thermistor_temp = 1 / (s1 + s2 * math.log(r)) - 273
-        print('r (k ohm) %s temp_raw %s thermistor_temp %s' %
-                  (r, temp_raw, thermistor_temp))
-        return thermistor_temp
-    except ValueError as e:
-        print('thermistor_temp failed for temp_raw %s r (k ohm) %s'
-               'error: %s' % (temp_raw, r, e))
-    return 24
-    
-def parse_packet(msg_type, pkt):
-    data = {}
-    
-    # Each data packet of iss or anemometer contains wind info,
-    # but it is only valid when received from the channel with
-    # the anemometer connected
-    # message examples:
-    # 51 06 B2 FF 73 00 76 61
-    # E0 00 00 4E 05 00 72 61 (no sensor)
-    
-    # received pkt is in hexadecimal, type str
-    # hence the int(pkt[n], 16) syntax, which converts hexadecimal into integer
-    wind_speed_raw = int(pkt[1], 16)
-    wind_dir_raw = int(pkt[2], 16)
-    if not(wind_speed_raw == 0 and wind_dir_raw == 0):
-        """ The elder Vantage Pro and Pro2 stations measured
-        the wind direction with a potentiometer. This type has
-        a fairly big dead band around the North. The Vantage
-        Vue station uses a hall effect device to measure the
-        wind direction. This type has a much smaller dead band,
-        so there are two different formulas for calculating
-        the wind direction. To be able to select the right
-        formula the Vantage type must be known.
-        For now we use the traditional 'pro' formula for all
-        wind directions.
-        """
-        print("wind_speed_raw=%03x wind_dir_raw=0x%03x" %
-                  (wind_speed_raw, wind_dir_raw))
-
-        # Vantage Pro and Pro2
-        if wind_dir_raw == 0:
-            wind_dir_pro = 5.0
-        elif wind_dir_raw == 255:
-            wind_dir_pro = 355.0
-        else:
-            wind_dir_pro = 9.0 + (wind_dir_raw - 1) * 342.0 / 253.0
+def parse_rtldavis_line(line):
+    """
+    Decode one line of rtldavis output into a Davis record.
 
-            # Vantage Vue
-            wind_dir_vue = wind_dir_raw * 1.40625 + 0.3
+    Returns
+    -------
+    dict or None
+        The record, or None for lines without a packet of our stations.
 
-            # wind error correction is by raw byte values
-            wind_speed_ec = round(calc_wind_speed_ec(wind_speed_raw, wind_dir_raw))
+    """
+    if not any(keyword in line for keyword in RTLDAVIS_KEYWORDS):
+        return None
 
-            data['wind_dir'] = wind_dir_pro
-            data['wind_speed'] = wind_speed_ec
-            print("WS=%s WD=%s WS_raw=%s WS_ec=%s WD_raw=%s WD_pro=%s WD_vue=%s" %
-                      (data['wind_speed'], data['wind_dir'],
-                       wind_speed_raw, wind_speed_ec,
-                       wind_dir_raw if wind_dir_raw <= 180 else 360 - wind_dir_raw,
-                       wind_dir_pro, wind_dir_vue))
+    # Temporary Storage for New Data to Local Database
+    stored_data = {}
 
-    # data from both iss sensors and extra sensors on
-    # Anemometer Transport Kit
+    # Split the line into parts (separated by spaces)
+    data = line.split()
     
-    if msg_type == 3:
-        pass
-        
-    elif msg_type == 5:
-        time_between_tips_raw = ((int(pkt[4], 16) & 0x30) << 4) + int(pkt[3], 16)
-        print("time_between_tips_raw=%03x (%s)" %
-              (time_between_tips_raw, time_between_tips_raw))
-        rain_rate = None
-        
-        if time_between_tips_raw == 0x3ff:
-            # no rain
-            rain_rate = 0
-            print("No rain=%s mm/h" % rain_rate)
-            
-        elif int(pkt[4], 16) & 0x40 == 0:
-            # heavy rain
-            
-            time_between_tips = time_between_tips_raw / 16.0
-            rain_rate = 3600.0 / time_between_tips_raw * 0.2 # default is 0.2, can be 0.254
-            print("Heavy rain=%s mm/h, time_between_tips= %s s" % (rain_rate, time_between_tips))
-            
-        else:
-            # light rain
-            
-            time_between_tips = time_between_tips_raw
-            rain_rate = 3600.0 / time_between_tips_raw * 0.2 # default is 0.2, can be 0.254
-            print("Light rain=%s mm/h, Time between tips=%s s" % (rain_rate, time_between_tips))
-            
-        data['rain_rate'] = rain_rate
-            
-    elif msg_type == 8:
-        # outside temperature
-        # message examples:
-        # 80 00 00 33 8D 00 25 11 (digital temp)
+    # Specify Date and Time
+    timestamp = data[0]
+    stored_data['time'] = date.today().strftime("%Y-%m-%d") + " " + timestamp
     
-        # 81 00 00 59 45 00 A3 E6 (analog temp)
-        # 81 00 DB FF C3 00 AB F8 (no sensor)
-        
-        temp_raw = (int(pkt[3], 16) << 4) + (int(pkt[4], 16) >> 4)  # 12-bits temp value
-        if temp_raw != 0xFFC:
-            if int(pkt[4], 16) & 0x8:
-                # digital temp sensor
-                temp_f = temp_raw / 10.0
-                temp_c = (temp_f - 32) * 5 / 9 # C
-                print("Digital temp_raw=0x%03x temp_f=%s temp_c=%s"
-                          % (temp_raw, temp_f, temp_c))
-            else:
-                # analog sensor (thermistor)
-                temp_raw /= 4  # 10-bits temp value
-                temp_c = calculate_thermistor_temp(temp_raw)
-                print("thermistor temp_raw=%s temp_c=%s"
-                          % (temp_raw, temp_c))
-        data['temperature'] = temp_c
-                
-    elif msg_type == 9:
-        # 10-min average wind gust
-        # message examples:
-        # 91 00 DB 00 03 0E 89 85
-        # 90 00 00 00 05 00 31 51 (no sensor)
-        gust_raw = int(pkt[3], 16)  # mph
-        gust_index_raw = int(pkt[5], 16) >> 4
-        print("W10=%s gust_index_raw=%s" %
-                  (gust_raw, gust_index_raw))
-        
-        data['wind_gust'] = gust_raw
+    # Specify ID
+    ID = data[-1]
+    stored_data['ID'] = int(ID[-1])
+    
+    # Specify Data Packet
+    data_packet = data[1]
+    if len(data_packet) != 16:
+        return None
+    # ihiwalay yung packet into bytes
+    pkt = [data_packet[2*i:2*i+2] for i in range(8)]
             
-    elif msg_type == 0xA:
-        # outside humidity
-        # message examples:
-        # A0 00 00 C9 3D 00 2A 87 (digital sensor, variant a)
-        # A0 01 3A 80 3B 00 ED 0E (digital sensor, variant b)
-        # A0 01 41 7F 39 00 18 65 (digital sensor, variant c)
-        # A0 00 00 22 85 00 ED E3 (analog sensor)
-        # A1 00 DB 00 03 00 47 C7 (no sensor)
-        humidity_raw = ((int(pkt[4], 16) >> 4) << 8) + int(pkt[3], 16)
-        if humidity_raw != 0:
-            if int(pkt[4], 16) & 0x08 == 0x8:
-                # digital sensor
-                humidity = humidity_raw / 10.0
-            else:
-                # analog sensor (pkt[4] & 0x0f == 0x5)
-                humidity = humidity_raw * -0.301 + 710.23       
-            print("humidity_raw=0x%03x value=%s" %
-                              (humidity_raw, humidity))
+    print("Extracted Data")
             
-        data['humidity'] = humidity
-    else:
-        pass
-    return data
+    msg_type = (int(pkt[0], 16) >> 4) & 0xF
+    actual_data = parse_packet(msg_type, pkt)
+    
+    for parameter in actual_data:
+        stored_data[parameter] = actual_data[parameter]
+    return stored_data
 
-def decode_store_davis():
+_davis_assembler = None
+
+def davis_assembler():
+    """
+    The Davis record assembler of this process, seeded from storage.
+
+    Returns
+    -------
+    DavisAssembler
+        The assembler.
+
+    """
+    global _davis_assembler
+    if _davis_assembler is None:
+        _davis_assembler = create_assembler()
+        # the newest stored line only: its 'age' entries date every field,
+        # which values merged in from older lines would not have
+        _davis_assembler.seed(latest_readings('davis', open_store('davis').iter_newest(), merge=False).values())
+    return _davis_assembler
+
+def decode_store_davis(events=None, until=None, stop=None):
     """
     Local storage for Davis stations data.
     
     Uses subprocess module to extract the data from the command terminal.
+    Every stored record is reported on the `events` queue, if given, so
+    the upload scheduler can publish it promptly. Packets are merged per
+    transmitter (see davis_assembler.py), so every stored record is a
+    consolidated reading.
+
+    Runs forever, or until the epoch time `until` or until the `stop`
+    event is set (when run as a job of the radio scheduler).
+
+    rtldavis is restarted, after cycling the RTL-SDR, if it prints nothing
+    for `read_timeout` seconds or if the capture ratio of a transmitter
+    drops below `min_ratio` (see rtldavis_monitor.py and the 'rtldavis'
+    section of config.json).
 
     Returns
     -------
     None.
 
     """
-    # Define the command to execute
-    command = "/home/sdr/work/bin/rtldavis -tr 6 -tf US"
+    settings = load_config()['rtldavis']
+    monitor = RtldavisMonitor(settings)
+    assembler = davis_assembler()
 
-    # Open a file to store the output continuously
-    output_filename = "davis_deploy7_Aug08.json"
+    # Segmented storage for the output (see segment_store.py); the
+    # open segment's torn last line, if any, is dropped when it is reopened
+    store = open_store('davis')
     #filterout_filename = 'filter.log'
-
-    # Define keywords to filter lines by
-    keywords = ['msg.ID=1', 'msg.ID=2']
     
     missed = 0
+
+    def finished():
+        return ((until is not None and time.time() >= until)
+                or (stop is not None and stop.is_set()))
     
-    while True:
+    while not finished():
         print("Receiving from Davis Vantage Vue Weather Stations...")
         time.sleep(3)
         
+        # Execute the command using subprocess and capture stdout
+        process = subprocess.Popen(settings['command'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        monitor.reset()
+        failure = None
+
+        # Continuously read from terminal and write into output file
         try:
-            # Save the contents of the file
-            listObj = []
-            with open(output_filename, "r") as f:
-                for line in f:
-                    if line == {} or line == None or line =='\n':
-                        pass
-                    else:
-                        local_data = json.loads(line)
-                        listObj.append(json.dumps(local_data))
-                      
-            with open(output_filename, "w") as f:
-                # Execute the command using subprocess and capture stdout
-                process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, universal_newlines=True)
+            for line in timed_lines(process.stdout, settings['read_timeout']):
+                if finished():
+                    break
+                if 'packet missed' in line:
+                    print(line, end="")  # print if missed packets
+                    missed += 1
+                    print(f'{missed} Davis packets were missed.')
+                monitor.handle_line(line)
                 
-                for line in listObj:
-                    if line == listObj[0]:
-                        f.write(line)        # Append data 
-                        f.flush()            # Ensure data is written to file immediately
-                    else:
-                        f.seek(0, 2)
-                        f.write('\n')        # Write newline
-                        f.write(line)        # Append data 
-                        f.flush()            # Ensure data is written to file immediately
-
-                # Continuously read from terminal and write into output file
-                while True:
-                    # Temporary Storage for New Data to Local Database
-                    stored_data = {}
-                    line = process.stdout.readline()
-                    if not line:
-                        break
-                    if 'packet missed' in line:
-                        print(line, end="")  # print if missed packets
-                        missed += 1
-                        print(f'{missed} Davis packets were missed.')
+                stored_data = parse_rtldavis_line(line)
+                if stored_data is not None:
+                    stored_data = assembler.add(stored_data)
+                    print(stored_data)
                     
-                    if any(keyword in line for keyword in keywords):
-                        
-                        # Split the line into parts (separated by spaces)
-                        data = line.split()
-                        
-                        # Specify Date and Time
-                        timestamp = data[0]
-                        stored_data['time'] = date.today().strftime("%Y-%m-%d") + " " + timestamp
-                        
-                        # Specify ID
-                        ID = data[-1]
-                        stored_data['ID'] = int(ID[-1])
-                        
-                        # Specify Data Packet
-                        data_packet = data[1]
-                        #print(data_packet)
-                        if len(data_packet) == 16:
-                            i = 0
-                            pkt = [0]*8
-                            while i < len(pkt):
-                                # ihiwalay yung packet into bytes
-                                pkt[i] = data_packet[2*i]+data_packet[2*i+1]
-                                i += 1
-                                
-                        print("Extracted Data")
-                                
-                        msg_type = (int(pkt[0], 16) >> 4) & 0xF
-                        actual_data = parse_packet(msg_type, pkt)
-                        
-                        
-                        for parameter in actual_data:
-                            stored_data[parameter] = actual_data[parameter]
-                        
-                        print(stored_data)
-                        
-                        print("Appending data into file")
-                        json_data = json.dumps(stored_data)
-                        
-                        print(json_data)
-                        
-                        f.seek(0, 2)
-                        f.write('\n')        # Write newline
-                        f.write(json_data)   # Append data 
-                        f.flush()            # Ensure data is written to file immediately
-
-        except FileNotFoundError:
-            with open(output_filename, "w") as f:
-                pass
+                    print("Appending data into storage")
+                    
+                    # One complete, newline-terminated record per write
+                    store.append(stored_data)
+                    notify(events, 'davis', stored_data)
+                monitor.check()
+        except (StallError, CaptureRatioError) as e:
+            failure = e
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            store.flush()
+
+        if failure is not None:
+            print(f"Restarting rtldavis: {failure}")
+            reset_rtlsdr(settings)
+
+def reset_rtlsdr(settings=None):
+    """
+    Cycles the RTL-SDR (USB reset) with the `reset_command` of the
+    'rtldavis' section of config.json, so that rtldavis restarts on a
+    freshly initialised device.
+
+    Returns
+    -------
+    None.
+
+    """
+    if settings is None:
+        settings = load_config()['rtldavis']
+    if not settings.get('reset_command'):
+        return
+    print("Resetting the RTL-SDR")
+    try:
+        subprocess.run(settings['reset_command'], timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"RTL-SDR reset failed: {e}")
 
 # END of rtldavis software automation
 
-def rtl433_automate():
+def rtl433_command(device="", settings=None):
+    """
+    The rtl_433 command line for the WH31E and WH40 sensors.
+
+    Returns
+    -------
+    list of str
+        Program and arguments.
+
     """
-    Run for 65 seconds, then terminate
+    if settings is None:
+        settings = load_config()['rtl_433_input']
+    if settings['input'] == 'udp':
+        output = ["-F", f"syslog:{settings['host']}:{settings['port']}"]
+    else:
+        output = ["-F", "json"]
+
+    # -d "": selects ADALM-Pluto ("0" for the first RTL-SDR)
+    # -f 915000000: tunes to 915 MHz frequency
+    # -s 1000k: set sample rate to 1000k (avoid errors for ADALM-Pluto (v0.30 firmware))
+    # -g 60: set Rx gain to 60, arbitrary selection from 0-70
+    # -F json: print decoded data as json lines to stdout, stored below
+    #   (-F syslog:host:port: send them as UDP datagrams to the receiver instead)
+    # -R 113: decode only WH31E and WH40 protocols
+    return ["rtl_433", "-d", device, "-f", "915000000", "-s", "1000k", "-g", "60"] + output + ["-R", "113"]
+
+def rtl433_automate(events=None, duration=65, device="", stop=None):
+    """
+    Run for 65 seconds (or `duration`), then terminate
     WH40 Update Interval: 49sec
     WH31E Update Interval: 1min 1sec or 61sec
 
+    Output is streamed into storage as it is decoded, with repeated
+    transmissions of a frame dropped (see rtl433_ingest.py): from stdout,
+    or over UDP with "input": "udp" in the 'rtl_433_input' section of
+    config.json. The `stop` event, if given, ends the run early.
+
     Returns
     -------
     None.
 
     """   
+    settings = load_config()['rtl_433_input']
     
     print("RTL_433 Start-up")
 
-    rtl_433 = subprocess.Popen(["rtl_433", "-d", "", "-f", "915000000", "-s", "1000k", "-g", "60", "-F", "json:genws_data.json", "-F", "kv", "-R", "113"])
-    
-    # -d "": selects ADALM-Pluto
-    # -f 915000000: tunes to 915 MHz frequency
-    # -s 1000k: set sample rate to 1000k (avoid errors for ADALM-Pluto (v0.30 firmware))
-    # -g 60: set Rx gain to 60, arbitrary selection from 0-70
-    # -F json:genws_data.json: save data to json file under genws_data.json
-    # -R 113: decode only WH31E and WH40 protocols
+    rtl_433 = subprocess.Popen(rtl433_command(device, settings),
+                               stdout=subprocess.PIPE if settings['input'] != 'udp' else None,
+                               universal_newlines=True)
     
+    # store decoded lines as they arrive, until rtl_433 is terminated
+    if settings['input'] != 'udp':
+        store_thread = threading.Thread(target=shared_rtl433_ingest(events).consume, args=(rtl_433.stdout,))
+        store_thread.start()
+
     print("Decoding...")
-    time.sleep(65)
+    if stop is not None:
+        stop.wait(max(0, duration))
+    else:
+        time.sleep(max(0, duration))
     rtl_433.terminate()
+    if settings['input'] != 'udp':
+        store_thread.join()
+    else:
+        rtl_433.wait()
     print("RTL_433 has been terminated.")
 
-def SDRangel_automate():
+_rtl433_ingest = None
+
+def shared_rtl433_ingest(events=None):
     """
-    Runs SDRangel and switches between 433 MHz and 915 MHz channels.
+    The rtl_433 ingest of this process, kept across rtl_433 runs so that
+    repeats are recognised even when rtl_433 is restarted in between.
 
     Returns
     -------
-    None.
+    Rtl433Ingest
+        The ingest, reporting stored records on the `events` queue.
 
     """
+    global _rtl433_ingest
+    if _rtl433_ingest is None:
+        _rtl433_ingest = rtl433_ingest.Rtl433Ingest(open_store('rtl_433'),
+                                      load_config()['rtl_433_input']['repeat_window'],
+                                      lambda record: notify(events, 'rtl_433', record))
+    return _rtl433_ingest
+
+def start_rtl433_receiver(events=None):
+    """
+    Receive rtl_433's UDP output in a background thread, if configured.
 
-    open_rcv = ["curl", "-X", "POST", "http://127.0.0.1:8091/sdrangel/deviceset?direction=0", "-H",  "accept: application/json", "-d", ""]
-
-    set_dvc = ['curl', '-X', 'PUT', 'http://127.0.0.1:8091/sdrangel/deviceset/0/device', '-H', 'accept: application/json', '-H', 'Content-Type: application/json', '-d', '{\"deviceNbStreams\": 1, \"deviceSetIndex\": -1, \"direction\": 0, \"displayedName\": \"PlutoSDR[0] 1044735411960002f7ff080009f61e0b5b\", \"hwType\": \"PlutoSDR\", \"index\": 6, \"sequence\": 0, \"serial\": \"1044735411960002f7ff080009f61e0b5b\"}']
-
-    set_center_freq_433 = ["curl", "-X", "PATCH", "http://127.0.0.1:8091/sdrangel/deviceset/0/device/settings", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"deviceHwType\": \"PlutoSDR\",  \"direction\": 0,  \"plutoSdrInputSettings\": {    \"LOppmTenths\": 0,    \"antennaPath\": 0,    \"centerFrequency\": 433000000,    \"dcBlock\": 0,    \"devSampleRate\": 2500000,    \"fcPos\": 2,    \"gain\": 50,    \"gainMode\": 0,    \"hwBBDCBlock\": 1,    \"hwIQCorrection\": 1,    \"hwRFDCBlock\": 1,    \"iqCorrection\": 0,    \"iqOrder\": 1,    \"log2Decim\": 0,    \"lpfBW\": 1500000,    \"lpfFIRBW\": 500000,    \"lpfFIREnable\": 0,    \"lpfFIRGain\": 0,    \"lpfFIRlog2Decim\": 0,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"transverterDeltaFrequency\": 0,    \"transverterMode\": 0,    \"useReverseAPI\": 0  }}"]
-
-    set_center_freq_915 = ["curl", "-X", "PATCH", "http://127.0.0.1:8091/sdrangel/deviceset/0/device/settings", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"deviceHwType\": \"PlutoSDR\",  \"direction\": 0,  \"plutoSdrInputSettings\": {    \"LOppmTenths\": 0,    \"antennaPath\": 0,    \"centerFrequency\": 915000000,    \"dcBlock\": 0,    \"devSampleRate\": 2500000,    \"fcPos\": 2,    \"gain\": 50,    \"gainMode\": 0,    \"hwBBDCBlock\": 1,    \"hwIQCorrection\": 1,    \"hwRFDCBlock\": 1,    \"iqCorrection\": 0,    \"iqOrder\": 1,    \"log2Decim\": 0,    \"lpfBW\": 1500000,    \"lpfFIRBW\": 500000,    \"lpfFIREnable\": 0,    \"lpfFIRGain\": 0,    \"lpfFIRlog2Decim\": 0,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"transverterDeltaFrequency\": 0,    \"transverterMode\": 0,    \"useReverseAPI\": 0  }}"]
-
-    open_chnl = ["curl", "-X", "POST", "http://127.0.0.1:8091/sdrangel/deviceset/0/channel", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"ChirpChatDemodSettings\": {    \"autoNbSymbolsMax\": 0,    \"bandwidthIndex\": 14,    \"channelMarker\": {      \"centerFrequency\": 0,      \"color\": -65281,      \"frequencyScaleDisplayType\": 0,      \"title\": \"ChirpChat Demodulator\"    },    \"codingScheme\": 0,    \"deBits\": 2,    \"decodeActive\": 1,    \"eomSquelchTenths\": 60,    \"fftWindow\": 5,    \"hasCRC\": 1,    \"hasHeader\": 1,    \"inputFrequencyOffset\": 0,    \"nbParityBits\": 1,    \"nbSymbolsMax\": 255,    \"preambleChirps\": 10,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIChannelIndex\": 0,    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"rgbColor\": -65281,    \"rollupState\": {      \"childrenStates\": [        {          \"isHidden\": 0,          \"objectName\": \"verticalLayoutWidget\"        },        {          \"isHidden\": 0,          \"objectName\": \"verticalLayoutWidget_2\"        },        {          \"isHidden\": 0,          \"objectName\": \"spectrumContainer\"        }      ],      \"version\": 0    },    \"sendViaUDP\": 1,    \"spectrumConfig\": {      \"averagingMode\": 0,      \"averagingValue\": 1,      \"calibrationInterpMode\": 0,      \"decay\": 1,      \"decayDivisor\": 1,      \"displayCurrent\": 1,      \"displayGrid\": 0,      \"displayGridIntensity\": 5,      \"displayHistogram\": 0,      \"displayMaxHold\": 0,      \"displayTraceIntensity\": 50,      \"displayWaterfall\": 1,      \"fftOverlap\": 0,      \"fftSize\": 4096,      \"fftWindow\": 4,      \"fpsPeriodMs\": 50,      \"histogramStroke\": 30,      \"invertedWaterfall\": 1,      \"linear\": 0,      \"markersDisplay\": 0,      \"powerRange\": 100,      \"refLevel\": 0,      \"ssb\": 0,      \"usb\": 1,      \"useCalibration\": 0,      \"waterfallShare\": 0.5,      \"wsSpectrum\": 0,      \"wsSpectrumAddress\": \"127.0.0.1\",      \"wsSpectrumPort\": 8887    },    \"spreadFactor\": 12,    \"title\": \"ChirpChat Demodulator\",    \"udpAddress\": \"127.0.0.1\",    \"udpPort\": 9999,    \"useReverseAPI\": 0  },  \"channelType\": \"ChirpChatDemod\",  \"direction\": 0}"]
+    Returns
+    -------
+    None.
 
-    edit_chnl_settings_433 = ["curl", "-X", "PATCH", "http://127.0.0.1:8091/sdrangel/deviceset/0/channel/0/settings", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"ChirpChatDemodSettings\": {    \"autoNbSymbolsMax\": 0,    \"bandwidthIndex\": 15,    \"channelMarker\": {      \"centerFrequency\": 8640,      \"color\": -65281,      \"frequencyScaleDisplayType\": 0,      \"title\": \"ChirpChat Demodulator\"    },    \"codingScheme\": 0,    \"deBits\": 2,    \"decodeActive\": 1,    \"eomSquelchTenths\": 60,    \"fftWindow\": 5,    \"hasCRC\": 1,    \"hasHeader\": 1,    \"inputFrequencyOffset\": 8640,    \"nbParityBits\": 1,    \"nbSymbolsMax\": 255,    \"preambleChirps\": 10,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIChannelIndex\": 0,    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"rgbColor\": -65281,    \"rollupState\": {      \"childrenStates\": [        {          \"isHidden\": 0,          \"objectName\": \"verticalLayoutWidget\"        },        {          \"isHidden\": 0,          \"objectName\": \"verticalLayoutWidget_2\"        },        {          \"isHidden\": 0,          \"objectName\": \"spectrumContainer\"        }      ],      \"version\": 0    },    \"sendViaUDP\": 1,    \"spectrumConfig\": {      \"averagingMode\": 0,      \"averagingValue\": 1,      \"calibrationInterpMode\": 0,      \"decay\": 1,      \"decayDivisor\": 1,      \"displayCurrent\": 1,      \"displayGrid\": 0,      \"displayGridIntensity\": 5,      \"displayHistogram\": 0,      \"displayMaxHold\": 0,      \"displayTraceIntensity\": 50,      \"displayWaterfall\": 1,      \"fftOverlap\": 0,      \"fftSize\": 4096,      \"fftWindow\": 4,      \"fpsPeriodMs\": 50,      \"histogramStroke\": 30,      \"invertedWaterfall\": 1,      \"linear\": 0,      \"markersDisplay\": 0,      \"powerRange\": 100,      \"refLevel\": 0,      \"ssb\": 0,      \"usb\": 1,      \"useCalibration\": 0,      \"waterfallShare\": 0.5,      \"wsSpectrum\": 0,      \"wsSpectrumAddress\": \"127.0.0.1\",      \"wsSpectrumPort\": 8887    },    \"spreadFactor\": 10,    \"title\": \"ChirpChat Demodulator\",    \"udpAddress\": \"127.0.0.1\",    \"udpPort\": 9999,    \"useReverseAPI\": 0  },  \"channelType\": \"ChirpChatDemod\",  \"direction\": 0}"]
+    """
+    if load_config()['rtl_433_input']['input'] != 'udp':
+        return
+    receiver = threading.Thread(target=rtl433_ingest.run, args=(shared_rtl433_ingest(events),), daemon=True)
+    receiver.start()
 
-    edit_chnl_settings_915 = ["curl", "-X", "PATCH", "http://127.0.0.1:8091/sdrangel/deviceset/0/channel/0/settings", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"ChirpChatDemodSettings\": {    \"autoNbSymbolsMax\": 0,    \"bandwidthIndex\": 15,    \"channelMarker\": {      \"centerFrequency\": 23222,      \"color\": -65281,      \"frequencyScaleDisplayType\": 0,      \"title\": \"ChirpChat Demodulator\"    },    \"codingScheme\": 0,    \"deBits\": 2,    \"decodeActive\": 1,    \"eomSquelchTenths\": 60,    \"fftWindow\": 5,    \"hasCRC\": 1,    \"hasHeader\": 1,    \"inputFrequencyOffset\": 23222,    \"nbParityBits\": 1,    \"nbSymbolsMax\": 255,    \"preambleChirps\": 10,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIChannelIndex\": 0,    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"rgbColor\": -65281,    \"rollupState\": {      \"childrenStates\": [        {          \"isHidden\": 0,          \"objectName\": \"verticalLayoutWidget\"        },        {          \"isHidden\": 0,          \"objectName\": \"verticalLayoutWidget_2\"        },        {          \"isHidden\": 0,          \"objectName\": \"spectrumContainer\"        }      ],      \"version\": 0    },    \"sendViaUDP\": 1,    \"spectrumConfig\": {      \"averagingMode\": 0,      \"averagingValue\": 1,      \"calibrationInterpMode\": 0,      \"decay\": 1,      \"decayDivisor\": 1,      \"displayCurrent\": 1,      \"displayGrid\": 0,      \"displayGridIntensity\": 5,      \"displayHistogram\": 0,      \"displayMaxHold\": 0,      \"displayTraceIntensity\": 50,      \"displayWaterfall\": 1,      \"fftOverlap\": 0,      \"fftSize\": 4096,      \"fftWindow\": 4,      \"fpsPeriodMs\": 50,      \"histogramStroke\": 30,      \"invertedWaterfall\": 1,      \"linear\": 0,      \"markersDisplay\": 0,      \"powerRange\": 100,      \"refLevel\": 0,      \"ssb\": 0,      \"usb\": 1,      \"useCalibration\": 0,      \"waterfallShare\": 0.5,      \"wsSpectrum\": 0,      \"wsSpectrumAddress\": \"127.0.0.1\",      \"wsSpectrumPort\": 8887    },    \"spreadFactor\": 10,    \"title\": \"ChirpChat Demodulator\",    \"udpAddress\": \"127.0.0.1\",    \"udpPort\": 9999,    \"useReverseAPI\": 0  },  \"channelType\": \"ChirpChatDemod\",  \"direction\": 0}"]
+def SDRangel_automate(session=None, stop=None):
+    """
+    Runs SDRangel and switches between 433 MHz and 915 MHz channels.
 
-    run_decoder = ["curl", "-X", "POST", "http://127.0.0.1:8091/sdrangel/deviceset/0/device/run", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"deviceHwType\": \"PlutoSDR\",  \"direction\": 0,  \"plutoSdrInputSettings\": {    \"LOppmTenths\": 0,    \"antennaPath\": 0,    \"centerFrequency\": 433000000,    \"dcBlock\": 0,    \"devSampleRate\": 2500000,    \"fcPos\": 2,    \"gain\": 50,    \"gainMode\": 0,    \"hwBBDCBlock\": 1,    \"hwIQCorrection\": 1,    \"hwRFDCBlock\": 1,    \"iqCorrection\": 0,    \"iqOrder\": 1,    \"log2Decim\": 0,    \"lpfBW\": 1500000,    \"lpfFIRBW\": 500000,    \"lpfFIREnable\": 0,    \"lpfFIRGain\": 0,    \"lpfFIRlog2Decim\": 0,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"transverterDeltaFrequency\": 0,    \"transverterMode\": 0,    \"useReverseAPI\": 0  }}"]
+    SDRangel is driven through its REST API (see sdrangel.py): each step
+    waits until SDRangel reports it done instead of sleeping for a fixed
+    time, and retuning only sends the settings that changed. Failed API
+    calls, SDRangel being unreachable included, raise SDRangelError; a
+    missing SDRangel executable raises OSError.
+
+    Parameters
+    ----------
+    session : SDRangelSession, optional
+        Resident SDRangel instance to reuse; it is health-checked, left
+        running and only its device is stopped at the end. Without one,
+        SDRangel is launched for this cycle and terminated afterwards.
+    stop : threading.Event, optional
+        Set to end the cycle early.
 
-    stop_decoder = ["curl", "-X", "DELETE", "http://127.0.0.1:8091/sdrangel/deviceset/0/device/run", "-H",  "accept: application/json", "-H",  "Content-Type: application/json", "-d", "{  \"deviceHwType\": \"PlutoSDR\",  \"direction\": 0,  \"plutoSdrInputSettings\": {    \"LOppmTenths\": 0,    \"antennaPath\": 0,    \"centerFrequency\": 433000000,    \"dcBlock\": 0,    \"devSampleRate\": 2500000,    \"fcPos\": 2,    \"gain\": 50,    \"gainMode\": 0,    \"hwBBDCBlock\": 1,    \"hwIQCorrection\": 1,    \"hwRFDCBlock\": 1,    \"iqCorrection\": 0,    \"iqOrder\": 1,    \"log2Decim\": 0,    \"lpfBW\": 1500000,    \"lpfFIRBW\": 500000,    \"lpfFIREnable\": 0,    \"lpfFIRGain\": 0,    \"lpfFIRlog2Decim\": 0,    \"reverseAPIAddress\": \"127.0.0.1\",    \"reverseAPIDeviceIndex\": 0,    \"reverseAPIPort\": 8888,    \"transverterDeltaFrequency\": 0,    \"transverterMode\": 0,    \"useReverseAPI\": 0  }}"]
+    Returns
+    -------
+    float
+        Switching overhead of the cycle: elapsed time not spent decoding.
 
-    close_rcv = ["curl", "-X", "DELETE", "http://127.0.0.1:8091/sdrangel/deviceset", "-H",  "accept: application/json"]
+    """
+    settings = load_config()['sdrangel']
+    started = time.monotonic()
+    captured = 0.0
 
-    #Open sdrangel
+    resident = session is not None
+    if not resident:
+        session = SDRangelSession(settings)
 
-    print("SDRangel startup")
-    
-    sdrangel = subprocess.Popen(["/opt/install/sdrangel/bin/sdrangel", "--soapy", "--fftwf-wisdom", "/home/sdr/.config/f4exb/fftw-wisdom"])
-    time.sleep(15) # loading time for sdrangel
-    subprocess.Popen(close_rcv) # close any residual settings from previous calls
-    time.sleep(2)
-
-    # set the device to ADALM-Pluto
-    subprocess.Popen(open_rcv)
-    time.sleep(2)
-    subprocess.Popen(set_dvc)
-
-    # set the decoder to LoRa @ 433 MHz and run
-    time.sleep(1)
-    subprocess.Popen(set_center_freq_433)
-    time.sleep(1)
-    subprocess.Popen(open_chnl)
-    time.sleep(2)
-    subprocess.Popen(run_decoder)
-    time.sleep(2)
-
-    # decode time: 65 seconds
-    print("Decoding at 433 MHz...")
-    subprocess.Popen(edit_chnl_settings_433)
-    time.sleep(65)
-
-    # stop decoder
-    subprocess.Popen(stop_decoder)
-    time.sleep(5)
-
-    # set the decoder to 915 MHz. then run
-    subprocess.Popen(set_center_freq_915)
-    time.sleep(2)
-    subprocess.Popen(run_decoder)
-    time.sleep(1)
-    subprocess.Popen(edit_chnl_settings_915)
-
-    print("Decoding at 915 MHz...")
-    time.sleep(65)
-
-    subprocess.Popen(stop_decoder)
-    time.sleep(2)
-
-    subprocess.Popen(close_rcv)
-
-    time.sleep(2)
-
-    #Close sdrangel
-
-    sdrangel.terminate()
-    print("SDRangel has been terminated.")
-    time.sleep(5)
+    try:
+        if resident:
+            session.ensure()
+        else:
+            session.start()
+
+        for band in LORA_BANDS:
+            if stop is not None and stop.is_set():
+                break
+            capture_started = time.monotonic()
+            session.capture(band, settings['capture_time'], stop)
+            captured += min(time.monotonic() - capture_started, settings['capture_time'])
+    finally:
+        if not resident:
+            session.stop()
+
+    return time.monotonic() - started - captured
     
 def reset_sdrRx():
     """
@@ -567,58 +371,602 @@ def reset_sdrRx():
     """
     subprocess.run(["iio_attr", "-u", "ip:192.168.2.1", "-c", "ad9361-phy", "altvoltage0", "powerdown", "0"])
     
-def switching():
+def switching(events=None):
     """
     Switching process between rtl_433 and SDRangel.
     
-    Uses the automate() functions above.
+    Uses the automate() functions above. With "resident": true in the
+    'sdrangel' section of config.json, SDRangel is started once and kept
+    running across cycles; only its device is stopped while rtl_433 has
+    the radio. The SDRangel switching overhead of every cycle is logged
+    and recorded in metrics_switching.json.
+
+    With "mode": "adaptive" in the 'dwell' section, the fixed 65 s windows
+    are replaced by dwells planned around the predicted transmissions of
+    each station (see dwell_scheduler.py). In both modes the capture rate
+    of every station is recorded in metrics_switching.json.
 
     Returns
     -------
     None.
 
     """
+    settings = load_config()['sdrangel']
+    dwell_settings = load_config()['dwell']
+    adaptive = dwell_settings['mode'] == 'adaptive'
+    session = SDRangelSession(settings) if settings['resident'] or adaptive else None
+    scheduler = DwellScheduler(dwell_settings, {name: job for name, job in load_config()['jobs'].items()
+                                                if job['runner'] != 'rtldavis'})
+    start_lora_receiver(events)
+    start_rtl433_receiver(events)
+
+    try:
+        if adaptive:
+            adaptive_switching(scheduler, session, events)
+        while True:
+            rtl433_automate(events)
+            
+            reset_sdrRx()
+            try:
+                overhead = SDRangel_automate(session)
+                print(f"SDRangel switching overhead: {overhead:.1f} s")
+                metrics.observe('switching_overhead_seconds.sdrangel', overhead)
+            except (SDRangelError, OSError) as e:
+                print(f"SDRangel cycle aborted: {e}")
+            if session is not None:
+                metrics.set_value('sdrangel_restarts', session.restarts)
+            record_capture_rates(scheduler)
+    finally:
+        if session is not None:
+            session.stop()
+
+def adaptive_switching(scheduler, session, events=None):
+    """
+    Switch the Pluto between the dwells planned by the DwellScheduler.
+
+    Each dwell runs its job until the next dwell starts, so time between
+    predicted packets is spent listening on the current job rather than
+    idle. The plan is renewed from the stored data once it has run out.
+
+    Returns
+    -------
+    None.
+
+    """
+    jobs = scheduler.jobs
     while True:
-        rtl433_automate()
-        
-        lora_receive = subprocess.Popen(["python3", "LoRaReceive_v2.0.py"])
-        time.sleep(2)
+        now = time.time()
+        scheduler.learn(now)
+        plan = scheduler.plan(now)
+        if not plan:
+            # nothing predicted: listen to the first job for a while
+            plan = [Dwell(next(iter(jobs)), now, now + scheduler.settings['learn_time'])]
+        print("Dwell plan: " + ", ".join(f"{dwell.job} {dwell.end - dwell.start:.0f} s"
+                                         for dwell in plan))
+
+        for i, dwell in enumerate(plan):
+            end = plan[i + 1].start if i + 1 < len(plan) else dwell.end
+            time.sleep(max(0, dwell.start - time.time()))
+            try:
+                run_dwell(jobs[dwell.job], end, session, events)
+            except (SDRangelError, OSError) as e:
+                print(f"SDRangel dwell aborted: {e}")
+        if session is not None:
+            metrics.set_value('sdrangel_restarts', session.restarts)
+        record_capture_rates(scheduler)
+
+def run_dwell(job, end, session, events=None, stop=None):
+    """
+    Give the Pluto to one job until `end` (epoch time), or until `stop` is set.
+
+    Returns
+    -------
+    None.
+
+    """
+    if job['runner'] == 'rtl_433':
+        rtl433_automate(events, end - time.time(), stop=stop)
+    else:
         reset_sdrRx()
-        SDRangel_automate()
-        lora_receive.terminate()
+        session.ensure()
+        session.capture(job['band'], max(0, end - time.time()), stop)
+
+def record_capture_rates(scheduler):
+    """
+    Re-learn the station schedules and record their capture rates.
+
+    Returns
+    -------
+    None.
+
+    """
+    now = time.time()
+    scheduler.learn(now)
+    for name, rate in scheduler.capture_rates(now).items():
+        metrics.set_value(f'capture_rate.{name}', rate)
+    metrics.dump('metrics_switching.json')
+
+# START of multi-radio scheduling
+
+_sdrangel_session = None
+
+def sdrangel_session():
+    """
+    The resident SDRangel session of this process, created on first use.
+
+    Returns
+    -------
+    SDRangelSession
+        The session.
+
+    """
+    global _sdrangel_session
+    if _sdrangel_session is None:
+        _sdrangel_session = SDRangelSession(load_config()['sdrangel'])
+    return _sdrangel_session
+
+def run_rtldavis(job, radio, until, events=None, stop=None):
+    decode_store_davis(events, until, stop)
+
+def run_rtl433(job, radio, until, events=None, stop=None):
+    rtl433_automate(events, (until or time.time() + 300) - time.time(), radio['device'], stop)
+
+def run_sdrangel(job, radio, until, events=None, stop=None):
+    reset_sdrRx()
+    session = sdrangel_session()
+    session.ensure()
+    session.capture(job['band'], max(0, (until or time.time() + 300) - time.time()), stop)
+
+# Job runners by the 'runner' key of the jobs in config.json. A runner gives
+# the radio to its job until the epoch time `until` (None: until `stop`).
+JOB_RUNNERS = {'rtldavis': run_rtldavis,
+               'rtl_433': run_rtl433,
+               'sdrangel': run_sdrangel}
+
+def run_job(job, radio, until, events=None, stop=None):
+    try:
+        JOB_RUNNERS[job['runner']](job, radio, until, events, stop)
+    except Exception as e:
+        print(f"Job {job['runner']} on {radio['name']} failed: {e}")
+        if stop is not None:
+            stop.wait(5)
+
+def radio_worker(radio, jobs, shares, stop, events=None):
+    """
+    Run the jobs assigned to one radio until `stop` is set.
+
+    A single job has the radio to itself. Several jobs are time-sliced:
+    around predicted transmissions in the adaptive dwell mode (see
+    dwell_scheduler.py), otherwise in fixed slices proportional to their
+    shares of the plan.
+
+    Returns
+    -------
+    None.
+
+    """
+    dwell_settings = load_config()['dwell']
+    if len(jobs) == 1:
+        job = next(iter(jobs.values()))
+        while not stop.is_set():
+            run_job(job, radio, None if job['runner'] == 'rtldavis' else time.time() + 300,
+                    events, stop)
+        return
+
+    scheduler = DwellScheduler(dwell_settings, jobs)
+    while not stop.is_set():
+        now = time.time()
+        if dwell_settings['mode'] == 'adaptive':
+            scheduler.learn(now)
+            plan = scheduler.plan(now)
+        else:
+            plan = []
+        if not plan:
+            plan = []
+            for name, share in shares.items():
+                start = plan[-1].end if plan else now
+                plan.append(Dwell(name, start, start + share * dwell_settings['horizon']))
+
+        for i, dwell in enumerate(plan):
+            if stop.is_set():
+                break
+            end = plan[i + 1].start if i + 1 < len(plan) else dwell.end
+            stop.wait(max(0, dwell.start - time.time()))
+            run_job(jobs[dwell.job], radio, end, events, stop)
+        record_capture_rates(scheduler)
+
+def radio_scheduling(events=None, stop=None, receivers=True):
+    """
+    Assign the jobs of config.json to the connected radios and run them.
+
+    The radios are probed every `probe_interval` seconds; when one appears
+    or disappears the assignment is re-planned (see radio_scheduler.py)
+    and the workers of all radios are restarted with the new plan.
+
+    Runs until the `stop` event is set, if given. With `receivers` False
+    the LoRa and rtl_433 UDP receivers are left to the caller.
+
+    Returns
+    -------
+    None.
+
+    """
+    config = load_config()
+    radios = {radio['name']: radio for radio in config['radios']}
+    scheduler = RadioScheduler(config['radios'], config['jobs'], config['dwell']['horizon'])
+    workers = []
+    halt = threading.Event()
+    stop = stop or threading.Event()
+
+    if receivers:
+        start_lora_receiver(events)
+        start_rtl433_receiver(events)
+    try:
+        while not stop.is_set():
+            available = [name for name, radio in radios.items() if probe(radio)]
+            if scheduler.update(available):
+                halt.set()
+                for worker in workers:
+                    worker.join()
+
+                halt = threading.Event()
+                workers = []
+                for name, shares in scheduler.plan.items():
+                    jobs = {job: config['jobs'][job] for job in shares}
+                    worker = threading.Thread(target=radio_worker,
+                                              args=(radios[name], jobs, shares, halt, events))
+                    worker.start()
+                    workers.append(worker)
+                metrics.set_value('radio_plan_value', scheduler.value)
+            stop.wait(config['radio_scheduler']['probe_interval'])
+    finally:
+        halt.set()
+        for worker in workers:
+            worker.join()
+        if _sdrangel_session is not None:
+            _sdrangel_session.stop()
         
-def uploading():
+def start_lora_receiver(events=None):
     """
-    Upload data every 5 minutes, but source differs.
-    
-    Effective upload time for each station: 15 minutes
+    Receive the LoRa frames SDRangel decodes, for as long as the program runs.
+
+    The receiver (see lora_receiver.py) listens on UDP port 9999 in a
+    background thread, stores every new frame and reports it on the
+    `events` queue.
 
     Returns
     -------
     None.
 
     """
-    while True:
-        subprocess.run(["python3", "davisUpload.py"])
-        time.sleep(300)
-        subprocess.run(["python3", "generalUpload.py"])
-        time.sleep(300)
-        subprocess.run(["python3", "LoRaUpload.py"])
-        time.sleep(300)
+    receiver = threading.Thread(target=lora_receiver.run,
+                                args=(lambda record: notify(events, 'lora', record),),
+                                daemon=True)
+    receiver.start()
+
+def notify(events, source, record):
+    """
+    Report a stored record to the upload scheduler, and make it the
+    latest reading of its station in the shared-memory table (see
+    latest_table.py) the uploaders read.
+
+    Returns
+    -------
+    None.
+
+    """
+    update_latest(source, record)
+    archive_record(source, record)
+    if events is None:
+        return
+    try:
+        reading_time = record_time(source, record).timestamp()
+    except (KeyError, ValueError):
+        reading_time = time.time()
+    events.put((source, reading_time, record))
+
+def uploading(events):
+    """
+    Upload each source as soon as new data is stored.
+
+    Ingest events from the decoders drive the upload scheduler (see
+    upload_scheduler.py): new readings are published within each source's
+    latency bound, bursts are coalesced and per-source minimum intervals
+    are respected. Sources without ingest events are still uploaded every
+    `max_interval` seconds.
+
+    All three sources publish through one long-lived MQTT connection
+    (see publisher.py). The records of the ingest events are aggregated
+    over 15-minute windows (see rollup.py), and each station's message
+    carries the aggregates of its last closed window.
+
+    Returns
+    -------
+    None.
+
+    """
+    publisher = create_publisher()
+    uploaders = {'davis': lambda: davisUpload.upload_data(publisher),
+                 'rtl_433': lambda: generalUpload.upload_data(publisher),
+                 'lora': lambda: LoRaUpload.upload_data(publisher)}
+    try:
+        UploadScheduler(uploaders, load_config()['uploads'], shared_rollup().add).run(events)
+    finally:
+        publisher.stop()
+
+# START of asyncio supervision
+
+_write_thread = None
+
+def write_thread():
+    """
+    The thread that stores the records of the asyncio components (see
+    supervisor.WriteThread), so disk writes do not block the event loop.
+
+    Returns
+    -------
+    WriteThread
+        The thread of this process.
+
+    """
+    global _write_thread
+    if _write_thread is None:
+        _write_thread = WriteThread()
+    return _write_thread
+
+def store_record(events, store, source, record):
+    """
+    Append a record to storage and report it, see notify().
+
+    Returns
+    -------
+    None.
+
+    """
+    store.append(record)
+    notify(events, source, record)
+
+async def davis_component(events, stop):
+    """
+    Store the output of rtldavis like decode_store_davis(), reading it
+    without blocking the event loop.
+
+    rtldavis exiting, stalling or capturing too few packets is treated as
+    a failure, so that the supervisor restarts it with backoff; in the
+    latter two cases the RTL-SDR is cycled first. Records are stored by
+    the write thread.
+
+    Returns
+    -------
+    None.
+
+    """
+    settings = load_config()['rtldavis']
+    monitor = RtldavisMonitor(settings)
+    assembler = davis_assembler()
+    store = open_store('davis')
+    writes = write_thread()
+    missed = 0
+
+    def on_line(line):
+        nonlocal missed
+        if 'packet missed' in line:
+            print(line, end="")  # print if missed packets
+            missed += 1
+            print(f'{missed} Davis packets were missed.')
+        monitor.handle_line(line)
+
+        stored_data = parse_rtldavis_line(line)
+        if stored_data is not None:
+            stored_data = assembler.add(stored_data)
+            print(stored_data)
+            writes.submit(store_record, events, store, 'davis', stored_data)
+        monitor.check()
+
+    print("Receiving from Davis Vantage Vue Weather Stations...")
+    try:
+        code = await run_process(settings['command'], on_line, stop, merge_stderr=True,
+                                 read_timeout=settings['read_timeout'])
+    except (StallError, CaptureRatioError):
+        await asyncio.to_thread(reset_rtlsdr, settings)
+        raise
+    finally:
+        await writes.run(store.flush)
+    if not stop.is_set():
+        raise RuntimeError(f"rtldavis exited with code {code}")
+
+async def rtl433_component(events, duration, stop, device=""):
+    """
+    Run rtl_433 for `duration` seconds like rtl433_automate(). Its
+    lines are stored by the write thread.
+
+    Returns
+    -------
+    None.
+
+    """
+    settings = load_config()['rtl_433_input']
+    ingest = shared_rtl433_ingest(events)
+    writes = write_thread()
+
+    print("RTL_433 Start-up")
+    try:
+        await run_process(rtl433_command(device, settings),
+                          (lambda line: writes.submit(ingest.handle_line, line))
+                          if settings['input'] != 'udp' else None,
+                          stop, max(0, duration))
+    finally:
+        await writes.run(ingest.store.flush)
+    print("RTL_433 has been terminated.")
+
+async def switching_component(events, stop):
+    """
+    The switching process between rtl_433 and SDRangel, see switching().
+
+    rtl_433 runs as an asyncio child process; SDRangel's blocking REST
+    calls run in a worker thread.
+
+    Returns
+    -------
+    None.
+
+    """
+    settings = load_config()['sdrangel']
+    dwell_settings = load_config()['dwell']
+    adaptive = dwell_settings['mode'] == 'adaptive'
+    session = SDRangelSession(settings) if settings['resident'] or adaptive else None
+    scheduler = DwellScheduler(dwell_settings, {name: job for name, job in load_config()['jobs'].items()
+                                                if job['runner'] != 'rtldavis'})
+    jobs = scheduler.jobs
+
+    try:
+        while not stop.is_set():
+            if adaptive:
+                now = time.time()
+                await asyncio.to_thread(scheduler.learn, now)
+                plan = scheduler.plan(now)
+                if not plan:
+                    # nothing predicted: listen to the first job for a while
+                    plan = [Dwell(next(iter(jobs)), now, now + dwell_settings['learn_time'])]
+                print("Dwell plan: " + ", ".join(f"{dwell.job} {dwell.end - dwell.start:.0f} s"
+                                                 for dwell in plan))
+
+                for i, dwell in enumerate(plan):
+                    end = plan[i + 1].start if i + 1 < len(plan) else dwell.end
+                    if await wait_stop(stop, dwell.start - time.time()):
+                        break
+                    try:
+                        if jobs[dwell.job]['runner'] == 'rtl_433':
+                            await rtl433_component(events, end - time.time(), stop)
+                        else:
+                            await run_in_thread(stop, run_dwell, jobs[dwell.job], end, session, events)
+                    except (SDRangelError, OSError) as e:
+                        print(f"SDRangel dwell aborted: {e}")
+            else:
+                await rtl433_component(events, 65, stop)
+                if stop.is_set():
+                    break
+
+                await asyncio.to_thread(reset_sdrRx)
+                try:
+                    overhead = await run_in_thread(stop, SDRangel_automate, session)
+                    print(f"SDRangel switching overhead: {overhead:.1f} s")
+                    metrics.observe('switching_overhead_seconds.sdrangel', overhead)
+                except (SDRangelError, OSError) as e:
+                    print(f"SDRangel cycle aborted: {e}")
+
+            if session is not None:
+                metrics.set_value('sdrangel_restarts', session.restarts)
+            await asyncio.to_thread(record_capture_rates, scheduler)
+    finally:
+        if session is not None:
+            await asyncio.to_thread(session.stop)
+
+async def uploading_component(events, stop):
+    """
+    Upload each source as soon as new data is stored, see uploading().
+
+    Returns
+    -------
+    None.
+
+    """
+    publisher = create_publisher()
+    uploaders = {'davis': lambda: davisUpload.upload_data(publisher),
+                 'rtl_433': lambda: generalUpload.upload_data(publisher),
+                 'lora': lambda: LoRaUpload.upload_data(publisher)}
+    try:
+        await UploadScheduler(uploaders, load_config()['uploads'], shared_rollup().add).run_async(events, stop)
+    finally:
+        publisher.stop()
+
+async def supervise():
+    """
+    Run the whole program in one process under the asyncio supervisor.
+
+    The decoders, the LoRa and rtl_433 receivers and the uploads are
+    tasks of one event loop (see supervisor.py), restarted with backoff
+    if they fail. SIGTERM or ctrl+C stops the decoders and flushes
+    storage before exiting. The decoders store their records from a
+    write thread; the UDP receivers append on the event loop, which only
+    touches the disk when a group commit of `max_bytes` is due.
+
+    Returns
+    -------
+    None.
+
+    """
+    config = load_config()
+    supervisor = Supervisor(config['supervisor'])
+    events = EventQueue()
+
+    if config['radio_scheduler']['mode'] == 'multi-radio':
+        # jobs assigned to the connected radios, re-planned when one drops out
+        supervisor.add('radio scheduler',
+                       lambda stop: run_in_thread(stop, radio_scheduling, events, receivers=False))
+    else:
+        supervisor.add('switching', lambda stop: switching_component(events, stop))
+        supervisor.add('Davis decoder', lambda stop: davis_component(events, stop))
+
+    supervisor.add('LoRa receiver',
+                   lambda stop: lora_receiver.serve(on_record=lambda record: notify(events, 'lora', record),
+                                                    stop=stop))
+    if config['rtl_433_input']['input'] == 'udp':
+        supervisor.add('rtl_433 receiver',
+                       lambda stop: rtl433_ingest.serve(shared_rtl433_ingest(events), stop=stop))
+    supervisor.add('uploading', lambda stop: uploading_component(events, stop))
+
+    table = create_table() if config['latest_table']['enabled'] else None
+    try:
+        await supervisor.run()
+    finally:
+        close_archives()
+        flush_all()
+        if table is not None:
+            table.close()
 
 if __name__ == '__main__':
-    # Run the algorithms in parallel with each other
-    # Can be terminated via command line using ctrl+C (cannot be
-    # done with subprocess module)
-    
-    switching_protocol = Process(target=switching)
-    print("Running switching mechanic")
-    switching_protocol.start()
+    if load_config()['supervisor']['mode'] == 'asyncio':
+        # All components in this process; SIGTERM or ctrl+C shuts them
+        # down cleanly (see supervise())
+        asyncio.run(supervise())
+    else:
+        # Run the algorithms in parallel with each other
+        # Can be terminated via command line using ctrl+C (cannot be
+        # done with subprocess module)
+        
+        # Ingest events from the decoders to the upload scheduler
+        events = Queue()
+
+        # Latest reading per station, shared with the uploading process
+        table = create_table() if load_config()['latest_table']['enabled'] else None
+        processes = []
+
+        if load_config()['radio_scheduler']['mode'] == 'multi-radio':
+            # jobs assigned to the connected radios, re-planned when one drops out
+            radio_protocol = Process(target=radio_scheduling, args=(events,))
+            print("Running radio scheduler")
+            radio_protocol.start()
+            processes.append(radio_protocol)
+        else:
+            switching_protocol = Process(target=switching, args=(events,))
+            print("Running switching mechanic")
+            switching_protocol.start()
+            processes.append(switching_protocol)
+
+            davis_protocol = Process(target=decode_store_davis, args=(events,))
+            print("Starting up Davis decoder and storage") 
+            davis_protocol.start()
+            processes.append(davis_protocol)
+        
+        uploading_protocol = Process(target=uploading, args=(events,))
+        print("Upload protocol starting")
+        uploading_protocol.start()
+        processes.append(uploading_protocol)
 
-    davis_protocol = Process(target=decode_store_davis)
-    print("Starting up Davis decoder and storage") 
-    davis_protocol.start()
-    
-    uploading_protocol = Process(target=uploading)
-    print("Upload protocol starting")
-    uploading_protocol.start()
+        try:
+            for process in processes:
+                process.join()
+        finally:
+            if table is not None:
+                table.close()
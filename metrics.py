@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import threading
+
+_metrics = {}
+_lock = threading.Lock()
+
+
+def observe(name, value):
+    """
+    Record one sample of a metric (count, min, max, mean, last).
+
+    Parameters
+    ----------
+    name : str
+        Metric name, e.g. 'upload_age_seconds.davis'.
+    value : float
+        The sample.
+
+    Returns
+    -------
+    None.
+
+    """
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            _metrics[name] = {'count': 1, 'sum': value, 'min': value, 'max': value, 'last': value}
+        else:
+            metric['count'] += 1
+            metric['sum'] += value
+            metric['min'] = min(metric['min'], value)
+            metric['max'] = max(metric['max'], value)
+            metric['last'] = value
+
+
+def set_value(name, value):
+    """
+    Set a gauge-style metric to its current value.
+
+    Returns
+    -------
+    None.
+
+    """
+    with _lock:
+        _metrics[name] = {'value': value}
+
+
+def snapshot():
+    """
+    Copy of all metrics, with the mean filled in for sampled ones.
+
+    Returns
+    -------
+    dict
+        Metric name -> statistics.
+
+    """
+    with _lock:
+        result = {}
+        for name, metric in _metrics.items():
+            result[name] = dict(metric)
+            if 'count' in metric:
+                result[name]['mean'] = metric['sum'] / metric['count']
+        return result
+
+
+def dump(filename='metrics.json'):
+    """
+    Write the current metrics to a JSON file (replaced atomically).
+
+    Returns
+    -------
+    None.
+
+    """
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(snapshot(), f, indent=1, sort_keys=True)
+    os.replace(tmp_file, filename)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import struct
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+from group_writer import open_writer
+from stations import record_time, station_id
+
+# One index entry: reading time (epoch), station ID, byte offset of its line
+ENTRY = struct.Struct('<dqq')
+
+
+class OffsetIndex:
+    """
+    Sparse index of a JSONL file: where to seek to for a point in time.
+
+    Every `every`-th record of each station gets an entry (reading time,
+    station, byte offset of its line) in a sidecar file <file>.idx, so
+    the index stays around 1/`every` of the records and is cheap to load.
+    A time-range query bisects the entries of the station (or of all
+    stations) to the last entry before the start of the range and reads
+    the file from there.
+
+    The writer feeds add() with the offset of every line it appends.
+    Entries are written through a group-commit writer (group_writer.py)
+    of their own, so after a crash the index may hold entries for lines
+    that were lost; discard_after() drops them when the file is reopened.
+
+    """
+
+    def __init__(self, path, every=100, name=None):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.every = every
+        self.name = name
+        self.counts = {}  # station ID -> records since the last entry
+        self._file = None
+
+    def add(self, timestamp, station, offset):
+        """
+        Count one appended line, adding an entry every `every` records
+        of its station.
+
+        Returns
+        -------
+        None.
+
+        """
+        count = self.counts.get(station, 0)
+        self.counts[station] = count + 1
+        if count % self.every:
+            return
+        if self._file is None:
+            self._file = open_writer(self.index_path, self.name)
+        self._file.write(ENTRY.pack(timestamp, station, offset))
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard_after(self, size):
+        """
+        Drop the entries pointing at or past `size` bytes into the file.
+
+        Returns
+        -------
+        int
+            Number of entries dropped.
+
+        """
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        torn = len(data) % ENTRY.size
+        kept = [entry for entry in ENTRY.iter_unpack(data[:len(data) - torn]) if entry[2] < size]
+        dropped = len(data) // ENTRY.size - len(kept)
+        # a torn last entry would misalign the ones appended after it
+        if dropped or torn:
+            tmp_file = self.index_path + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(b''.join(ENTRY.pack(*entry) for entry in kept))
+            os.replace(tmp_file, self.index_path)
+        return dropped
+
+    def load(self):
+        """
+        Read the entries of the index file.
+
+        Returns
+        -------
+        dict
+            Station ID -> (list of times, list of offsets), in file order.
+
+        """
+        entries = {}
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return entries
+        # a torn last entry is ignored
+        for timestamp, station, offset in ENTRY.iter_unpack(data[:len(data) - len(data) % ENTRY.size]):
+            times, offsets = entries.setdefault(station, ([], []))
+            times.append(timestamp)
+            offsets.append(offset)
+        return entries
+
+    def start_offset(self, start, station=None):
+        """
+        Byte offset from which every record at or after `start` follows.
+
+        Parameters
+        ----------
+        start : float
+            Epoch time.
+        station : int, optional
+            Only the records of this station need to follow.
+
+        Returns
+        -------
+        int
+            The offset, 0 if the index has no entry before `start`.
+
+        """
+        entries = self.load()
+        if station is not None:
+            entries = {station: entries[station]} if station in entries else {}
+        if not entries:
+            return 0
+
+        offset = None
+        for times, offsets in entries.values():
+            i = bisect_left(times, start)
+            position = offsets[i - 1] if i else 0
+            offset = position if offset is None else min(offset, position)
+        return offset
+
+
+def query_file(path, source, start, end, station=None, slack=60):
+    """
+    Stream the records of a JSONL file within a time range.
+
+    With an index (<file>.idx) the file is read from the last indexed
+    record before `start`; without one, from the beginning. Reading stops
+    at the first record more than `slack` seconds past `end`, since the
+    readings are stored as they arrive and are only out of order by the
+    delay of the decoders.
+
+    Parameters
+    ----------
+    path : str
+        The JSONL file.
+    source : str
+        'davis', 'rtl_433' or 'lora'.
+    start, end : float
+        Epoch times, inclusive.
+    station : int, optional
+        Only yield the records of this station.
+    slack : float, optional
+        Seconds by which records may be out of order.
+
+    Yields
+    ------
+    str
+        One JSONL line.
+
+    """
+    offset = OffsetIndex(path).start_offset(start, station)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.strip():
+                continue
+            line = raw.decode('utf-8').rstrip('\n')
+            try:
+                record = json.loads(line)
+                received = record_time(source, record).timestamp()
+            except (KeyError, ValueError):
+                continue  # torn line of a crash
+            if received > end + slack:
+                return
+            if start <= received <= end and (station is None or record_station(source, record) == station):
+                yield line
+
+
+def record_station(source, record):
+    try:
+        return station_id(source, record)
+    except (KeyError, ValueError):
+        return None
+
+
+def build_index(path, source, every=100):
+    """
+    Index an existing JSONL file, e.g. a legacy flat file, from scratch.
+
+    Returns
+    -------
+    int
+        Number of index entries.
+
+    """
+    index = OffsetIndex(path, every)
+    if os.path.exists(index.index_path):
+        os.remove(index.index_path)
+
+    entries = 0
+    offset = 0
+    with open(path, 'rb') as f:
+        for raw in f:
+            try:
+                record = json.loads(raw)
+                received = record_time(source, record).timestamp()
+                ID = station_id(source, record)
+            except (KeyError, ValueError):
+                offset += len(raw)
+                continue
+            entries += index.counts.get(ID, 0) % every == 0
+            index.add(received, ID, offset)
+            offset += len(raw)
+    index.close()
+    return entries
+
+
+if __name__ == '__main__':
+    # Index a legacy file, then query it (or the store of a source):
+    #   python3 offset_index.py build rtl_433 genws_data.json
+    #   python3 offset_index.py query rtl_433 "2024-02-10 22:00" "2024-02-10 23:00" --station 102
+    parser = argparse.ArgumentParser(description='Build a sparse offset index, or query readings by time range.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='index a JSONL file')
+    build.add_argument('source', choices=['davis', 'rtl_433', 'lora'])
+    build.add_argument('file')
+    build.add_argument('--every', type=int, default=100)
+    query = commands.add_parser('query', help='print the readings of a time range')
+    query.add_argument('source', choices=['davis', 'rtl_433', 'lora'])
+    query.add_argument('start', type=datetime.fromisoformat)
+    query.add_argument('end', type=datetime.fromisoformat)
+    query.add_argument('--station', type=int)
+    query.add_argument('--file', help='query this JSONL file instead of the store')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == 'build':
+        entries = build_index(args.file, args.source, args.every)
+        print(f'{entries} index entries in {time.perf_counter() - started:.1f} s')
+    else:
+        if args.file:
+            lines = query_file(args.file, args.source, args.start.timestamp(), args.end.timestamp(), args.station)
+        else:
+            from storage import open_store
+            lines = open_store(args.source).iter_range(args.start, args.end, args.station)
+        count = 0
+        for line in lines:
+            print(line)
+            count += 1
+        print(f'{count} readings in {time.perf_counter() - started:.3f} s')
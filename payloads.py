@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import json
+import zlib
+
+from config import load_config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# Short names for the keys repeated in every message
+SHORT_KEYS = {'type': 't', 'source': 's', 'local_time': 'lt', 'window_start': 'ws', 'window_end': 'we'}
+LONG_KEYS = {short: key for key, short in SHORT_KEYS.items()}
+
+
+def _shorten(message):
+    return {SHORT_KEYS.get(key, key): value for key, value in message.items()
+            if key != 'type'}
+
+
+def _lengthen(message):
+    message = {LONG_KEYS.get(key, key): value for key, value in message.items()}
+    message['type'] = "data"
+    return message
+
+
+def encode(messages, mode='per-station', encoding='json', deflate=False):
+    """
+    Encode the upload messages of one cycle.
+
+    In 'per-station' mode (the default, what the CARE database has always
+    received) every message is sent on its own as plain JSON. In 'batch'
+    mode all messages are packed into one payload:
+
+    - 'json': {"type": "batch", "readings": [<message>, ...]}
+    - 'json-short': {"t": "b", "r": [...]}, with 'type' dropped and
+      'source'/'local_time' shortened to 's'/'lt'
+    - 'msgpack' or 'cbor': the 'json-short' structure in binary form
+      (needs the msgpack or cbor2 package)
+
+    Batches can also be deflate-compressed. The encoding is named in the
+    topic suffix, e.g. "/batch/json-short+deflate", so the consumer knows
+    how to decode it (see decode()).
+
+    Parameters
+    ----------
+    messages : list of dict
+        Messages as built by the uploaders' make_msg().
+    mode : str, optional
+        'per-station' or 'batch'.
+    encoding : str, optional
+        'json', 'json-short', 'msgpack' or 'cbor' (batch mode only).
+    deflate : bool, optional
+        Deflate-compress batch payloads.
+
+    Returns
+    -------
+    list of tuple
+        (topic suffix, payload) pairs to publish.
+
+    """
+    if mode == 'per-station':
+        return [('', json.dumps(message)) for message in messages]
+    if not messages:
+        return []
+
+    if encoding == 'json':
+        payload = json.dumps({'type': "batch", 'readings': messages}).encode()
+    else:
+        batch = {'t': "b", 'r': [_shorten(message) for message in messages]}
+        if encoding == 'json-short':
+            payload = json.dumps(batch, separators=(',', ':')).encode()
+        elif encoding == 'msgpack':
+            if msgpack is None:
+                raise RuntimeError('msgpack is not installed')
+            payload = msgpack.packb(batch)
+        elif encoding == 'cbor':
+            if cbor2 is None:
+                raise RuntimeError('cbor2 is not installed')
+            payload = cbor2.dumps(batch)
+        else:
+            raise ValueError(f'Unknown payload encoding {encoding}')
+
+    suffix = f'/batch/{encoding}'
+    if deflate:
+        payload = zlib.compress(payload, 9)
+        suffix += '+deflate'
+    return [(suffix, payload)]
+
+
+def decode(suffix, payload):
+    """
+    Decode a payload published by encode(), for consumers and testing.
+
+    Parameters
+    ----------
+    suffix : str
+        Topic suffix the payload was published under ('' for per-station).
+    payload : str or bytes
+        Message body.
+
+    Returns
+    -------
+    list of dict
+        The original messages.
+
+    """
+    if not suffix:
+        return [json.loads(payload)]
+
+    encoding = suffix.rsplit('/', 1)[-1]
+    if encoding.endswith('+deflate'):
+        encoding = encoding[:-len('+deflate')]
+        payload = zlib.decompress(payload)
+
+    if encoding == 'json':
+        return json.loads(payload)['readings']
+    if encoding == 'json-short':
+        batch = json.loads(payload)
+    elif encoding == 'msgpack':
+        batch = msgpack.unpackb(payload)
+    elif encoding == 'cbor':
+        batch = cbor2.loads(payload)
+    else:
+        raise ValueError(f'Unknown payload encoding {encoding}')
+    return [_lengthen(message) for message in batch['r']]
+
+
+def queue_messages(outbox, source, messages, reading_times):
+    """
+    Encode one cycle's messages per the 'payload' section of config.json
+    and put them into the upload queue.
+
+    Parameters
+    ----------
+    outbox : UploadQueue
+        The upload queue.
+    source : str
+        'davis', 'rtl_433' or 'lora'.
+    messages : list of dict
+        Messages as built by make_msg().
+    reading_times : list of float
+        Epoch time of the reading behind each message.
+
+    Returns
+    -------
+    None.
+
+    """
+    config = load_config()
+    settings = config['payload']
+    encoded = encode(messages, settings['mode'], settings['encoding'], settings['deflate'])
+
+    if settings['mode'] == 'per-station':
+        for (suffix, payload), reading_time in zip(encoded, reading_times):
+            outbox.put(payload, source=source, reading_time=reading_time)
+    else:
+        # a batch is as old as its oldest reading
+        for suffix, payload in encoded:
+            outbox.put(payload, topic=config['mqtt']['topic'] + suffix,
+                       source=source, reading_time=min(reading_times))
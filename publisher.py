@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import threading
+
+import certifi
+import paho.mqtt.client as mqtt
+
+from config import load_config
+
+
+class MqttPublisher:
+    """
+    Long-lived MQTT connection shared by all uploaders.
+
+    The connection is opened once, kept alive by paho's network loop thread
+    and re-established automatically after a drop. Publishing waits for
+    the broker's acknowledgement (on_publish) instead of sleeping.
+
+    """
+
+    def __init__(self, host, port, username=None, password=None, tls=True,
+                 topic="UPCARE/UNDERGRAD/COE199_SDR", client_id=""):
+        self.host = host
+        self.port = port
+        self.topic = topic
+
+        self._connected = threading.Event()
+        self._outstanding = set()  # message IDs someone may still wait for
+        self._acked = set()
+        self._early = {}  # message ID -> publish ticket, acknowledged before it was registered
+        self._tickets = 0
+        self._acked_lock = threading.Condition()
+
+        self.client = mqtt.Client(client_id=client_id, clean_session=not client_id)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_publish = self.on_publish
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+
+        if tls:
+            self.client.tls_set(certifi.where())
+        if username:
+            self.client.username_pw_set(username, password)
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            print(f"MQTT Server connection successfully established ({self.host}:{self.port})")
+            self._connected.set()
+        else:
+            print(f"Failed to connect to MQTT Server with return code {rc}")
+
+    def on_disconnect(self, client, userdata, rc):
+        self._connected.clear()
+        if rc != 0:
+            print(f"MQTT Server connection lost (rc={rc}), reconnecting...")
+
+    def on_publish(self, client, userdata, mid):
+        with self._acked_lock:
+            if mid in self._outstanding:
+                self._acked.add(mid)
+                self._acked_lock.notify_all()
+            else:
+                # before publish_nowait() registered it, or after
+                # wait_acked() gave up on it; see publish_nowait()
+                self._early[mid] = self._tickets
+
+    def start(self):
+        """
+        Connect in the background and start the network loop.
+
+        Returns
+        -------
+        None.
+
+        """
+        print("Connecting to MQTT Server....")
+        self.client.connect_async(self.host, self.port)
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def wait_connected(self, timeout=None):
+        """
+        Block until the broker has accepted the connection.
+
+        Returns
+        -------
+        bool
+            True if connected within the timeout.
+
+        """
+        return self._connected.wait(timeout)
+
+    def publish(self, payload, topic=None, qos=1, timeout=30):
+        """
+        Publish one message and wait until the broker acknowledges it.
+
+        Parameters
+        ----------
+        payload : str or bytes
+            Message body.
+        topic : str, optional
+            Defaults to the configured topic.
+        qos : int, optional
+            MQTT quality of service. The default is 1 (PUBACK).
+        timeout : float, optional
+            Seconds to wait for the connection and for the acknowledgement.
+
+        Returns
+        -------
+        bool
+            True if the message was acknowledged.
+
+        """
+        if not self.wait_connected(timeout):
+            print("MQTT Server not connected, message not sent")
+            return False
+
+        mid = self.publish_nowait(payload, topic, qos)
+        return mid is not None and bool(self.wait_acked([mid], timeout))
+
+    def publish_nowait(self, payload, topic=None, qos=1):
+        """
+        Hand one message to the network loop without waiting.
+
+        Returns
+        -------
+        int or None
+            Message ID to pass to wait_acked(), or None if it was refused.
+
+        """
+        # paho reuses its 16-bit message IDs, so a PUBACK that arrived
+        # after wait_acked() gave up on an ID must not count for a new
+        # message with that ID. An acknowledgement that arrived before the
+        # ID was registered (QoS 0 ones do within publish()) counts only
+        # if it arrived after this call started.
+        with self._acked_lock:
+            self._tickets += 1
+            ticket = self._tickets
+        info = self.client.publish(topic or self.topic, payload, qos=qos)
+        with self._acked_lock:
+            early = self._early.pop(info.mid, 0)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                print(f"Publish failed with return code {info.rc}")
+                return None
+            self._outstanding.add(info.mid)
+            if early >= ticket:
+                self._acked.add(info.mid)
+        return info.mid
+
+    def wait_acked(self, mids, timeout=30):
+        """
+        Wait until the broker has acknowledged the given messages.
+
+        Parameters
+        ----------
+        mids : iterable of int
+            Message IDs returned by publish_nowait().
+        timeout : float, optional
+            Seconds to wait for all acknowledgements.
+
+        Returns
+        -------
+        set
+            The message IDs that were acknowledged in time. The others
+            are given up: a later acknowledgement of them is ignored.
+
+        """
+        mids = set(mids)
+        with self._acked_lock:
+            self._acked_lock.wait_for(lambda: mids <= self._acked, timeout)
+            acked = mids & self._acked
+            self._acked -= mids
+            self._outstanding -= mids
+        return acked
+
+
+def create_publisher(settings=None):
+    """
+    Build and start a publisher from the 'mqtt' section of config.json.
+
+    Returns
+    -------
+    MqttPublisher
+        A started publisher.
+
+    """
+    if settings is None:
+        settings = load_config()['mqtt']
+    publisher = MqttPublisher(settings['host'], settings['port'],
+                              username=settings.get('username'),
+                              password=settings.get('password'),
+                              tls=settings.get('tls', True),
+                              topic=settings['topic'])
+    publisher.start()
+    return publisher
+
+
+if __name__ == '__main__':
+    # Send one test message, e.g. to a local broker:
+    #   mosquitto -p 1883 &
+    #   python3 publisher.py --host localhost --port 1883 --no-tls
+    settings = dict(load_config()['mqtt'])
+
+    parser = argparse.ArgumentParser(description='Publish a test message through MqttPublisher.')
+    parser.add_argument('--host', default=settings['host'])
+    parser.add_argument('--port', type=int, default=settings['port'])
+    parser.add_argument('--no-tls', action='store_true')
+    parser.add_argument('--topic', default=settings['topic'])
+    args = parser.parse_args()
+
+    settings.update(host=args.host, port=args.port, topic=args.topic)
+    if args.no_tls:
+        settings.update(tls=False, username=None, password=None)
+
+    publisher = create_publisher(settings)
+    try:
+        acked = publisher.publish(json.dumps({'type': 'test'}))
+        print(f"Test message {'acknowledged' if acked else 'NOT acknowledged'}")
+    finally:
+        publisher.stop()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import subprocess
+
+from config import load_config
+
+
+def compatible(radio, job):
+    """
+    Whether a radio can run a job: frequency in range and all tags present.
+
+    Parameters
+    ----------
+    radio : dict
+        Entry of the 'radios' section of config.json.
+    job : dict
+        Entry of the 'jobs' section of config.json.
+
+    Returns
+    -------
+    bool
+        True if compatible.
+
+    """
+    return (radio['min_frequency'] <= job['frequency'] <= radio['max_frequency']
+            and set(job.get('needs', [])) <= set(radio.get('tags', [])))
+
+
+def job_value(job, share):
+    """
+    Expected captured stations of a job given its share of a radio's time.
+
+    A job needs `duty` of the radio's time to catch (nearly) all packets
+    of its stations; with less, captures fall off proportionally.
+
+    Returns
+    -------
+    float
+        Stations times expected capture rate.
+
+    """
+    return job.get('weight', 1) * len(job['stations']) * min(1.0, share / job['duty'])
+
+
+def allocate_shares(jobs, cycle):
+    """
+    Split one radio's time between its jobs for the most expected captures.
+
+    Time-slicing costs each job its switch_cost once per cycle. The rest
+    is handed out by value per unit of time (fractional knapsack), each
+    job getting at most its duty.
+
+    Parameters
+    ----------
+    jobs : dict
+        Job name -> job settings, all on the same radio.
+    cycle : float
+        Seconds over which the radio visits each of its jobs once.
+
+    Returns
+    -------
+    tuple
+        (shares, value): job name -> fraction of radio time, and the total
+        expected value.
+
+    """
+    if len(jobs) == 1:
+        name, job = next(iter(jobs.items()))
+        return {name: 1.0}, job_value(job, 1.0)
+
+    capacity = max(0.0, 1.0 - sum(job['switch_cost'] for job in jobs.values()) / cycle)
+    shares = {name: 0.0 for name in jobs}
+
+    def density(name):
+        return job_value(jobs[name], jobs[name]['duty']) / jobs[name]['duty']
+
+    # equally valuable jobs split the time between them
+    for _, group in itertools.groupby(sorted(jobs, key=density, reverse=True), key=density):
+        group = list(group)
+        wanted = sum(jobs[name]['duty'] for name in group)
+        given = min(wanted, capacity)
+        for name in group:
+            shares[name] = given * jobs[name]['duty'] / wanted
+        capacity -= given
+
+    # left-over time goes to the jobs in proportion to their duty
+    if capacity > 0:
+        total = sum(job['duty'] for job in jobs.values())
+        for name, job in jobs.items():
+            shares[name] += capacity * job['duty'] / total
+
+    return shares, sum(job_value(jobs[name], shares[name]) for name in jobs)
+
+
+def plan_assignment(radios, jobs, cycle=300, max_combinations=100000):
+    """
+    Assign jobs to radios and time-slice each radio.
+
+    Every combination of compatible radios is tried (jobs that no radio
+    can run are left out), keeping the one with the most expected captures.
+    Ties are broken in favour of fewer jobs per radio, i.e. less switching.
+
+    Parameters
+    ----------
+    radios : list of dict
+        Available radios, see the 'radios' section of config.json.
+    jobs : dict
+        Job name -> job settings, see the 'jobs' section of config.json.
+    cycle : float, optional
+        Time-slicing cycle in seconds, see allocate_shares().
+    max_combinations : int, optional
+        Above this many combinations, jobs are placed greedily one by one.
+
+    Returns
+    -------
+    tuple
+        (plan, value, unassigned): radio name -> {job name: share}, the
+        expected value, and the names of jobs without a radio.
+
+    """
+    candidates = {name: [radio['name'] for radio in radios if compatible(radio, job)]
+                  for name, job in jobs.items()}
+    unassigned = [name for name, names in candidates.items() if not names]
+    names = [name for name in jobs if candidates[name]]
+
+    def evaluate(choice):
+        on_radio = {}
+        for name, radio in zip(names, choice):
+            on_radio.setdefault(radio, {})[name] = jobs[name]
+        plan = {}
+        value = 0.0
+        for radio, radio_jobs in on_radio.items():
+            plan[radio], radio_value = allocate_shares(radio_jobs, cycle)
+            value += radio_value
+        return value, -max(map(len, plan.values()), default=0), plan
+
+    combinations = 1
+    for name in names:
+        combinations *= len(candidates[name])
+
+    if combinations <= max_combinations:
+        best = max((evaluate(choice) for choice in itertools.product(*(candidates[name] for name in names))),
+                   key=lambda result: result[:2], default=(0.0, 0, {}))
+    else:
+        choice = []
+        for name in names:
+            # evaluate() only looks at the jobs placed so far
+            choice.append(max(candidates[name], key=lambda radio: evaluate(choice + [radio])[:2]))
+        best = evaluate(choice)
+
+    value, _, plan = best
+    return plan, value, unassigned
+
+
+def probe(radio, timeout=10):
+    """
+    Check that a radio is connected by running its 'probe' command.
+
+    Radios without a probe command are assumed present.
+
+    Returns
+    -------
+    bool
+        True if the probe succeeded.
+
+    """
+    if not radio.get('probe'):
+        return True
+    try:
+        return subprocess.run(radio['probe'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              timeout=timeout).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+class RadioScheduler:
+    """
+    Keeps the job-to-radio plan up to date as radios come and go.
+
+    """
+
+    def __init__(self, radios, jobs, cycle=300):
+        self.radios = radios
+        self.jobs = jobs
+        self.cycle = cycle
+
+        self.available = None
+        self.plan = {}
+        self.value = 0.0
+        self.unassigned = []
+
+    def update(self, available):
+        """
+        Re-plan if the set of available radios has changed.
+
+        Parameters
+        ----------
+        available : list of str
+            Names of the radios currently connected.
+
+        Returns
+        -------
+        bool
+            True if a new plan was made.
+
+        """
+        available = sorted(available)
+        if available == self.available:
+            return False
+        self.available = available
+
+        radios = [radio for radio in self.radios if radio['name'] in available]
+        self.plan, self.value, self.unassigned = plan_assignment(radios, self.jobs, self.cycle)
+        for radio, shares in self.plan.items():
+            print(f"Radio {radio}: " + ", ".join(f"{name} {share:.0%}" for name, share in shares.items()))
+        if self.unassigned:
+            print(f"No radio for: {', '.join(self.unassigned)}")
+        return True
+
+
+if __name__ == '__main__':
+    # Show the plan for the configured radios, e.g. with one missing:
+    #   python3 radio_scheduler.py --without pluto
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Show the job-to-radio plan.')
+    parser.add_argument('--without', nargs='*', default=[], help='radios to leave out')
+    parser.add_argument('--probe', action='store_true', help='only use radios that answer their probe')
+    args = parser.parse_args()
+
+    scheduler = RadioScheduler(config['radios'], config['jobs'], config['dwell']['horizon'])
+    available = [radio['name'] for radio in config['radios']
+                 if radio['name'] not in args.without and (not args.probe or probe(radio))]
+    scheduler.update(available)
+    print(f"Expected stations captured: {scheduler.value:.2f}")
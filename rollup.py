@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import threading
+from datetime import datetime
+
+from config import load_config
+from stations import load_stations, record_time, station_id
+
+
+class FieldStats:
+    """
+    Running min/max/mean/last of one field, in constant memory.
+
+    Cumulative fields (e.g. the WH40's rain_mm) also sum their increase;
+    a drop of the counter (battery change) counts as a restart from zero.
+
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+        self.delta = 0.0
+
+    def add(self, value, previous=None):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+        if previous is not None:
+            self.delta += value - previous if value >= previous else value
+
+    def summary(self, cumulative=False):
+        result = {'min': self.min, 'max': self.max, 'mean': self.total / self.count, 'last': self.last}
+        if cumulative:
+            result['delta'] = self.delta
+        return result
+
+
+class Rollup:
+    """
+    Aggregates every station's readings over tumbling windows as they arrive.
+
+    Windows are aligned to multiples of `window` seconds (by default the
+    quarter hours). Per station and uploaded field the open window keeps
+    a FieldStats; when a reading of a later window arrives, or take()
+    finds the window over, it is closed and its summary kept until the
+    uploader takes it. Fields listed in `deltas` are cumulative counters,
+    whose increase within the window is reported as well.
+
+    """
+
+    def __init__(self, window=900, deltas=()):
+        self.window = window
+        self.deltas = set(deltas)
+        self.open = {}        # (source, ID) -> (window start, {field: FieldStats})
+        self.closed = {}      # (source, ID) -> summary of the last closed window
+        self.previous = {}    # (source, ID, field) -> last value, for deltas
+        self.lock = threading.Lock()  # fed by ingest events while the uploads take
+
+    def add(self, source, record):
+        """
+        Add one stored record.
+
+        Returns
+        -------
+        bool
+            False if the record is not of a registered station.
+
+        """
+        try:
+            ID = station_id(source, record)
+            received = record_time(source, record).timestamp()
+        except (KeyError, ValueError):
+            return False
+        station = load_stations(source).get(ID)
+        if station is None:
+            return False
+
+        key = (source, ID)
+        start = received - received % self.window
+        with self.lock:
+            return self._add(key, start, station, record)
+
+    def _add(self, key, start, station, record):
+        source, ID = key
+        if key in self.open and self.open[key][0] != start:
+            if self.open[key][0] > start:
+                return False  # late reading of a closed window
+            self.close(key)
+        if key not in self.open:
+            self.open[key] = (start, {})
+
+        fields = self.open[key][1]
+        for name in station['fields']:
+            try:
+                value = float(record[name])
+            except (KeyError, TypeError, ValueError):
+                continue
+            previous = self.previous.get((source, ID, name)) if name in self.deltas else None
+            fields.setdefault(name, FieldStats()).add(value, previous)
+            if name in self.deltas:
+                self.previous[(source, ID, name)] = value
+        return True
+
+    def close(self, key):
+        start, fields = self.open.pop(key)
+        self.closed[key] = {'start': start, 'end': start + self.window,
+                            'count': max((stats.count for stats in fields.values()), default=0),
+                            'fields': {name: stats.summary(name in self.deltas)
+                                       for name, stats in fields.items()}}
+
+    def take(self, source, ID, now):
+        """
+        The last closed window of a station, once.
+
+        Parameters
+        ----------
+        now : float
+            Epoch time; an open window that has ended is closed first.
+
+        Returns
+        -------
+        dict or None
+            {'start', 'end', 'count', 'fields': {field: {'min', 'max',
+            'mean', 'last'[, 'delta']}}}, or None if no window closed
+            since the last call.
+
+        """
+        key = (source, ID)
+        with self.lock:
+            if key in self.open and self.open[key][0] + self.window <= now:
+                self.close(key)
+            return self.closed.pop(key, None)
+
+
+def rollup_fields(summary, fields):
+    """
+    MQTT fields of a window summary: <name>_MIN, _MAX and _AVG of every
+    field, plus <name>_DELTA for cumulative ones, and the window bounds.
+
+    Parameters
+    ----------
+    summary : dict
+        From Rollup.take().
+    fields : dict
+        The station's 'fields' mapping (record key -> MQTT name).
+
+    Returns
+    -------
+    dict
+        Message fields.
+
+    """
+    message = {'window_start': datetime.fromtimestamp(summary['start']).isoformat(),
+               'window_end': datetime.fromtimestamp(summary['end']).isoformat()}
+    for key, stats in summary['fields'].items():
+        name = fields[key]
+        message[f'{name}_MIN'] = stats['min']
+        message[f'{name}_MAX'] = stats['max']
+        message[f'{name}_AVG'] = stats['mean']
+        if 'delta' in stats:
+            message[f'{name}_DELTA'] = stats['delta']
+    return message
+
+
+_rollup = None
+
+
+def shared_rollup():
+    """
+    The rollup of this process, see the 'rollup' section of config.json.
+
+    Returns
+    -------
+    Rollup
+        The rollup.
+
+    """
+    global _rollup
+    if _rollup is None:
+        settings = load_config()['rollup']
+        _rollup = Rollup(settings['window'], settings['deltas'])
+    return _rollup
+
+
+def window_fields(source, ID, now=None):
+    """
+    Aggregate fields to add to a station's next message, if a window of
+    the shared rollup has closed since its last message.
+
+    Returns
+    -------
+    dict
+        Message fields, empty if there is no new window.
+
+    """
+    summary = shared_rollup().take(source, ID, datetime.now().timestamp() if now is None else now)
+    if summary is None or not summary['fields']:
+        return {}
+    return rollup_fields(summary, load_stations(source)[ID]['fields'])
+
+
+if __name__ == '__main__':
+    # Aggregate a log, e.g.: python3 rollup.py rtl_433 "Sample Data/General_data.json"
+    parser = argparse.ArgumentParser(description='Print the windowed aggregates of a stored log.')
+    parser.add_argument('source', choices=['davis', 'rtl_433', 'lora'])
+    parser.add_argument('log')
+    args = parser.parse_args()
+
+    rollup = shared_rollup()
+    windows = 0
+    with open(args.log, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = (args.source, station_id(args.source, record)) if rollup.add(args.source, record) else None
+            summary = rollup.closed.pop(key, None)
+            if summary is not None:
+                windows += 1
+                print(f"{args.source} {key[1]} {datetime.fromtimestamp(summary['start']):%Y-%m-%d %H:%M} "
+                      f"({summary['count']} readings): {json.dumps(summary['fields'])}")
+    print(f'{windows} closed windows')
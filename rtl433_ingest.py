@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+
+import metrics
+from config import load_config
+from dedup import RepeatFilter
+from stations import record_time
+
+
+def frame_key(record):
+    """
+    What identifies one rtl_433 frame: (model, id, data).
+
+    Decoders without a raw 'data' field are keyed on all decoded values
+    except the time instead.
+
+    Returns
+    -------
+    tuple
+        The key.
+
+    """
+    if 'data' in record:
+        return (record.get('model'), record.get('id'), record['data'])
+    return (record.get('model'), record.get('id'),
+            json.dumps({key: value for key, value in record.items() if key != 'time'}, sort_keys=True))
+
+
+def parse_line(line):
+    """
+    Decode one rtl_433 JSON line, from stdout or a syslog datagram.
+
+    Returns
+    -------
+    dict or None
+        The record, or None for log and status lines.
+
+    """
+    start = line.find('{')
+    if start < 0:
+        return None
+    try:
+        return json.loads(line[start:])
+    except ValueError:
+        return None
+
+
+class Rtl433Ingest:
+    """
+    Stores rtl_433 output, suppressing repeated transmissions.
+
+    WH31E and WH40 sensors send every frame several times; only the first
+    copy within `repeat_window` seconds reaches storage. One instance is
+    kept for the lifetime of the program, so repeats straddling an
+    rtl_433 restart are suppressed as well.
+
+    """
+
+    def __init__(self, store, repeat_window=3.0, on_record=None):
+        self.store = store
+        self.on_record = on_record
+        self.repeats = RepeatFilter(repeat_window)
+
+    def handle_line(self, line):
+        """
+        Store the record of one output line unless it is a repeat.
+
+        Returns
+        -------
+        dict or None
+            The stored record.
+
+        """
+        record = parse_line(line)
+        if record is None:
+            return None
+        repeat = self.repeats.is_repeat(frame_key(record))
+        metrics.set_value('rtl_433_frames.unique', self.repeats.unique)
+        metrics.set_value('rtl_433_frames.repeats', self.repeats.repeats)
+        if repeat:
+            return None
+
+        print(record)
+        self.store.append(record)
+        if self.on_record is not None:
+            self.on_record(record)
+        return record
+
+    def consume(self, stdout):
+        """
+        Store every line of a running rtl_433's stdout until it exits.
+
+        Returns
+        -------
+        None.
+
+        """
+        for line in stdout:
+            self.handle_line(line)
+        self.store.flush()
+
+
+class Rtl433UdpReceiver(asyncio.DatagramProtocol):
+    """
+    Receives rtl_433's syslog output ("-F syslog:127.0.0.1:1433").
+
+    """
+
+    def __init__(self, ingest):
+        self.ingest = ingest
+
+    def datagram_received(self, data, addr):
+        self.ingest.handle_line(data.decode('utf-8', errors='replace'))
+
+
+async def serve(ingest, settings=None, stop=None):
+    """
+    Receive rtl_433 datagrams until `stop` is set (forever by default).
+
+    Returns
+    -------
+    None.
+
+    """
+    if settings is None:
+        settings = load_config()['rtl_433_input']
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: Rtl433UdpReceiver(ingest), local_addr=(settings['host'], settings['port']))
+    print(f"Listening for rtl_433 output on {settings['host']}:{settings['port']}")
+    try:
+        await (stop or asyncio.Event()).wait()
+    finally:
+        transport.close()
+        ingest.store.flush()
+
+
+def run(ingest):
+    """
+    Blocking entry point, e.g. for a thread of main_program.py.
+
+    Returns
+    -------
+    None.
+
+    """
+    asyncio.run(serve(ingest))
+
+
+def dedup_file(filename, output, repeat_window=3.0):
+    """
+    Remove repeated frames from an existing rtl_433 JSONL log.
+
+    Repeats are detected on the logged time rather than reception time.
+
+    Returns
+    -------
+    tuple
+        (lines read, lines written).
+
+    """
+    repeats = RepeatFilter(repeat_window)
+    read = written = 0
+    with open(filename, 'r') as f, open(output, 'w') as out:
+        for line in f:
+            record = parse_line(line)
+            if record is None:
+                continue
+            read += 1
+            if not repeats.is_repeat(frame_key(record), record_time('rtl_433', record).timestamp()):
+                out.write(json.dumps(record) + '\n')
+                written += 1
+    return read, written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Remove repeated frames from an rtl_433 JSONL log.')
+    parser.add_argument('log')
+    parser.add_argument('output')
+    parser.add_argument('--window', type=float, default=load_config()['rtl_433_input']['repeat_window'])
+    args = parser.parse_args()
+
+    read, written = dedup_file(args.log, args.output, args.window)
+    print(f'{read} frames, {written} unique ({read / max(written, 1):.2f}x repeat factor)')
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+import argparse
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import metrics
+from config import load_config
+from supervisor import StallError
+
+# Transmitter ID in packet lines ("msg.ID=1") and missed-packet lines ("ID:1 packet missed")
+TRANSMITTER_ID = re.compile(r'ID[:=](\d+)')
+
+
+class CaptureRatioError(Exception):
+    pass
+
+
+class RtldavisMonitor:
+    """
+    Tracks the packets rtldavis receives and misses per transmitter.
+
+    rtldavis hops along the Davis frequency sequence and reports every
+    slot in which an expected packet did not arrive as "packet missed".
+    Over a sliding window of `window` seconds, received / (received +
+    missed) is the capture ratio of each transmitter; once at least
+    `min_packets` are counted for a transmitter, a ratio below
+    `min_ratio` means rtldavis has lost sync or the RTL-SDR is degraded.
+
+    The ratios are recorded as capture_ratio.davis.<ID> in
+    metrics_rtldavis.json.
+
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.events = {}  # ID -> deque of (time, received)
+        self.last_dump = float('-inf')
+
+    def reset(self):
+        """
+        Forget all counts, e.g. after rtldavis has been restarted.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.events.clear()
+
+    def handle_line(self, line, now=None):
+        """
+        Count one rtldavis output line.
+
+        Returns
+        -------
+        bool or None
+            True for a received packet, False for a missed one, None for
+            other lines.
+
+        """
+        if 'packet missed' in line:
+            received = False
+        elif 'msg.ID=' in line:
+            received = True
+        else:
+            return None
+        match = TRANSMITTER_ID.search(line)
+        if match is None:
+            return None
+
+        now = time.time() if now is None else now
+        self.events.setdefault(int(match.group(1)), deque()).append((now, received))
+        return received
+
+    def ratios(self, now=None):
+        """
+        Capture ratio of every transmitter over the sliding window.
+
+        Returns
+        -------
+        dict
+            ID -> (ratio, packets counted).
+
+        """
+        now = time.time() if now is None else now
+        result = {}
+        for ID, events in self.events.items():
+            while events and events[0][0] < now - self.settings['window']:
+                events.popleft()
+            if events:
+                result[ID] = (sum(received for _, received in events) / len(events), len(events))
+        return result
+
+    def check(self, now=None):
+        """
+        Record the capture ratios and raise if one of them is too low.
+
+        Raises
+        ------
+        CaptureRatioError
+            If a transmitter with at least `min_packets` counted has a
+            capture ratio below `min_ratio`.
+
+        Returns
+        -------
+        None.
+
+        """
+        now = time.time() if now is None else now
+        ratios = self.ratios(now)
+        for ID, (ratio, packets) in ratios.items():
+            metrics.set_value(f'capture_ratio.davis.{ID}', ratio)
+        if now - self.last_dump >= 60:
+            self.last_dump = now
+            metrics.dump('metrics_rtldavis.json')
+
+        for ID, (ratio, packets) in ratios.items():
+            if packets >= self.settings['min_packets'] and ratio < self.settings['min_ratio']:
+                raise CaptureRatioError(f"capture ratio of transmitter {ID} is {ratio:.0%} "
+                                        f"over the last {packets} packets")
+
+
+def timed_lines(stream, timeout):
+    """
+    Iterate over the lines of a pipe, giving up if it stays silent.
+
+    The pipe is read in a background thread, so a hung writer cannot block
+    the caller.
+
+    Raises
+    ------
+    StallError
+        If no line arrives for `timeout` seconds.
+
+    Yields
+    ------
+    str
+        The lines.
+
+    """
+    lines = queue.Queue()
+
+    def pump():
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=pump, daemon=True).start()
+    while True:
+        try:
+            line = lines.get(timeout=timeout)
+        except queue.Empty:
+            raise StallError(f"no output for {timeout:.0f} s") from None
+        if line is None:
+            return
+        yield line
+
+
+def fake_rtldavis(transmitters=(1, 2), loss=0.1, stall_after=None, speed=1.0):
+    """
+    Print rtldavis-like output, as a stand-in for testing.
+
+    Parameters
+    ----------
+    transmitters : tuple of int
+        Transmitter IDs; each sends every 2.5 + ID / 16 seconds.
+    loss : float, optional
+        Probability that a packet is reported missed.
+    stall_after : float, optional
+        Stop printing (but keep running) after this many seconds.
+    speed : float, optional
+        Time acceleration factor.
+
+    Returns
+    -------
+    None.
+
+    """
+    started = time.monotonic()
+    due = {ID: 0.0 for ID in transmitters}
+    while True:
+        ID = min(due, key=due.get)
+        time.sleep(max(0, started + due[ID] / speed - time.monotonic()))
+        if stall_after is not None and due[ID] >= stall_after:
+            while True:
+                time.sleep(3600)
+
+        clock = datetime.now().strftime('%H:%M:%S.%f')
+        if random.random() < loss:
+            print(f"{clock} ID:{ID} packet missed", flush=True)
+        else:
+            print(f"{clock} 80015e0d0a0700ff 1 0 0 0 0 msg.ID={ID}", flush=True)
+        due[ID] += 2.5 + ID / 16
+
+
+if __name__ == '__main__':
+    # Capture ratios of recorded (or live) rtldavis output:
+    #   rtldavis -tr 6 -tf US | python3 rtldavis_monitor.py
+    # Or stand in for rtldavis, e.g. with "command": ["python3",
+    # "rtldavis_monitor.py", "--fake", "--loss", "0.6"] in config.json:
+    #   python3 rtldavis_monitor.py --fake --loss 0.6 --stall-after 60
+    parser = argparse.ArgumentParser(description='Capture ratio of rtldavis output, or fake rtldavis output.')
+    parser.add_argument('log', nargs='?', help='rtldavis output (default: stdin)')
+    parser.add_argument('--fake', action='store_true', help='print fake rtldavis output instead')
+    parser.add_argument('--loss', type=float, default=0.1)
+    parser.add_argument('--stall-after', type=float)
+    parser.add_argument('--speed', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.fake:
+        fake_rtldavis(loss=args.loss, stall_after=args.stall_after, speed=args.speed)
+    else:
+        monitor = RtldavisMonitor(dict(load_config()['rtldavis'], window=float('inf')))
+        with open(args.log) if args.log else sys.stdin as f:
+            for line in f:
+                monitor.handle_line(line)
+        for ID, (ratio, packets) in sorted(monitor.ratios().items()):
+            print(f'transmitter {ID}: {ratio:.0%} of {packets} packets received')
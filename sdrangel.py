@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+
+import argparse
+import http.client
+import json
+import subprocess
+import time
+
+from config import load_config
+
+# ADALM-Pluto as listed by GET /sdrangel/devices
+PLUTO_DEVICE = {'deviceNbStreams': 1,
+                'deviceSetIndex': -1,
+                'direction': 0,
+                'displayedName': 'PlutoSDR[0] 1044735411960002f7ff080009f61e0b5b',
+                'hwType': 'PlutoSDR',
+                'index': 6,
+                'sequence': 0,
+                'serial': '1044735411960002f7ff080009f61e0b5b'}
+
+PLUTO_SETTINGS = {'LOppmTenths': 0,
+                  'antennaPath': 0,
+                  'centerFrequency': 433000000,
+                  'dcBlock': 0,
+                  'devSampleRate': 2500000,
+                  'fcPos': 2,
+                  'gain': 50,
+                  'gainMode': 0,
+                  'hwBBDCBlock': 1,
+                  'hwIQCorrection': 1,
+                  'hwRFDCBlock': 1,
+                  'iqCorrection': 0,
+                  'iqOrder': 1,
+                  'log2Decim': 0,
+                  'lpfBW': 1500000,
+                  'lpfFIRBW': 500000,
+                  'lpfFIREnable': 0,
+                  'lpfFIRGain': 0,
+                  'lpfFIRlog2Decim': 0,
+                  'reverseAPIAddress': '127.0.0.1',
+                  'reverseAPIDeviceIndex': 0,
+                  'reverseAPIPort': 8888,
+                  'transverterDeltaFrequency': 0,
+                  'transverterMode': 0,
+                  'useReverseAPI': 0}
+
+# ChirpChat (LoRa) demodulator matching the transmitters in the .ino sketches,
+# decoded frames are forwarded to LoRaReceive over UDP port 9999
+CHIRPCHAT_SETTINGS = {'autoNbSymbolsMax': 0,
+                      'bandwidthIndex': 15,
+                      'channelMarker': {'centerFrequency': 0,
+                                        'color': -65281,
+                                        'frequencyScaleDisplayType': 0,
+                                        'title': 'ChirpChat Demodulator'},
+                      'codingScheme': 0,
+                      'deBits': 2,
+                      'decodeActive': 1,
+                      'eomSquelchTenths': 60,
+                      'fftWindow': 5,
+                      'hasCRC': 1,
+                      'hasHeader': 1,
+                      'inputFrequencyOffset': 0,
+                      'nbParityBits': 1,
+                      'nbSymbolsMax': 255,
+                      'preambleChirps': 10,
+                      'reverseAPIAddress': '127.0.0.1',
+                      'reverseAPIChannelIndex': 0,
+                      'reverseAPIDeviceIndex': 0,
+                      'reverseAPIPort': 8888,
+                      'rgbColor': -65281,
+                      'rollupState': {'childrenStates': [{'isHidden': 0,
+                                                          'objectName': 'verticalLayoutWidget'},
+                                                         {'isHidden': 0,
+                                                          'objectName': 'verticalLayoutWidget_2'},
+                                                         {'isHidden': 0,
+                                                          'objectName': 'spectrumContainer'}],
+                                      'version': 0},
+                      'sendViaUDP': 1,
+                      'spectrumConfig': {'averagingMode': 0,
+                                         'averagingValue': 1,
+                                         'calibrationInterpMode': 0,
+                                         'decay': 1,
+                                         'decayDivisor': 1,
+                                         'displayCurrent': 1,
+                                         'displayGrid': 0,
+                                         'displayGridIntensity': 5,
+                                         'displayHistogram': 0,
+                                         'displayMaxHold': 0,
+                                         'displayTraceIntensity': 50,
+                                         'displayWaterfall': 1,
+                                         'fftOverlap': 0,
+                                         'fftSize': 4096,
+                                         'fftWindow': 4,
+                                         'fpsPeriodMs': 50,
+                                         'histogramStroke': 30,
+                                         'invertedWaterfall': 1,
+                                         'linear': 0,
+                                         'markersDisplay': 0,
+                                         'powerRange': 100,
+                                         'refLevel': 0,
+                                         'ssb': 0,
+                                         'usb': 1,
+                                         'useCalibration': 0,
+                                         'waterfallShare': 0.5,
+                                         'wsSpectrum': 0,
+                                         'wsSpectrumAddress': '127.0.0.1',
+                                         'wsSpectrumPort': 8887},
+                      'spreadFactor': 10,
+                      'title': 'ChirpChat Demodulator',
+                      'udpAddress': '127.0.0.1',
+                      'udpPort': 9999,
+                      'useReverseAPI': 0}
+
+# Per band: Pluto center frequency and the measured offset of the transmitter
+LORA_BANDS = {433: {'centerFrequency': 433000000, 'inputFrequencyOffset': 8640},
+              915: {'centerFrequency': 915000000, 'inputFrequencyOffset': 23222}}
+
+
+class SDRangelError(Exception):
+    """Raised when the SDRangel REST API rejects a request or times out."""
+
+
+def settings_diff(old, new):
+    """
+    Keys of `new` whose values differ from `old`, recursing into objects.
+
+    Parameters
+    ----------
+    old, new : dict
+        Previously applied and wanted settings.
+
+    Returns
+    -------
+    dict
+        The changed settings only (empty if nothing changed).
+
+    """
+    diff = {}
+    for key, value in new.items():
+        if key not in old:
+            diff[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            changed = settings_diff(old[key], value)
+            if changed:
+                diff[key] = changed
+        elif old[key] != value:
+            diff[key] = value
+    return diff
+
+
+class SDRangelClient:
+    """
+    Client for the SDRangel REST API over one keep-alive HTTP connection.
+
+    Replaces the curl calls and fixed sleeps of SDRangel_automate(): every
+    call checks its response and raises SDRangelError on failure, and the
+    wait_*() methods poll the API until SDRangel is ready instead of
+    sleeping for a worst-case time. Settings that were already applied are
+    remembered, so PATCH requests only carry the keys that changed.
+
+    """
+
+    def __init__(self, host='127.0.0.1', port=8091, timeout=10, poll_interval=0.2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+        self.connection = None
+        self.applied = {}  # path -> settings last sent to it
+
+    def _connect(self):
+        self.close()
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, method, path, body=None):
+        """
+        Send one request and return the decoded JSON response.
+
+        A connection dropped by the server is reopened and the request
+        retried once.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        path : str
+            API path, e.g. '/sdrangel/deviceset/0/device/run'.
+        body : dict, optional
+            JSON request body.
+
+        Raises
+        ------
+        SDRangelError
+            If SDRangel cannot be reached or answers with an error status.
+
+        Returns
+        -------
+        dict or None
+            The response body, if any.
+
+        """
+        headers = {'accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):
+            if self.connection is None:
+                self._connect()
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                self.close()
+                if attempt:
+                    raise SDRangelError(f'{method} {path} failed: {e}') from e
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                raise SDRangelError(f'{method} {path} failed: {e}') from e
+
+        if response.will_close:
+            self.close()
+        if not 200 <= response.status < 300:
+            raise SDRangelError(f'{method} {path} failed with {response.status} '
+                                f'{response.reason}: {data.decode(errors="replace").strip()}')
+        return json.loads(data) if data else None
+
+    def poll(self, path, predicate=lambda response: True, timeout=30, what=None):
+        """
+        GET `path` until it succeeds and `predicate` accepts the response.
+
+        Connection and API errors while polling count as "not ready yet".
+
+        Raises
+        ------
+        SDRangelError
+            If the condition is not met within `timeout` seconds.
+
+        Returns
+        -------
+        dict
+            The accepting response.
+
+        """
+        deadline = time.monotonic() + timeout
+        error = None
+        while True:
+            try:
+                response = self.request('GET', path)
+                if predicate(response):
+                    return response
+                error = response
+            except (SDRangelError, OSError, http.client.HTTPException) as e:
+                error = e
+            if time.monotonic() >= deadline:
+                raise SDRangelError(f'Timed out waiting for {what or path}: {error}')
+            time.sleep(self.poll_interval)
+
+    # Instance and device sets
+
+    def wait_ready(self, timeout=60):
+        """Wait until SDRangel has started and answers on its API."""
+        return self.poll('/sdrangel', timeout=timeout, what='SDRangel to start')
+
+    def add_deviceset(self, direction=0):
+        self.request('POST', f'/sdrangel/deviceset?direction={direction}')
+
+    def remove_deviceset(self):
+        """Remove the last device set, forgetting the settings applied to it."""
+        self.request('DELETE', '/sdrangel/deviceset')
+        self.applied.clear()
+
+    def deviceset_count(self):
+        return self.request('GET', '/sdrangel/devicesets')['devicesetcount']
+
+    # Devices
+
+    def set_device(self, deviceset, device, timeout=30):
+        """Select the device of a device set and wait until it is loaded."""
+        path = f'/sdrangel/deviceset/{deviceset}/device'
+        self.request('PUT', path, device)
+        self.applied = {key: value for key, value in self.applied.items()
+                        if not key.startswith(path)}
+        self.poll(path + '/settings',
+                  lambda response: response.get('deviceHwType') == device['hwType'],
+                  timeout, what=f'{device["hwType"]} on device set {deviceset}')
+
+    def patch_device_settings(self, deviceset, hw_type, key, settings):
+        """
+        Apply device settings, sending only what changed since the last call.
+
+        Parameters
+        ----------
+        deviceset : int
+            Device set index.
+        hw_type : str
+            Device hardware type, e.g. 'PlutoSDR'.
+        key : str
+            Settings object of the device, e.g. 'plutoSdrInputSettings'.
+        settings : dict
+            Wanted settings.
+
+        Returns
+        -------
+        dict
+            The settings that were sent.
+
+        """
+        return self._patch(f'/sdrangel/deviceset/{deviceset}/device/settings',
+                           {'deviceHwType': hw_type, 'direction': 0}, key, settings)
+
+    def device_state(self, deviceset):
+        return self.request('GET', f'/sdrangel/deviceset/{deviceset}/device/run')['state']
+
+    def start_device(self, deviceset, timeout=30):
+        self.request('POST', f'/sdrangel/deviceset/{deviceset}/device/run')
+        self.wait_device_state(deviceset, 'running', timeout)
+
+    def stop_device(self, deviceset, timeout=30):
+        self.request('DELETE', f'/sdrangel/deviceset/{deviceset}/device/run')
+        self.wait_device_state(deviceset, ('idle', 'ready'), timeout)
+
+    def wait_device_state(self, deviceset, states, timeout=30):
+        """Wait until the run state of a device set is one of `states`."""
+        if isinstance(states, str):
+            states = (states,)
+        response = self.poll(f'/sdrangel/deviceset/{deviceset}/device/run',
+                             lambda response: response.get('state') in states + ('error',),
+                             timeout, what=f'device set {deviceset} to be {"/".join(states)}')
+        if response['state'] == 'error':
+            raise SDRangelError(f'Device set {deviceset} is in error state')
+
+    # Channels
+
+    def add_channel(self, deviceset, channel_type, timeout=30):
+        """
+        Add a channel to a device set and wait until it is listed.
+
+        Returns
+        -------
+        int
+            Index of the new channel.
+
+        """
+        channels = self.request('GET', f'/sdrangel/deviceset/{deviceset}')['channelcount']
+        self.request('POST', f'/sdrangel/deviceset/{deviceset}/channel',
+                     {'channelType': channel_type, 'direction': 0})
+        self.poll(f'/sdrangel/deviceset/{deviceset}/channel/{channels}/settings',
+                  lambda response: response.get('channelType') == channel_type,
+                  timeout, what=f'{channel_type} channel on device set {deviceset}')
+        return channels
+
+    def patch_channel_settings(self, deviceset, channel, channel_type, key, settings):
+        """
+        Apply channel settings, sending only what changed since the last call.
+
+        Parameters
+        ----------
+        deviceset, channel : int
+            Device set and channel index.
+        channel_type : str
+            e.g. 'ChirpChatDemod'.
+        key : str
+            Settings object of the channel, e.g. 'ChirpChatDemodSettings'.
+        settings : dict
+            Wanted settings.
+
+        Returns
+        -------
+        dict
+            The settings that were sent.
+
+        """
+        return self._patch(f'/sdrangel/deviceset/{deviceset}/channel/{channel}/settings',
+                           {'channelType': channel_type, 'direction': 0}, key, settings)
+
+    def _patch(self, path, header, key, settings):
+        changed = settings_diff(self.applied.get(path, {}), settings)
+        if changed:
+            self.request('PATCH', path, dict(header, **{key: changed}))
+            self.applied[path] = json.loads(json.dumps(settings))
+        return changed
+
+
+class SDRangelSession:
+    """
+    SDRangel process with the ChirpChat device set of the LoRa cycle.
+
+    The process is launched and the device set built once; afterwards each
+    capture only retunes and starts the device, and stops it again so the
+    Pluto is free for rtl_433. ensure() checks that the process is alive
+    and its API answers, and relaunches SDRangel only if it is not.
+
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.client = create_client(settings)
+        self.process = None
+        self.channel = None
+        self.restarts = 0
+
+    def start(self):
+        """
+        Launch SDRangel and set up the Pluto device set with a ChirpChat channel.
+
+        Returns
+        -------
+        None.
+
+        """
+        print("SDRangel startup")
+        self.process = subprocess.Popen(self.settings['command'])
+        self.client.wait_ready(self.settings['ready_timeout'])
+
+        # close any residual settings from previous calls
+        if self.client.deviceset_count():
+            self.client.remove_deviceset()
+
+        # set the device to ADALM-Pluto
+        self.client.add_deviceset()
+        self.client.set_device(0, PLUTO_DEVICE)
+        self.channel = self.client.add_channel(0, 'ChirpChatDemod')
+
+    def healthy(self):
+        """
+        Whether SDRangel is running and answering on its API.
+
+        Returns
+        -------
+        bool
+            True if healthy.
+
+        """
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            self.client.request('GET', '/sdrangel')
+            return self.client.device_state(0) in ('idle', 'ready')
+        except (SDRangelError, OSError, http.client.HTTPException):
+            return False
+
+    def ensure(self):
+        """
+        Start SDRangel, or restart it if it died or stopped answering.
+
+        Returns
+        -------
+        bool
+            True if SDRangel had to be (re)started.
+
+        """
+        if self.healthy():
+            return False
+        if self.process is not None:
+            self.restarts += 1
+            print(f"SDRangel is not responding (exit code {self.process.poll()}), restarting")
+            self.stop()
+        self.start()
+        return True
+
+    def capture(self, band, seconds, stop=None):
+        """
+        Decode one LoRa band for a number of seconds.
+
+        Parameters
+        ----------
+        band : int
+            Key of LORA_BANDS (433 or 915).
+        seconds : float
+            Capture time.
+        stop : threading.Event, optional
+            Set to end the capture early.
+
+        Returns
+        -------
+        None.
+
+        """
+        tuning = LORA_BANDS[band]
+        self.client.patch_device_settings(0, 'PlutoSDR', 'plutoSdrInputSettings',
+                                          dict(PLUTO_SETTINGS, centerFrequency=tuning['centerFrequency']))
+        self.client.start_device(0)
+
+        chirpchat = dict(CHIRPCHAT_SETTINGS, inputFrequencyOffset=tuning['inputFrequencyOffset'])
+        chirpchat['channelMarker'] = dict(chirpchat['channelMarker'],
+                                          centerFrequency=tuning['inputFrequencyOffset'])
+        self.client.patch_channel_settings(0, self.channel, 'ChirpChatDemod',
+                                           'ChirpChatDemodSettings', chirpchat)
+
+        print(f"LoRa {band} MHz decoding")
+        if stop is not None:
+            stop.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+        # release the Pluto
+        self.client.stop_device(0)
+
+    def stop(self):
+        """
+        Remove the device set and terminate SDRangel.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                self.client.remove_deviceset()
+            except (SDRangelError, OSError, http.client.HTTPException) as e:
+                print(f"Could not remove the SDRangel device set: {e}")
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.client.close()
+        self.process = None
+        print("SDRangel has been terminated.")
+
+
+def create_client(settings=None):
+    """
+    Build a client from the 'sdrangel' section of config.json.
+
+    Returns
+    -------
+    SDRangelClient
+        The client (connected on first use).
+
+    """
+    if settings is None:
+        settings = load_config()['sdrangel']
+    return SDRangelClient(settings['host'], settings['port'])
+
+
+if __name__ == '__main__':
+    # Check that SDRangel is up and print the state of its device sets
+    parser = argparse.ArgumentParser(description='Query a running SDRangel instance.')
+    parser.add_argument('--host', default=load_config()['sdrangel']['host'])
+    parser.add_argument('--port', type=int, default=load_config()['sdrangel']['port'])
+    parser.add_argument('--timeout', type=float, default=5)
+    args = parser.parse_args()
+
+    client = SDRangelClient(args.host, args.port)
+    try:
+        print(client.wait_ready(args.timeout))
+        for deviceset in range(client.deviceset_count()):
+            print(f'Device set {deviceset}: {client.device_state(deviceset)}')
+    except SDRangelError as e:
+        print(e)
+    finally:
+        client.close()
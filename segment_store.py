@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from group_writer import open_writer
+from jsonl_reader import repair_tail, reverse_lines
+from offset_index import OffsetIndex, query_file, record_station
+from stations import record_time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Segment name format for each rotation period
+PERIODS = {'hour': '%Y%m%d%H', 'day': '%Y%m%d'}
+
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _open_compressed(path, mode):
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f'zstandard is not installed, cannot open {path}')
+        return zstandard.open(path, mode)
+    return gzip.open(path, mode)
+
+
+class SegmentStore:
+    """
+    Time-segmented JSONL storage for one source (davis, rtl_433, lora).
+
+    Records are appended to an hourly or daily segment file under
+    <root>/<source>/. When a segment is rotated out it is compressed in a
+    background thread. A small manifest.json lists every segment with its
+    file name, time range and record count, so readers can go straight to
+    the newest segment or to a time range without opening old segments.
+    While a segment is open, every `index_every`-th record of each
+    station is entered in a sparse offset index next to it (see
+    offset_index.py), so time-range queries seek instead of scanning.
+    Appends go through a group-commit writer (group_writer.py), which
+    writes them to the segment in batches.
+
+    Only one process may write to a source; any number may read.
+
+    """
+
+    def __init__(self, source, root='data', period='hour', compression='gzip', legacy_file=None,
+                 index_every=100):
+        self.source = source
+        self.period = period
+        self.compression = compression
+        self.legacy_file = legacy_file
+        self.index_every = index_every
+        self.directory = os.path.join(root, source)
+        self.manifest_file = os.path.join(self.directory, 'manifest.json')
+
+        self._file = None
+        self._name = None
+        self._index = None
+        self._lock = threading.Lock()
+        self._compressors = []
+        self._compressing = set()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    # Manifest
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'source': self.source, 'segments': []}
+
+    def _save_manifest(self, manifest):
+        # write-then-rename so readers never see a half-written manifest
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _update_segment(self, name, **changes):
+        with self._lock:
+            manifest = self.load_manifest()
+            for entry in manifest['segments']:
+                if entry['name'] == name:
+                    entry.update(changes)
+            self._save_manifest(manifest)
+
+    def _timestamp(self, record):
+        try:
+            return record_time(self.source, record).timestamp()
+        except (KeyError, ValueError):
+            return time.time()
+
+    # Writing
+
+    def append(self, record):
+        """
+        Append one record to the segment covering its timestamp.
+
+        Parameters
+        ----------
+        record : dict
+            The reading to store.
+
+        Returns
+        -------
+        None.
+
+        """
+        name = time.strftime(PERIODS[self.period], time.localtime(self._timestamp(record)))
+
+        # late records stay in the open segment rather than reopening an old one
+        if self._name is None or name > self._name:
+            self._rotate(name)
+
+        line = json.dumps(record) + '\n'
+        self._add_to_index(record)
+        self._file.write(line)
+
+    def append_many(self, records):
+        """
+        Append several records with one write per segment.
+
+        Returns
+        -------
+        int
+            Number of records appended.
+
+        """
+        lines = []
+        queued = 0
+        for record in records:
+            name = time.strftime(PERIODS[self.period], time.localtime(self._timestamp(record)))
+            if self._name is None or name > self._name:
+                if lines:
+                    self._file.write(''.join(lines))
+                    lines = []
+                    queued = 0
+                self._rotate(name)
+            self._add_to_index(record, queued)
+            lines.append(json.dumps(record) + '\n')
+            queued += len(lines[-1].encode('utf-8'))
+
+        if lines:
+            self._file.write(''.join(lines))
+        return len(records)
+
+    def _add_to_index(self, record, queued=0):
+        # `queued`: bytes of lines not yet handed to the writer
+        if self._index is not None:
+            station = record_station(self.source, record)
+            if station is not None:
+                self._index.add(self._timestamp(record), station, self._file.offset + queued)
+
+    def _rotate(self, name):
+        start = datetime.strptime(name, PERIODS[self.period])
+        if self.period == 'hour':
+            end = start + timedelta(hours=1)
+        else:
+            end = start + timedelta(days=1)
+
+        if self._file is not None:
+            self._file.close()
+        if self._index is not None:
+            self._index.close()
+
+        with self._lock:
+            manifest = self.load_manifest()
+            newest = max(manifest['segments'], key=lambda segment: segment['name'], default=None)
+
+            if newest is None or name > newest['name']:
+                entry = {'name': name,
+                         'file': name + '.jsonl',
+                         'start': start.timestamp(),
+                         'end': end.timestamp(),
+                         'count': None,
+                         'closed': False}
+                manifest['segments'].append(entry)
+            elif not newest['closed'] and newest['file'].endswith('.jsonl'):
+                # left open by a previous run: resume it, late records included
+                entry = newest
+                entry['start'] = min(entry['start'], start.timestamp())
+            else:
+                # a late record (e.g. the clock behind after a restart) never
+                # reopens a closed segment, which may be compressed or being
+                # compressed; it starts a new one sorting after the newest
+                base = newest['name'].split('.')[0]
+                later = sum(segment['name'].startswith(base + '.') for segment in manifest['segments'])
+                entry = {'name': f'{base}.{later + 1:03d}',
+                         'file': f'{base}.{later + 1:03d}.jsonl',
+                         'start': start.timestamp(),
+                         'end': max(end.timestamp(), newest['end']),
+                         'count': None,
+                         'closed': False}
+                manifest['segments'].append(entry)
+
+            for segment in manifest['segments']:
+                if segment is not entry and not segment['closed']:
+                    # rotated out here, or left open by a previous run
+                    segment['closed'] = True
+            self._save_manifest(manifest)
+
+            pending = [segment['name'] for segment in manifest['segments']
+                       if segment['closed'] and segment['file'].endswith('.jsonl')
+                       and segment['name'] not in self._compressing]
+            self._compressing.update(pending)
+        name = entry['name']
+
+        path = os.path.join(self.directory, entry['file'])
+        repair_tail(path)
+        self._file = open_writer(path, self.source)
+        self._name = name
+        self._index = None
+        if self.index_every:
+            self._index = OffsetIndex(path, self.index_every, self.source + '_index')
+            # entries committed ahead of lines lost in a crash
+            self._index.discard_after(self._file.offset)
+
+        for segment_name in pending:
+            self._compress_in_background(segment_name)
+
+    def _compress_in_background(self, name):
+        self._compressors = [thread for thread in self._compressors if thread.is_alive()]
+        thread = threading.Thread(target=self._compress, args=(name,), daemon=True)
+        thread.start()
+        self._compressors.append(thread)
+
+    def _compress(self, name):
+        source_file = os.path.join(self.directory, name + '.jsonl')
+        compressed_name = name + '.jsonl' + EXTENSIONS[self.compression]
+        compressed_file = os.path.join(self.directory, compressed_name)
+
+        try:
+            self._compress_segment(name, source_file, compressed_name, compressed_file)
+        finally:
+            with self._lock:
+                self._compressing.discard(name)
+
+    def _compress_segment(self, name, source_file, compressed_name, compressed_file):
+        count = 0
+        first = last = None
+        try:
+            with open(source_file, 'r') as src, _open_compressed(compressed_file + '.tmp', 'wt') as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    dst.write(line)
+                    count += 1
+                    timestamp = self._timestamp(json.loads(line))
+                    first = timestamp if first is None else min(first, timestamp)
+                    last = timestamp if last is None else max(last, timestamp)
+            os.replace(compressed_file + '.tmp', compressed_file)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f'Compression of {source_file} failed: {e}')
+            return
+
+        changes = {'file': compressed_name, 'count': count}
+        if first is not None:
+            changes['start'] = first
+            changes['end'] = last
+        self._update_segment(name, **changes)
+        os.remove(source_file)
+        # offsets into the plain file are meaningless for the compressed one
+        if os.path.exists(source_file + '.idx'):
+            os.remove(source_file + '.idx')
+
+    def flush(self):
+        """
+        Write out (and sync, per the fsync policy) the pending appends.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._file is not None:
+            self._file.flush()
+        if self._index is not None:
+            self._index.flush()
+
+    def _commit(self):
+        # let this process's own reads see its pending appends
+        if self._file is not None:
+            self._file.commit()
+
+    def close(self):
+        """
+        Close the open segment and wait for pending compressions.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        for thread in self._compressors:
+            thread.join()
+
+    # Reading
+
+    def _segment_lines(self, entry):
+        """Lines of one segment, oldest first."""
+        path = os.path.join(self.directory, entry['file'])
+        if path.endswith('.jsonl') and not os.path.exists(path):
+            # compressed and removed since the manifest was read
+            path = path + EXTENSIONS[self.compression]
+        if path.endswith('.jsonl'):
+            with open(path, 'r') as f:
+                return [line.rstrip('\n') for line in f if line.strip()]
+        with _open_compressed(path, 'rt') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+
+    def iter_newest(self):
+        """
+        Yield stored lines newest-first.
+
+        The open segment is read backwards from its end; older segments are
+        only opened if the caller keeps iterating. The legacy flat file of
+        the source, if any, is read last.
+
+        Yields
+        ------
+        str
+            One JSONL line.
+
+        """
+        self._commit()
+        segments = sorted(self.load_manifest()['segments'], key=lambda entry: entry['name'])
+        for entry in reversed(segments):
+            path = os.path.join(self.directory, entry['file'])
+            if path.endswith('.jsonl') and os.path.exists(path):
+                yield from reverse_lines(path)
+            else:
+                yield from reversed(self._segment_lines(entry))
+
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            yield from reverse_lines(self.legacy_file)
+
+    def iter_range(self, start, end, station=None):
+        """
+        Yield stored lines whose timestamp falls within [start, end].
+
+        Only segments whose manifest time range overlaps the query are
+        opened. Uncompressed segments and the legacy flat file are read
+        from the offset their index gives for `start` (see
+        offset_index.py) up to the first record past `end`.
+
+        Parameters
+        ----------
+        start, end : datetime.datetime
+            Bounds of the query, in local time.
+        station : int, optional
+            Restrict the query to one station ID.
+
+        Yields
+        ------
+        str
+            One JSONL line, oldest segment first.
+
+        """
+        self._commit()
+        start_ts = start.timestamp()
+        end_ts = end.timestamp()
+
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            yield from query_file(self.legacy_file, self.source, start_ts, end_ts, station)
+
+        segments = sorted(self.load_manifest()['segments'], key=lambda entry: entry['name'])
+        for entry in segments:
+            if entry['start'] > end_ts or entry['end'] < start_ts:
+                continue
+            path = os.path.join(self.directory, entry['file'])
+            if path.endswith('.jsonl') and os.path.exists(path + '.idx'):
+                try:
+                    yield from query_file(path, self.source, start_ts, end_ts, station)
+                    continue
+                except FileNotFoundError:
+                    entry = dict(entry, file=entry['file'] + EXTENSIONS[self.compression])
+            for line in self._segment_lines(entry):
+                record = json.loads(line)
+                if (start_ts <= self._timestamp(record) <= end_ts
+                        and (station is None or record_station(self.source, record) == station)):
+                    yield line
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import json
+import sqlite3
+import threading
+import time
+
+from stations import load_stations, record_time, station_id
+
+
+class SQLiteStore:
+    """
+    SQLite storage for one source (davis, rtl_433, lora).
+
+    All sources share one database file in WAL mode, so the decoder and
+    uploader processes can write and read at the same time. Readings are
+    indexed on (source, station_id, timestamp), which turns "latest reading
+    of each station" into an index walk instead of a file scan.
+
+    Appends are buffered and inserted in one transaction once batch_size
+    records are pending or, from a timer, once the oldest has waited
+    max_delay seconds, so readings of an idle source are not held back.
+
+    """
+
+    def __init__(self, source, database='readings.db', batch_size=50, max_delay=5.0):
+        self.source = source
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+
+        self._pending = []
+        self._first_pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+        self.connection = sqlite3.connect(database, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS readings ('
+                                'source TEXT NOT NULL, '
+                                'station_id INTEGER NOT NULL, '
+                                'timestamp REAL NOT NULL, '
+                                'record TEXT NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS readings_source_station_time '
+                                'ON readings (source, station_id, timestamp)')
+        self.connection.commit()
+
+    def _row(self, record):
+        try:
+            timestamp = record_time(self.source, record).timestamp()
+        except (KeyError, ValueError):
+            timestamp = time.time()
+        return (self.source, station_id(self.source, record), timestamp, json.dumps(record))
+
+    # Writing
+
+    def append(self, record):
+        """
+        Queue one record for insertion.
+
+        Parameters
+        ----------
+        record : dict
+            The reading to store.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._pending.append(self._row(record))
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+                # inserts the batch even if no further record arrives
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def append_many(self, records):
+        """
+        Insert many records in a single transaction.
+
+        Returns
+        -------
+        int
+            Number of records inserted.
+
+        """
+        rows = [self._row(record) for record in records]
+        with self._lock:
+            with self.connection:
+                self.connection.executemany('INSERT INTO readings VALUES (?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def flush(self):
+        """
+        Insert all queued records.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._first_pending = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if rows:
+                with self.connection:
+                    self.connection.executemany('INSERT INTO readings VALUES (?, ?, ?, ?)', rows)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    # Reading
+
+    def iter_newest(self):
+        """
+        Yield the records of the registered stations newest-first.
+
+        Each station is read from its own index range and the ranges are
+        merged on timestamp, so callers that stop early only touch the
+        newest rows of each station.
+
+        Yields
+        ------
+        str
+            One JSON record.
+
+        """
+        cursors = []
+        for ID in load_stations(self.source):
+            cursors.append(self.connection.execute(
+                'SELECT timestamp, record FROM readings '
+                'WHERE source = ? AND station_id = ? ORDER BY timestamp DESC',
+                (self.source, ID)))
+
+        for timestamp, record in heapq.merge(*cursors, key=lambda row: row[0], reverse=True):
+            yield record
+
+    def iter_range(self, start, end, station=None):
+        """
+        Yield records whose timestamp falls within [start, end], oldest first.
+
+        Parameters
+        ----------
+        start, end : datetime.datetime
+            Bounds of the query, in local time.
+        station : int, optional
+            Restrict the query to one station ID.
+
+        Yields
+        ------
+        str
+            One JSON record.
+
+        """
+        query = 'SELECT record FROM readings WHERE source = ? AND timestamp BETWEEN ? AND ?'
+        parameters = [self.source, start.timestamp(), end.timestamp()]
+        if station is not None:
+            query += ' AND station_id = ?'
+            parameters.append(station)
+        query += ' ORDER BY timestamp'
+
+        for (record,) in self.connection.execute(query, parameters):
+            yield record
+
+
+def import_jsonl(source, filenames, database='readings.db', batch_size=1000):
+    """
+    One-shot import of existing JSONL logs (e.g. Sample Data/*.json).
+
+    Parameters
+    ----------
+    source : str
+        'davis', 'rtl_433' or 'lora'.
+    filenames : list of str
+        JSONL files to import.
+    database : str, optional
+        SQLite database file. The default is 'readings.db'.
+    batch_size : int, optional
+        Records inserted per transaction. The default is 1000.
+
+    Returns
+    -------
+    int
+        Number of records imported.
+
+    """
+    store = SQLiteStore(source, database)
+    imported = 0
+
+    for filename in filenames:
+        batch = []
+        with open(filename, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    imported += store.append_many(batch)
+                    batch = []
+        imported += store.append_many(batch)
+        print(f'Imported {filename}')
+
+    store.close()
+    return imported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import JSONL station logs into the SQLite store.')
+    parser.add_argument('source', choices=['davis', 'rtl_433', 'lora'])
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--database', default='readings.db')
+    args = parser.parse_args()
+
+    count = import_jsonl(args.source, args.files, args.database)
+    print(f'{count} {args.source} records imported into {args.database}')
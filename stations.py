@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import json
+from datetime import datetime
+
+from config import load_config
+
+
+def get_protocol(protocol):
+    """
+    Settings of a protocol (data file, ID/time keys, merged parameters).
+
+    Parameters
+    ----------
+    protocol : str
+        'davis', 'rtl_433' or 'lora'.
+
+    Returns
+    -------
+    dict
+        The protocol entry of the configuration file.
+
+    """
+    return load_config()['protocols'][protocol]
+
+
+def load_stations(protocol):
+    """
+    Station registry for one protocol.
+
+    Parameters
+    ----------
+    protocol : str
+        'davis', 'rtl_433' or 'lora'.
+
+    Returns
+    -------
+    dict
+        Station entries keyed by station ID. Each entry holds the MQTT
+        'source' name and the 'fields' mapping of record key -> MQTT key.
+
+    """
+    return {station['id']: station
+            for station in load_config()['stations']
+            if station['protocol'] == protocol}
+
+
+def station_id(protocol, record):
+    """
+    Extract the station ID of a stored record.
+
+    Handles plain integer IDs (Davis, rtl_433) as well as the LoRa
+    "433 MHz" frequency strings.
+
+    Returns
+    -------
+    int
+        The station ID.
+
+    """
+    value = record[get_protocol(protocol)['id_key']]
+    if isinstance(value, str):
+        value = value.split()[0]
+    return int(value)
+
+
+def record_time(protocol, record):
+    """
+    Local time at which a stored record was received.
+
+    Returns
+    -------
+    datetime.datetime
+        The record's time key parsed with the protocol's time format.
+
+    """
+    settings = get_protocol(protocol)
+    return datetime.strptime(record[settings['time_key']], settings['time_format'])
+
+
+def latest_readings(protocol, lines, merge=True):
+    """
+    Resolve the latest reading of every registered station in one pass.
+
+    Records are grouped by station ID as they are read. For protocols with
+    a 'merge' list (Davis), parameters missing from the newest record are
+    filled in from older records of the same station, but only with values
+    received (record time minus their 'age' entry) at most 'max_age'
+    seconds before the newest record, the same rule DavisAssembler applies
+    when it stores them. Iteration stops as soon as every station is
+    complete, so the cost does not grow with the number of stations.
+
+    Parameters
+    ----------
+    protocol : str
+        'davis', 'rtl_433' or 'lora'.
+    lines : iterable of str
+        JSONL lines ordered newest-first, e.g. from reverse_lines().
+    merge : bool, optional
+        Fill in missing parameters from older records. If False, the
+        newest record of each station is returned as stored.
+
+    Returns
+    -------
+    dict
+        Latest record of each station, keyed by station ID.
+
+    """
+    stations = load_stations(protocol)
+    merge = get_protocol(protocol).get('merge', []) if merge else []
+    max_age = get_protocol(protocol).get('max_age', float('inf'))
+
+    latest = {}
+    missing = {}
+    newest = {}  # ID -> epoch time of the newest record
+    pending = len(stations)
+
+    for line in lines:
+        if pending == 0:
+            break
+
+        record = json.loads(line)
+        ID = station_id(protocol, record)
+        if ID not in stations:
+            continue
+
+        if ID not in latest:
+            latest[ID] = dict(record)
+            missing[ID] = {parameter for parameter in merge if parameter not in record}
+            if missing[ID]:
+                newest[ID] = record_time(protocol, record).timestamp()
+        elif missing[ID]:
+            received = record_time(protocol, record).timestamp()
+            if newest[ID] - received > max_age:
+                # everything further back is older still
+                missing[ID] = set()
+            else:
+                ages = record.get('age', {})
+                for parameter in missing[ID] & record.keys():
+                    age = newest[ID] - (received - ages.get(parameter, 0))
+                    if age <= max_age:
+                        latest[ID][parameter] = record[parameter]
+                        missing[ID].discard(parameter)
+                        if 'age' in latest[ID]:
+                            latest[ID]['age'] = {**latest[ID]['age'], parameter: round(age, 1)}
+        else:
+            continue
+
+        if not missing[ID]:
+            pending -= 1
+
+    return latest
+
+
+def make_fields(protocol, ID, data):
+    """
+    Map a station's record onto its MQTT field names.
+
+    Returns
+    -------
+    dict
+        MQTT field name -> float value, following the station's 'fields'.
+
+    """
+    fields = load_stations(protocol)[ID]['fields']
+    return {name: float(data[key]) for key, name in fields.items()}
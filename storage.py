@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+from config import load_config
+from stations import get_protocol
+
+_stores = {}
+
+
+def open_store(source):
+    """
+    Shared store of a source, using the backend chosen in config.json.
+
+    The 'storage' section selects either "segments" (segment_store.py,
+    the default) or "sqlite" (sqlite_store.py). Both expose append(),
+    append_many(), close(), iter_newest() and iter_range().
+
+    Parameters
+    ----------
+    source : str
+        'davis', 'rtl_433' or 'lora'.
+
+    Returns
+    -------
+    SegmentStore or SQLiteStore
+        One instance per source and process.
+
+    """
+    if source not in _stores:
+        settings = load_config()['storage']
+        if settings.get('backend', 'segments') == 'sqlite':
+            from sqlite_store import SQLiteStore
+            _stores[source] = SQLiteStore(source, database=settings['database'])
+        else:
+            from segment_store import SegmentStore
+            _stores[source] = SegmentStore(source,
+                                           root=settings['root'],
+                                           period=settings['period'],
+                                           compression=settings['compression'],
+                                           legacy_file=get_protocol(source).get('file'),
+                                           index_every=settings.get('index_every', 100))
+    return _stores[source]
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from config import load_config
+
+
+class StallError(Exception):
+    pass
+
+
+class EventQueue:
+    """
+    Ingest events for the upload scheduler within one asyncio program.
+
+    put() may be called from the event loop or from worker threads (e.g.
+    the radio scheduler), like the multiprocessing.Queue it replaces.
+
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, item):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class WriteThread:
+    """
+    Runs the storage writes of the asyncio components in one worker thread.
+
+    Appending to storage, the archive and the shared-memory table may
+    block on the SD card (a group commit, an fsync under the 'batch'
+    policy), which would stall every component of the event loop. Calls
+    submitted here run one at a time in submission order, so records
+    are stored and reported in the order they were decoded.
+
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+
+    def submit(self, function, *args):
+        """
+        Queue a call without waiting for it; failures are printed.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.executor.submit(self._call, function, *args)
+
+    @staticmethod
+    def _call(function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            print(f"Storing failed: {e!r}")
+
+    async def run(self, function, *args):
+        """
+        Queue a call and wait until it, and every call before it, has run.
+
+        Returns
+        -------
+        object
+            What `function` returns.
+
+        """
+        return await asyncio.wrap_future(self.executor.submit(function, *args))
+
+
+async def wait_stop(stop, seconds):
+    """
+    Sleep for a number of seconds, waking up early if `stop` is set.
+
+    Returns
+    -------
+    bool
+        True if `stop` is set.
+
+    """
+    try:
+        await asyncio.wait_for(stop.wait(), max(0, seconds))
+    except asyncio.TimeoutError:
+        pass
+    return stop.is_set()
+
+
+async def terminate(process, grace=5):
+    """
+    Terminate a child process, killing it if it does not exit within `grace` seconds.
+
+    Returns
+    -------
+    int
+        The exit code.
+
+    """
+    if process.returncode is None:
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), grace)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+    return await process.wait()
+
+
+async def run_process(command, on_line=None, stop=None, duration=None, merge_stderr=False,
+                      read_timeout=None):
+    """
+    Run a decoder and hand its output to `on_line` line by line.
+
+    The output is read without blocking the event loop. The process is
+    terminated when `stop` is set, after `duration` seconds, or when
+    `on_line` raises.
+
+    Parameters
+    ----------
+    command : list of str
+        Program and arguments.
+    on_line : callable, optional
+        Called with every output line (str). Without it, stdout is not
+        captured.
+    stop : asyncio.Event, optional
+        Set to end the process early.
+    duration : float, optional
+        Seconds to run. The default is until the process exits.
+    merge_stderr : bool, optional
+        Pass stderr to `on_line` as well.
+    read_timeout : float, optional
+        Seconds without output after which the process is considered hung.
+
+    Raises
+    ------
+    StallError
+        If the process printed nothing for `read_timeout` seconds.
+
+    Returns
+    -------
+    int
+        The exit code.
+
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if duration is None else loop.time() + duration
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE if on_line else None,
+        stderr=asyncio.subprocess.STDOUT if on_line and merge_stderr else None)
+
+    stopped = asyncio.ensure_future((stop or asyncio.Event()).wait())
+    try:
+        while True:
+            pending = asyncio.ensure_future(process.stdout.readline() if on_line else process.wait())
+            timeout = None if deadline is None else max(0, deadline - loop.time())
+            stalled = on_line and read_timeout is not None and (timeout is None or read_timeout < timeout)
+            if stalled:
+                timeout = read_timeout
+            done, _ = await asyncio.wait({pending, stopped}, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if pending not in done:
+                pending.cancel()
+                if stalled and not done:
+                    raise StallError(f"no output for {read_timeout:.0f} s")
+                break
+            if not on_line:
+                break
+            line = pending.result()
+            if not line:
+                break
+            on_line(line.decode('utf-8', errors='replace'))
+    finally:
+        stopped.cancel()
+        await terminate(process)
+    return process.returncode
+
+
+async def run_in_thread(stop, function, *args, **kwargs):
+    """
+    Run blocking code (SDRangel's REST calls, the radio scheduler) in a thread.
+
+    `function` is called with a threading.Event as its `stop` keyword
+    argument, which is set when the asyncio `stop` event is.
+
+    Returns
+    -------
+    object
+        What `function` returns.
+
+    """
+    halt = threading.Event()
+    work = asyncio.ensure_future(asyncio.to_thread(function, *args, stop=halt, **kwargs))
+    stopped = asyncio.ensure_future(stop.wait())
+    try:
+        await asyncio.wait({work, stopped}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stopped.cancel()
+        halt.set()
+    return await work
+
+
+class Supervisor:
+    """
+    Runs the components of the program as tasks of one asyncio event loop.
+
+    A component is a coroutine function taking the shared `stop` event.
+    If it fails or returns before `stop` is set, it is restarted after a
+    backoff that doubles from `backoff_min` up to `backoff_max` seconds
+    and is reset once the component has run for `stable_time` seconds.
+    SIGTERM and SIGINT set `stop`; components then have `grace` seconds
+    to terminate their decoders and flush storage before they are
+    cancelled.
+
+    Replaces the multiprocessing.Process per component: the decoders are
+    child processes driven with asyncio.create_subprocess_exec, and the
+    waiting on their pipes, on UDP sockets and between uploads happens in
+    a single Python process.
+
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.components = {}
+        self.restarts = {}
+        self.stop = asyncio.Event()
+
+    def add(self, name, component):
+        self.components[name] = component
+        self.restarts[name] = 0
+
+    def shutdown(self):
+        if not self.stop.is_set():
+            print("Shutting down")
+            self.stop.set()
+
+    async def supervise(self, name, component):
+        """
+        Run one component until `stop` is set, restarting it with backoff.
+
+        Returns
+        -------
+        None.
+
+        """
+        loop = asyncio.get_running_loop()
+        backoff = self.settings['backoff_min']
+        while not self.stop.is_set():
+            started = loop.time()
+            try:
+                await component(self.stop)
+                if self.stop.is_set():
+                    return
+                print(f"{name} exited")
+            except Exception as e:
+                print(f"{name} failed: {e!r}")
+                if self.stop.is_set():
+                    return
+
+            if loop.time() - started >= self.settings['stable_time']:
+                backoff = self.settings['backoff_min']
+            self.restarts[name] += 1
+            metrics.set_value(f'supervisor_restarts.{name}', self.restarts[name])
+            print(f"Restarting {name} in {backoff:.0f} s")
+            if await wait_stop(self.stop, backoff):
+                return
+            backoff = min(2 * backoff, self.settings['backoff_max'])
+
+    async def run(self):
+        """
+        Run all components until SIGTERM or SIGINT.
+
+        Returns
+        -------
+        None.
+
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.shutdown)
+
+        tasks = {asyncio.create_task(self.supervise(name, component)): name
+                 for name, component in self.components.items()}
+        for name in self.components:
+            print(f"Started {name}")
+        await self.stop.wait()
+
+        done, pending = await asyncio.wait(tasks, timeout=self.settings['grace'])
+        for task in pending:
+            print(f"{tasks[task]} did not stop within {self.settings['grace']} s, cancelling")
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        metrics.dump()
+
+
+if __name__ == '__main__':
+    # Supervise any command, e.g. one that keeps failing:
+    #   python3 supervisor.py sh -c 'echo decoding; sleep 2; exit 1'
+    parser = argparse.ArgumentParser(description='Run a command under the supervisor, printing its output.')
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    async def main():
+        supervisor = Supervisor(load_config()['supervisor'])
+
+        async def component(stop):
+            code = await run_process(args.command, lambda line: print(line, end=''), stop, merge_stderr=True)
+            if not stop.is_set():
+                raise RuntimeError(f"exit code {code}")
+
+        supervisor.add(args.command[0], component)
+        await supervisor.run()
+
+    asyncio.run(main())
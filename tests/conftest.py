@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The modules live at the top of the repository and read config.json
+# from the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,29 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from columnar_archive import ColumnArchive, load_archive
+
+
+def records(first, count):
+    return [{'time': f'2024-08-11 22:{minute:02d}:00.000000', 'ID': 1, 'temperature': 28.0 + minute}
+            for minute in range(first, first + count)]
+
+
+def test_adding_a_field_keeps_the_rows(tmp_path):
+    archive = ColumnArchive('davis', str(tmp_path), fields=['temperature'])
+    for record in records(0, 5):
+        archive.append(record)
+    archive.close()
+
+    archive = ColumnArchive('davis', str(tmp_path), fields=['temperature', 'humidity'])
+    archive.append(dict(records(5, 1)[0], humidity=70.0))
+    archive.close()
+
+    columns = load_archive('davis', str(tmp_path))
+    assert len(columns['time']) == 6
+    assert list(columns['temperature']) == [28.0 + minute for minute in range(6)]
+    assert all(math.isnan(value) for value in columns['humidity'][:5])
+    assert columns['humidity'][5] == 70.0
@@ -0,0 +1,24 @@
+from davis_assembler import DavisAssembler
+
+FIELDS = ['temperature', 'humidity', 'rain_rate', 'wind_speed']
+
+
+def test_fields_older_than_max_age_are_dropped():
+    assembler = DavisAssembler(FIELDS, max_age=900)
+    assembler.add({'time': '2024-08-11 20:00:00.000000', 'ID': 1, 'wind_speed': 3, 'temperature': 28.0})
+    record = assembler.add({'time': '2024-08-11 22:00:00.000000', 'ID': 1, 'wind_speed': 4, 'humidity': 70.0})
+
+    assert 'temperature' not in record
+    assert record['age'] == {'wind_speed': 0.0, 'humidity': 0.0}
+    assert not assembler.complete(1)
+
+
+def test_seed_keeps_the_age_of_stored_fields():
+    assembler = DavisAssembler(FIELDS, max_age=900)
+    assembler.seed([{'time': '2024-08-11 22:00:00.000000', 'ID': 1, 'wind_speed': 4, 'humidity': 70.0,
+                     'temperature': 28.0, 'age': {'wind_speed': 0.0, 'humidity': 0.0, 'temperature': 800.0}}])
+
+    record = assembler.add({'time': '2024-08-11 22:02:00.000000', 'ID': 1, 'wind_speed': 5})
+    # received 800 s before the stored line, so 920 s old now
+    assert 'temperature' not in record
+    assert record['age'] == {'wind_speed': 0.0, 'humidity': 120.0}
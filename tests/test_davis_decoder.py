@@ -0,0 +1,58 @@
+import contextlib
+import io
+import pickle
+
+import pytest
+
+import davis_decoder
+from davis_decoder import (THERMISTOR_TEMP, WIND_SPEED_EC, calc_wind_speed_ec,
+                           calculate_thermistor_temp, parse_packet)
+
+
+def quiet(function, *args):
+    # the reference functions print every intermediate value
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def test_wind_table_matches_function():
+    mismatches = [(raw_mph, raw_angle)
+                  for raw_mph in range(256)
+                  for raw_angle in range(256)
+                  if WIND_SPEED_EC[raw_mph][raw_angle] != quiet(calc_wind_speed_ec, raw_mph, raw_angle)]
+    assert mismatches == []
+
+
+def test_thermistor_table_matches_function():
+    assert THERMISTOR_TEMP[0] is None
+    mismatches = [temp_raw for temp_raw in range(1, 4096)
+                  if THERMISTOR_TEMP[temp_raw] != quiet(calculate_thermistor_temp, temp_raw / 4)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize('packet', ['51 06 B2 FF 73 00 76 61',
+                                    '81 00 00 59 45 00 A3 E6',
+                                    '81 2A 40 62 30 00 00 00',
+                                    '80 10 C8 33 8D 00 25 11'])
+def test_parse_packet_matches_functions(packet):
+    pkt = packet.split()
+    data = quiet(parse_packet, (int(pkt[0], 16) >> 4) & 0xF, pkt)
+
+    wind_speed_raw, wind_dir_raw = int(pkt[1], 16), int(pkt[2], 16)
+    if wind_dir_raw not in (0, 255):
+        assert data['wind_speed'] == round(quiet(calc_wind_speed_ec, wind_speed_raw, wind_dir_raw))
+    if pkt[0] == '81':
+        temp_raw = (int(pkt[3], 16) << 4) + (int(pkt[4], 16) >> 4)
+        assert data['temperature'] == quiet(calculate_thermistor_temp, temp_raw / 4)
+
+
+def test_cache_rebuilt_for_other_inputs(tmp_path, monkeypatch):
+    cache = tmp_path / 'tables.pickle'
+    davis_decoder.load_tables(str(cache))
+    key = pickle.loads(cache.read_bytes())['key']
+    assert key == davis_decoder.table_key()
+
+    monkeypatch.setattr(davis_decoder, 'TABLE_VERSION', davis_decoder.TABLE_VERSION + 1)
+    assert davis_decoder.load_tables(str(cache))[1] == THERMISTOR_TEMP
+    assert pickle.loads(cache.read_bytes())['key'] not in (key, None)
+    assert pickle.loads(cache.read_bytes())['key'] == davis_decoder.table_key()
@@ -0,0 +1,47 @@
+import errno
+import os
+
+import pytest
+
+import group_writer
+from group_writer import GroupWriter
+
+SETTINGS = {'fsync': 'none', 'max_bytes': 1 << 20, 'max_delay': 60, 'fsync_interval': 60}
+
+
+def test_short_writes_are_completed(tmp_path, monkeypatch):
+    path = str(tmp_path / 'segment.jsonl')
+    writer = GroupWriter(path, SETTINGS)
+    real_write = os.write
+    monkeypatch.setattr(group_writer.os, 'write', lambda fd, data: real_write(fd, bytes(data[:3])))
+
+    writer.write('{"ID": 1}\n')
+    writer.write('{"ID": 2}\n')
+    writer.flush()
+    writer.close()
+
+    with open(path) as f:
+        assert f.read() == '{"ID": 1}\n{"ID": 2}\n'
+    assert writer.offset == 20
+
+
+def test_failed_commit_keeps_the_rest_pending(tmp_path, monkeypatch):
+    path = str(tmp_path / 'segment.jsonl')
+    writer = GroupWriter(path, SETTINGS)
+    real_write = os.write
+
+    def write_then_fail(fd, data):
+        if len(data) < 20:
+            raise OSError(errno.ENOSPC, 'No space left on device')
+        return real_write(fd, bytes(data[:5]))
+
+    monkeypatch.setattr(group_writer.os, 'write', write_then_fail)
+    writer.write('{"ID": 1}\n{"ID": 2}\n')
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.offset == 20
+
+    monkeypatch.setattr(group_writer.os, 'write', real_write)
+    writer.close()
+    with open(path) as f:
+        assert f.read() == '{"ID": 1}\n{"ID": 2}\n'
@@ -0,0 +1,41 @@
+import latest_table
+
+
+class FakeTable:
+    def __init__(self, readings):
+        self.readings = readings
+
+    def read(self, source):
+        return dict(self.readings)
+
+
+class CountingStore:
+    def __init__(self, records):
+        self.records = records
+        self.scans = 0
+
+    def iter_newest(self):
+        self.scans += 1
+        return iter(self.records)
+
+
+def test_stations_missing_from_the_table_are_looked_up_once(monkeypatch):
+    table = FakeTable({1: {'ID': 1, 'temperature': 29.0}})
+    store = CountingStore(['stored'])
+    monkeypatch.setattr(latest_table, '_stored', {})
+    monkeypatch.setattr(latest_table, 'shared_table', lambda: table)
+    monkeypatch.setattr(latest_table, 'open_store', lambda source: store)
+    monkeypatch.setattr(latest_table, 'load_stations', lambda source: {1: {}, 2: {}, 3: {}})
+    monkeypatch.setattr(latest_table, 'latest_readings',
+                        lambda source, lines: {1: {'ID': 1, 'temperature': 27.0},
+                                               2: {'ID': 2, 'temperature': 28.0}} if list(lines) else {})
+
+    for _ in range(3):
+        readings = latest_table.read_latest('davis')
+        assert readings == {1: {'ID': 1, 'temperature': 29.0}, 2: {'ID': 2, 'temperature': 28.0}}
+    assert store.scans == 1
+
+    # a later reading of station 2 comes from the table
+    table.readings[2] = {'ID': 2, 'temperature': 30.0}
+    assert latest_table.read_latest('davis')[2]['temperature'] == 30.0
+    assert store.scans == 1
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import socket
+
+import lora_receiver
+from segment_store import SegmentStore
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_serve_drops_repeats_and_stores_frames(tmp_path, monkeypatch):
+    store = SegmentStore('lora', root=str(tmp_path))
+    monkeypatch.setattr(lora_receiver, 'open_store', lambda source: store)
+    settings = {'host': '127.0.0.1', 'port': free_port(),
+                'repeat_window': 2.0, 'batch_size': 20, 'max_delay': 2.0}
+    frames = ['ID=433 Temp=31.20 RH=71.70 AQ=102.00',
+              'ID=915 Temp=29.80 RH=80.10 Gas=12.00',
+              'ID=433 Temp=31.30 RH=71.60 AQ=101.00']
+    received = []
+
+    async def scenario():
+        stop = asyncio.Event()
+        receiver = asyncio.create_task(lora_receiver.serve(settings, received.append, stop))
+        await asyncio.sleep(0.2)  # bound
+
+        # SDRangel forwards every frame more than once
+        await asyncio.to_thread(lora_receiver.send_frames, frames, settings['host'], settings['port'], 3)
+        await asyncio.sleep(0.2)
+
+        stop.set()
+        await asyncio.wait_for(receiver, 5)
+
+    asyncio.run(scenario())
+
+    stored = [json.loads(line) for line in reversed(list(store.iter_newest()))]
+    store.close()
+    assert received == stored
+    assert [(record['Frequency'], record['Temperature']) for record in stored] == \
+        [('433 MHz', 31.2), ('915 MHz', 29.8), ('433 MHz', 31.3)]
+    assert stored[1]['Smoke and Flammable Gas'] == 12.0
@@ -0,0 +1,73 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sdrangel import SDRangelClient, SDRangelError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/sdrangel':
+            self._reply(200, {'version': '7.0.0'})
+        else:
+            self._reply(404, {'message': 'no such device set'})
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self._reply(200, json.loads(body))
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_request_decodes_json_over_one_connection(server):
+    client = SDRangelClient('127.0.0.1', server.server_address[1], timeout=5)
+    assert client.request('GET', '/sdrangel') == {'version': '7.0.0'}
+    connection = client.connection
+    assert client.request('PATCH', '/sdrangel/deviceset/0/device/settings', {'gain': 50}) == {'gain': 50}
+    assert client.connection is connection
+    client.close()
+
+
+def test_error_status_raises(server):
+    client = SDRangelClient('127.0.0.1', server.server_address[1], timeout=5)
+    with pytest.raises(SDRangelError, match='404'):
+        client.request('GET', '/sdrangel/deviceset/3')
+    client.close()
+
+
+def test_unreachable_server_raises_sdrangel_error():
+    client = SDRangelClient('127.0.0.1', free_port(), timeout=5)
+    with pytest.raises(SDRangelError) as excinfo:
+        client.request('GET', '/sdrangel')
+    assert isinstance(excinfo.value.__cause__, OSError)
+    assert client.connection is None
@@ -0,0 +1,52 @@
+import gzip
+import json
+import os
+
+from segment_store import SegmentStore
+
+
+def reading(hour, temperature):
+    return {'time': f'2024-08-11 {hour:02d}:30:00', 'id': 102, 'temperature_C': temperature}
+
+
+def test_late_record_after_restart_does_not_reopen_closed_segment(tmp_path):
+    store = SegmentStore('rtl_433', root=str(tmp_path), legacy_file=None)
+    store.append(reading(21, 25.0))
+    store.append(reading(22, 26.0))
+    store.close()  # waits for the 21:00 segment to be compressed
+
+    # restarted with the clock behind
+    store = SegmentStore('rtl_433', root=str(tmp_path), legacy_file=None)
+    store.append(reading(21, 24.0))
+    store.close()
+
+    directory = tmp_path / 'rtl_433'
+    with gzip.open(directory / '2024081121.jsonl.gz', 'rt') as f:
+        assert [json.loads(line)['temperature_C'] for line in f] == [25.0]
+    assert [json.loads(line)['temperature_C'] for line in open(directory / '2024081122.jsonl')] == [26.0, 24.0]
+    assert not os.path.exists(directory / '2024081121.jsonl')
+
+    segments = {entry['name']: entry for entry in store.load_manifest()['segments']}
+    assert set(segments) == {'2024081121', '2024081122'}
+    # the late record is found by time-range queries
+    assert segments['2024081122']['start'] <= segments['2024081121']['start']
+
+
+def test_late_record_starts_new_segment_when_newest_is_closed(tmp_path):
+    store = SegmentStore('rtl_433', root=str(tmp_path), legacy_file=None)
+    store.append(reading(21, 25.0))
+    store.append(reading(22, 26.0))
+    store.close()
+    manifest = store.load_manifest()
+    for entry in manifest['segments']:
+        entry['closed'] = True
+    store._save_manifest(manifest)
+
+    store = SegmentStore('rtl_433', root=str(tmp_path), legacy_file=None)
+    store.append(reading(21, 24.0))
+    store.append(reading(23, 27.0))
+    store.close()
+
+    names = sorted(entry['name'] for entry in store.load_manifest()['segments'])
+    assert names == ['2024081121', '2024081122', '2024081122.001', '2024081123']
+    assert [json.loads(line)['temperature_C'] for line in store.iter_newest()] == [27.0, 24.0, 26.0, 25.0]
@@ -0,0 +1,37 @@
+import json
+
+from stations import latest_readings
+
+
+def lines(*records):
+    return [json.dumps(record) for record in records]
+
+
+def test_latest_readings_merges_recent_fields():
+    latest = latest_readings('davis', lines(
+        {'time': '2024-08-11 22:00:00.000000', 'ID': 1, 'wind_speed': 4, 'humidity': 70.0, 'rain_rate': 0,
+         'age': {'wind_speed': 0.0, 'humidity': 0.0, 'rain_rate': 0.0}},
+        {'time': '2024-08-11 21:55:00.000000', 'ID': 1, 'wind_speed': 3, 'temperature': 28.0,
+         'age': {'wind_speed': 0.0, 'temperature': 200.0}}))
+
+    assert latest[1]['temperature'] == 28.0
+    assert latest[1]['age']['temperature'] == 500.0
+
+
+def test_latest_readings_does_not_merge_past_max_age():
+    latest = latest_readings('davis', lines(
+        {'time': '2024-08-11 22:00:00.000000', 'ID': 1, 'wind_speed': 4, 'humidity': 70.0, 'rain_rate': 0},
+        # received 1000 s before the newest record
+        {'time': '2024-08-11 21:55:00.000000', 'ID': 1, 'temperature': 28.0, 'age': {'temperature': 700.0}},
+        {'time': '2024-08-11 20:00:00.000000', 'ID': 1, 'temperature': 27.0}))
+
+    assert 'temperature' not in latest[1]
+    assert latest[1]['humidity'] == 70.0
+
+
+def test_latest_readings_unmerged():
+    latest = latest_readings('davis', lines(
+        {'time': '2024-08-11 22:00:00.000000', 'ID': 1, 'wind_speed': 4},
+        {'time': '2024-08-11 21:59:00.000000', 'ID': 1, 'temperature': 28.0}), merge=False)
+
+    assert latest[1] == {'time': '2024-08-11 22:00:00.000000', 'ID': 1, 'wind_speed': 4}
@@ -0,0 +1,22 @@
+import sqlite3
+
+from upload_queue import UploadQueue
+
+
+def test_outbox_without_source_columns_is_migrated(tmp_path):
+    database = str(tmp_path / 'outbox.db')
+    connection = sqlite3.connect(database)
+    connection.execute('CREATE TABLE outbox ('
+                       'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                       'topic TEXT, '
+                       'payload BLOB NOT NULL, '
+                       'created REAL NOT NULL)')
+    connection.execute("INSERT INTO outbox (topic, payload, created) VALUES ('t', 'queued before', 1.0)")
+    connection.commit()
+    connection.close()
+
+    queue = UploadQueue(database)
+    queue.put('queued after', 't', 'davis', 2.0)
+
+    rows = queue.connection.execute('SELECT payload, source, reading_time FROM outbox ORDER BY id').fetchall()
+    assert rows == [('queued before', None, None), ('queued after', 'davis', 2.0)]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import sqlite3
+import time
+
+import metrics
+from config import load_config
+
+_queue = None
+
+
+class UploadQueue:
+    """
+    Disk-backed outbox for MQTT messages.
+
+    Every message due for upload is recorded in a small SQLite database
+    first and removed only after the broker acknowledged it (QoS 1 PUBACK).
+    Messages that could not be sent, e.g. while the uplink is down, are
+    replayed oldest-first in rate-limited batches on the next drain().
+
+    """
+
+    def __init__(self, database='outbox.db', batch_size=20, rate=5.0, ack_timeout=30):
+        self.batch_size = batch_size
+        self.rate = rate
+        self.ack_timeout = ack_timeout
+
+        self.connection = sqlite3.connect(database, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS outbox ('
+                                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                'topic TEXT, '
+                                'payload BLOB NOT NULL, '
+                                'created REAL NOT NULL, '
+                                'source TEXT, '
+                                'reading_time REAL)')
+        # outboxes created before the upload age metric, possibly still
+        # holding messages
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(outbox)')}
+        for column, kind in (('source', 'TEXT'), ('reading_time', 'REAL')):
+            if column not in columns:
+                self.connection.execute(f'ALTER TABLE outbox ADD COLUMN {column} {kind}')
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def put(self, payload, topic=None, source=None, reading_time=None):
+        """
+        Record one message for upload.
+
+        Parameters
+        ----------
+        payload : str or bytes
+            Message body.
+        topic : str, optional
+            Defaults to the publisher's topic.
+        source : str, optional
+            Source of the reading ('davis', 'rtl_433', 'lora').
+        reading_time : float, optional
+            Epoch time the reading was received; used for the
+            'upload_age_seconds.<source>' metric once it is acknowledged.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self.connection:
+            self.connection.execute('INSERT INTO outbox (topic, payload, created, source, reading_time) '
+                                    'VALUES (?, ?, ?, ?, ?)',
+                                    (topic, payload, time.time(), source, reading_time))
+
+    def drain(self, publisher):
+        """
+        Send queued messages until the outbox is empty or the broker stops
+        acknowledging.
+
+        Messages are published in batches of batch_size; a batch is removed
+        from the outbox once its PUBACKs arrive. Batches are spaced so that
+        no more than `rate` messages per second are sent.
+
+        Parameters
+        ----------
+        publisher : MqttPublisher
+            Connected publisher.
+
+        Returns
+        -------
+        int
+            Number of messages sent and acknowledged.
+
+        """
+        sent = 0
+        while True:
+            rows = self.connection.execute('SELECT id, topic, payload, source, reading_time '
+                                           'FROM outbox ORDER BY id LIMIT ?',
+                                           (self.batch_size,)).fetchall()
+            if not rows:
+                break
+            if not publisher.wait_connected(self.ack_timeout):
+                print(f"MQTT Server unreachable, {len(self)} messages kept for later")
+                break
+
+            started = time.monotonic()
+            mids = {}
+            for row in rows:
+                mid = publisher.publish_nowait(row[2], row[1])
+                if mid is not None:
+                    mids[mid] = row
+
+            acked = publisher.wait_acked(mids, self.ack_timeout)
+            with self.connection:
+                self.connection.executemany('DELETE FROM outbox WHERE id = ?',
+                                            [(mids[mid][0],) for mid in acked])
+
+            # end-to-end age of each reading when the broker accepted it
+            now = time.time()
+            for mid in acked:
+                source, reading_time = mids[mid][3:]
+                if reading_time is not None:
+                    metrics.observe(f'upload_age_seconds.{source}', now - reading_time)
+            sent += len(acked)
+
+            if len(acked) < len(rows):
+                print(f"{len(rows) - len(acked)} messages not acknowledged, {len(self)} kept for later")
+                break
+
+            # rate limit the replay of a backlog
+            delay = len(rows) / self.rate - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+        return sent
+
+
+def open_queue():
+    """
+    Shared outbox, configured from the 'upload_queue' section of config.json.
+
+    Returns
+    -------
+    UploadQueue
+        One instance per process.
+
+    """
+    global _queue
+    if _queue is None:
+        settings = load_config()['upload_queue']
+        _queue = UploadQueue(settings['database'],
+                             batch_size=settings['batch_size'],
+                             rate=settings['rate'])
+    return _queue
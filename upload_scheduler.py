@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import asyncio
+import queue
+import time
+
+import metrics
+
+
+class UploadScheduler:
+    """
+    Event-driven upload scheduling, one policy per source.
+
+    Decoders report every stored reading as an ingest event (source,
+    reading time). A source with pending events is uploaded once its
+    coalescing window has passed and its minimum interval since the last
+    upload has elapsed, but never later than max_latency after the first
+    pending event. Bursts of readings in between collapse into one upload.
+    Sources without events (e.g. a writer outside this program) are still
+    uploaded every max_interval seconds.
+
+    Per-source settings: min_interval, max_latency, coalesce, max_interval.
+
+    Events may carry the stored record as well, which is handed to
+    `on_record` (e.g. the rollup of rollup.py) as (source, record).
+
+    """
+
+    def __init__(self, uploaders, settings, on_record=None):
+        self.uploaders = uploaders
+        self.settings = settings
+        self.on_record = on_record
+
+        self.pending_since = {}
+        self.last_upload = {source: float('-inf') for source in uploaders}
+
+        for source, policy in settings.items():
+            if policy['min_interval'] > policy['max_latency']:
+                print(f"Upload policy of {source}: min_interval exceeds max_latency, "
+                      f"the latency bound takes precedence")
+
+    def notify(self, source, reading_time=None, record=None):
+        """
+        Record an ingest event.
+
+        Parameters
+        ----------
+        source : str
+            'davis', 'rtl_433' or 'lora'.
+        reading_time : float, optional
+            Epoch time of the stored reading.
+        record : dict, optional
+            The stored record.
+
+        Returns
+        -------
+        None.
+
+        """
+        if record is not None and self.on_record is not None:
+            self.on_record(source, record)
+        if source in self.uploaders and source not in self.pending_since:
+            self.pending_since[source] = time.monotonic()
+
+    def due_time(self, source):
+        """
+        Monotonic time at which the source should next be uploaded.
+
+        Returns
+        -------
+        float
+            The due time.
+
+        """
+        policy = self.settings[source]
+        last = self.last_upload[source]
+        due = last + policy['max_interval']
+
+        if source in self.pending_since:
+            pending = self.pending_since[source]
+            coalesced = max(pending + policy['coalesce'], last + policy['min_interval'])
+            due = min(due, coalesced, pending + policy['max_latency'])
+        return due
+
+    def upload(self, source):
+        started = time.monotonic()
+        self.pending_since.pop(source, None)
+        self.last_upload[source] = started
+        try:
+            self.uploaders[source]()
+        except Exception as e:
+            print(f"Upload of {source} failed: {e}")
+        metrics.observe(f'upload_duration_seconds.{source}', time.monotonic() - started)
+        metrics.dump()
+
+    def run(self, events):
+        """
+        Consume ingest events and upload sources as they fall due.
+
+        Parameters
+        ----------
+        events : multiprocessing.Queue
+            Queue of (source, reading_time[, record]) tuples put by the
+            decoders.
+
+        Returns
+        -------
+        None.
+
+        """
+        while True:
+            source = min(self.uploaders, key=self.due_time)
+            timeout = self.due_time(source) - time.monotonic()
+
+            if timeout > 0:
+                try:
+                    self.notify(*events.get(timeout=timeout))
+                except queue.Empty:
+                    pass
+                continue
+
+            self.upload(source)
+
+    async def run_async(self, events, stop):
+        """
+        Like run(), within the asyncio supervisor (see supervisor.py).
+
+        Uploads run in a worker thread so the event loop keeps serving
+        the decoders meanwhile.
+
+        Parameters
+        ----------
+        events : supervisor.EventQueue
+            Queue of (source, reading_time[, record]) tuples put by the
+            decoders.
+        stop : asyncio.Event
+            Set to stop after the upload in progress, if any.
+
+        Returns
+        -------
+        None.
+
+        """
+        stopped = asyncio.ensure_future(stop.wait())
+        try:
+            while not stop.is_set():
+                source = min(self.uploaders, key=self.due_time)
+                timeout = self.due_time(source) - time.monotonic()
+
+                if timeout > 0:
+                    event = asyncio.ensure_future(events.get())
+                    await asyncio.wait({event, stopped}, timeout=timeout,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    if event.done():
+                        self.notify(*event.result())
+                    else:
+                        event.cancel()
+                    continue
+
+                await asyncio.to_thread(self.upload, source)
+        finally:
+            stopped.cancel()